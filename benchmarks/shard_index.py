@@ -0,0 +1,103 @@
+"""
+Build times of the sharded project index (docblock.shards) over a synthetic monorepo.
+
+    python benchmarks/shard_index.py [--files 100000] [--packages 1000] [--jobs N] [--tree DIR]
+
+Writes a tree of packages (each with a package.json) of small JS files, then reports the cold build of
+the index, an update with nothing changed, an update after one file of one package changed, and the
+time of lookups in the merged index. The tree is kept in --tree if given, and reused when it already
+holds as many files.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docblock.settings import loadSettings  # noqa: E402
+from docblock.shards import ShardedIndex  # noqa: E402
+
+
+WORDS = ['get', 'set', 'is', 'has', 'load', 'save', 'user', 'item', 'list', 'value', 'config', 'parse', 'render']
+
+
+def syntheticFile(rnd):
+    out = []
+    for i in range(rnd.randint(3, 10)):
+        name = ''.join(w.capitalize() if j else w for j, w in enumerate(rnd.sample(WORDS, 3)))
+        if rnd.random() < 0.5:
+            out.append('/**\n * %s does things.\n * @param {String} name\n */\n' % name)
+        out.append('function %s(name, count) {\n  var total = count + 1;\n  return total;\n}\n\n' % name)
+    return ''.join(out)
+
+
+def writeTree(root, files, packages):
+    """ write the tree, unless it's there already; returns the path of a file of the first package """
+    marker = os.path.join(root, '.synthetic-%d-%d' % (files, packages))
+    first = os.path.join(root, 'packages', 'pkg0', 'src', 'file0.js')
+    if os.path.exists(marker):
+        return first
+    rnd = random.Random(0)
+    for n in range(files):
+        package = os.path.join(root, 'packages', 'pkg%d' % (n % packages))
+        directory = os.path.join(package, 'src', 'lib%d' % (n // packages % 10))
+        if n < packages:
+            os.makedirs(package, exist_ok=True)
+            with open(os.path.join(package, 'package.json'), 'w') as f:
+                f.write('{"name": "pkg%d"}\n' % n)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(package, 'src', 'file%d.js' % n) if n < packages else
+                  os.path.join(directory, 'file%d.js' % n), 'w') as f:
+            f.write(syntheticFile(rnd))
+    open(marker, 'w').close()
+    return first
+
+
+def main():
+    argParser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    argParser.add_argument('--files', type=int, default=100000)
+    argParser.add_argument('--packages', type=int, default=1000)
+    argParser.add_argument('--jobs', type=int, default=None)
+    argParser.add_argument('--tree', default=None, help='directory to write the synthetic tree to, and keep')
+    args = argParser.parse_args()
+
+    work = tempfile.mkdtemp()
+    root = args.tree or os.path.join(work, 'tree')
+    try:
+        start = time.time()
+        changed = writeTree(root, args.files, args.packages)
+        print('tree: %d files in %d packages, written in %.1fs' % (args.files, args.packages, time.time() - start))
+
+        index = ShardedIndex(root, os.path.join(work, 'index'), loadSettings())
+        for step in ('cold build', 'no change', 'one file changed'):
+            if step == 'one file changed':
+                with open(changed, 'a') as f:
+                    f.write('function addedLater(a) {\n}\n')
+            start = time.time()
+            stats = index.update(args.jobs)
+            print('%-18s %7.2fs  (%d of %d shards built in %.2fs, merged %d rows in %.2fs)' % (
+                step, time.time() - start, stats['rebuilt'], stats['packages'], stats['build'], stats['rows'],
+                stats['merge']
+            ))
+
+        names = ['addedLater'] + [
+            ''.join(w.capitalize() if j else w for j, w in enumerate(random.Random(i).sample(WORDS, 3)))
+            for i in range(999)
+        ]
+        start = time.time()
+        found = sum(len(index.find(name)) for name in names)
+        print('%-18s %7.1fus per name (%d rows found for %d names)' % (
+            'lookups', (time.time() - start) / len(names) * 1e6, found, len(names)
+        ))
+        print('merged index: %.1f MB' % (os.path.getsize(index.mergedPath) / 1e6))
+        index.close()
+    finally:
+        shutil.rmtree(work)
+
+
+if __name__ == '__main__':
+    main()
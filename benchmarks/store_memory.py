@@ -0,0 +1,123 @@
+"""
+Memory use of a symbol index over synthetic files: plain Python objects against docblock.store.
+
+    python benchmarks/store_memory.py [--files 10000]
+
+Each variant runs in its own process, and reports how much its resident set grew while building the
+index; for "mapped", how much it grew while opening the saved index and reading a column of every row.
+"""
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docblock.comment import iterDocBlocks, parseDocBlock  # noqa: E402
+from docblock.parser import BespokeDocsJavascript  # noqa: E402
+from docblock.render import Tag  # noqa: E402
+from docblock.settings import loadSettings  # noqa: E402
+from docblock.store import IndexBuilder, IndexReader, STRING  # noqa: E402
+from docblock.textview import TextView  # noqa: E402
+
+
+WORDS = ['get', 'set', 'is', 'has', 'load', 'save', 'user', 'item', 'list', 'value', 'config', 'parse', 'render']
+TAGS = ['@param {String} name [description]', '@param {Number} count [description]', '@return {Boolean} [description]',
+        '@deprecated', '@see other', '@throws {Error} when broken']
+
+
+def syntheticFile(seed):
+    rnd = random.Random(seed)
+    out = []
+    for i in range(rnd.randint(10, 40)):
+        name = ''.join(w.capitalize() if j else w for j, w in enumerate(rnd.sample(WORDS, 3)))
+        out.append('/**\n * %s does things.\n%s */\nfunction %s(name, count) {\n  return 1;\n}\n' % (
+            name, ''.join(' * %s\n' % tag for tag in rnd.sample(TAGS, rnd.randint(1, 4))), name
+        ))
+    return ''.join(out)
+
+
+def iterSymbols(files):
+    parser = BespokeDocsJavascript(loadSettings())
+    for n in range(files):
+        path = 'packages/pkg%d/src/file%d.js' % (n % 97, n)
+        text = syntheticFile(n)
+        view = TextView(text)
+        for begin, end in iterDocBlocks(text):
+            definition = parser.describe(parser.getDefinition(view, text.find('\n', end) + 1)) or {}
+            tags = [record.tag[1:] for record in parseDocBlock(text[begin:end]) if isinstance(record, Tag)]
+            yield path, definition.get('name', ''), definition.get('kind', ''), begin, end - begin, tags
+
+
+class Symbol(object):
+
+    def __init__(self, name, kind, begin, length, tags):
+        self.name = name
+        self.kind = kind
+        self.begin = begin
+        self.length = length
+        self.tags = tags
+
+
+def residentKb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def run(variant, files):
+    symbols = list(iterSymbols(50))  # warm up the regex caches before measuring
+    before = residentKb()
+    if variant == 'objects':
+        index = {}
+        for path, name, kind, begin, length, tags in iterSymbols(files):
+            index.setdefault(path, []).append(Symbol(name, kind, begin, length, tags))
+        rows = sum(len(symbols) for symbols in index.values())
+    else:
+        builder = IndexBuilder(
+            {'path': STRING, 'name': STRING, 'kind': STRING, 'begin': 'I', 'length': 'I'},
+            lists=('tags',), sortedBy='name'
+        )
+        for path, name, kind, begin, length, tags in iterSymbols(files):
+            builder.add(path=path, name=name, kind=kind, begin=begin, length=length, tags=tags)
+        rows = len(builder)
+        if variant == 'mapped':
+            fd, indexPath = tempfile.mkstemp(suffix='.idx')
+            os.close(fd)
+            builder.save(indexPath)
+            del builder
+            # only measure the reader: what a process which loads a saved index pays
+            before = residentKb()
+            index = IndexReader(indexPath)
+            kinds = set(index.value('kind', row) for row in range(len(index)))
+            print('%-8s %8d rows %10d kB' % (variant, rows, residentKb() - before))
+            index.close()
+            os.unlink(indexPath)
+            return
+    print('%-8s %8d rows %10d kB' % (variant, rows, residentKb() - before))
+    del symbols
+
+
+def main():
+    argParser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    argParser.add_argument('--files', type=int, default=10000)
+    argParser.add_argument('--variant', choices=('objects', 'columns', 'mapped'))
+    args = argParser.parse_args()
+
+    if args.variant:
+        return run(args.variant, args.files)
+    for variant in ('objects', 'columns', 'mapped'):
+        subprocess.check_call([sys.executable, __file__, '--files', str(args.files), '--variant', variant])
+
+
+if __name__ == '__main__':
+    main()
@@ -9,44 +9,65 @@ https://github.com/spadgos/sublime-jsdocs
 import sublime
 import sublime_plugin
 import re
-import datetime
 import time
-from functools import reduce
+from .docblock.render import DocBlockRenderer
+from .docblock.callsites import CallSiteIndex, findCallSites
+from .docblock.canonical import canonicalizePath, iterSynonyms
+from .docblock.completions import ParamCompletions
+from .docblock.edits import EditBuilder
+from .docblock.hover import HoverIndex, describePath, describeText, renderHover
+from .docblock.parser import BespokeDocsJavascript, BespokeDocsCoffee
+from .docblock.precompute import PrecomputedBlocks, blockKey, undocumentedDefinitions, usesClock
+from .docblock.scheduler import Scheduler, NORMAL, BACKGROUND
+from .docblock.project import (
+    SOURCE_EXTENSIONS, iterSourceFiles, getParserForFile, readSource, readExactSource, writeSource
+)
+from .docblock.restyle import RecordCache, iterRestyled, restyleText
+from .docblock.search import SearchIndex, indexText, indexPath
+from .docblock.scanner import scanText
+from .docblock.snippet import countFields, expandSnippet
+from .docblock.wrap import WRAP_SETTINGS, wrapBlock
 
 
-def read_line(view, point):
-    if (point >= view.size()):
-        return
+# background work, which gives way to the commands run as the user types
+scheduler = Scheduler()
 
-    next_line = view.line(point)
-    return view.substr(next_line)
+
+# the fields of blocks inserted as plain text, and the final cursor position
+FIELDS_KEY = 'bespoke_docs_fields'
+EXIT_KEY = 'bespoke_docs_fields_exit'
+
+# view id -> the field being edited, while a view has fields
+fieldIndexes = {}
 
 
 def write(view, str):
+    minFields = sublime.load_settings("BespokeDocs.sublime-settings").get('fast_insert_fields', 0)
     view.run_command(
-        'insert_snippet', {
+        'bespoke_docs_insert_fields' if minFields and countFields(str) >= minFields else 'insert_snippet', {
             'contents': str
         }
     )
 
 
-def counter():
-    count = 0
-    while True:
-        count += 1
-        yield(count)
+def selectField(view, index):
+    """ select the field at index, or move to the final cursor position past the last one """
+    fields = view.get_regions(FIELDS_KEY)
+    if index < len(fields):
+        fieldIndexes[view.id()] = index
+        target = fields[index]
+    else:
+        target = view.get_regions(EXIT_KEY)[0]
+        clearFields(view)
+    view.sel().clear()
+    view.sel().add(target)
+    view.show(target)
 
 
-def escape(str):
-    return str.replace('$', '\$').replace('{', '\{').replace('}', '\}')
-
-
-def is_numeric(val):
-    try:
-        float(val)
-        return True
-    except ValueError:
-        return False
+def clearFields(view):
+    fieldIndexes.pop(view.id(), None)
+    view.erase_regions(FIELDS_KEY)
+    view.erase_regions(EXIT_KEY)
 
 
 def getParser(view):
@@ -60,63 +81,12 @@ def getParser(view):
     return BespokeDocsJavascript(pluginSettings)
 
 
-def splitByCommas(str):
-    """
-    Split a string by unenclosed commas: that is, commas which are not inside of quotes or brackets.
-
-    splitByCommas('foo, bar(baz, quux), fwip = "hey, hi"')
-     ==> ['foo', 'bar(baz, quux)', 'fwip = "hey, hi"']
-    """
-    out = []
-
-    if not str:
-        return out
-
-    # the current token
-    current = ''
-
-    # characters which open a section inside which commas are not separators between different arguments
-    openQuotes = '"\'<({'
-    # characters which close the section. The position of the character here should match the opening
-    # indicator in `openQuotes`
-    closeQuotes = '"\'>)}'
-
-    matchingQuote = ''
-    insideQuotes = False
-    nextIsLiteral = False
-
-    for char in str:
-        if nextIsLiteral:  # previous char was a \
-            current += char
-            nextIsLiteral = False
-        elif insideQuotes:
-            if char == '\\':
-                nextIsLiteral = True
-            else:
-                current += char
-                if char == matchingQuote:
-                    insideQuotes = False
-        else:
-            if char == ',':
-                out.append(current.strip())
-                current = ''
-            else:
-                current += char
-                quoteIndex = openQuotes.find(char)
-                if quoteIndex > -1:
-                    matchingQuote = closeQuotes[quoteIndex]
-                    insideQuotes = True
-
-    out.append(current.strip())
-    return out
-
-
-def flatten(theList):
-    """
-    Flatten a shallow list. Only works when all items are lists.
-    [[(1,1)], [(2,2), (3, 3)]] --> [(1,1), (2,2), (3,3)]
-    """
-    return [item for sublist in theList for item in sublist]
+def readBodyText(view, parser, definitionStart):
+    """ the code `parser.scanBody` reads for the definition at definitionStart, or None if it isn't read """
+    limit = parser.bodyScanLimit()
+    if not limit or definitionStart >= view.size():
+        return None
+    return view.substr(sublime.Region(definitionStart, min(view.size(), definitionStart + limit)))
 
 
 def getDocBlockRegion(view, point):
@@ -135,9 +105,46 @@ def getDocBlockRegion(view, point):
     return sublime.Region(start, end)
 
 
+def findDocBlock(view, point, parser):
+    """
+    The Region from the last comment opener starting at or before point to its closer: like
+    `getDocBlockRegion`, reading the text rather than the scope of every character. None if point is past
+    the closer, outside of any block.
+    """
+    # a coffee closer isn't followed by `*`, so it isn't taken for an opener
+    opener = '###*' if parser.settings['language'] == 'coffee' else '/*'
+    chunk = 1024
+    while True:
+        begin = max(0, point - chunk)
+        found = view.substr(sublime.Region(begin, point + len(opener))).rfind(opener)
+        if found >= 0 or begin == 0:
+            break
+        chunk *= 4
+    if found < 0:
+        return None
+    begin += found
+    closer = view.find(re.escape(parser.settings['commentCloser'].strip()), begin + len(opener))
+    end = closer.end() if closer.begin() >= 0 else view.size()
+    if point > end:
+        return None
+    return sublime.Region(begin, end)
+
+
+def editBuilder(view):
+    return EditBuilder(lambda begin, end: view.substr(sublime.Region(begin, end)))
+
+
+def applyEdits(view, edit, builder):
+    """
+    Apply the coalesced edits of builder to the view, as part of the current edit.
+    """
+    return builder.apply(lambda begin, end, text: view.replace(edit, sublime.Region(begin, end), text))
+
+
 class BespokeDocsCommand(sublime_plugin.TextCommand):
 
     def run(self, edit, inline=False):
+        scheduler.interactive()
 
         self.initialize(self.view, inline)
 
@@ -148,10 +155,14 @@ class BespokeDocsCommand(sublime_plugin.TextCommand):
         # erase characters in the view (will be added to the output later)
         self.view.erase(edit, self.trailingRgn)
 
-        # match against a function declaration.
-        out = self.parser.parse(self.line)
+        snippet = self.precomputedSnippet(inline)
+        if snippet is None:
+            self.readBody()
+
+            # match against a function declaration.
+            out = self.parser.parse(self.line)
 
-        snippet = self.generateSnippet(out, inline)
+            snippet = self.generateSnippet(out, inline)
 
         write(self.view, snippet)
 
@@ -164,649 +175,128 @@ class BespokeDocsCommand(sublime_plugin.TextCommand):
         self.trailingRgn = sublime.Region(point, v.line(point).end())
         self.trailingString = v.substr(self.trailingRgn).strip()
         # drop trailing '*/'
-        self.trailingString = escape(re.sub('\\s*\\*\\/\\s*$', '', self.trailingString))
+        self.trailingString = re.sub('\\s*\\*\\/\\s*$', '', self.trailingString)
 
         self.indentSpaces = " " * max(0, self.pluginSettings.get("indentation_spaces", 1))
-        self.prefix = "*"
-
-        settingsAlignTags = self.pluginSettings.get("align_tags", 'deep')
-        self.deepAlignTags = settingsAlignTags == 'deep'
-        self.shallowAlignTags = settingsAlignTags in ('shallow', True)
 
         self.parser = parser = getParser(v)
         parser.inline = inline
+        if self.pluginSettings.get('call_site_types') and v.window():
+            parser.setCallSites(callSiteIndexes.get(v.window()))
 
         # use trailing string as a description of the function
         if self.trailingString:
             parser.setNameOverride(self.trailingString)
 
         # read the next line
-        self.line = parser.getDefinition(v, v.line(point).end() + 1)
+        definitionStart = v.line(point).end() + 1
+        self.line = parser.getDefinition(v, definitionStart)
+        self.bodyText = readBodyText(v, parser, definitionStart)
 
-    def generateSnippet(self, out, inline=False):
-        # substitute any variables in the tags
+    def readBody(self):
+        if self.bodyText is not None:
+            self.parser.setBody(self.parser.scanBody(self.bodyText))
 
-        if out:
-            out = self.substituteVariables(out)
-
-        # align the tags
-        if out and (self.shallowAlignTags or self.deepAlignTags) and not inline:
-            out = self.alignTags(out)
-
-        # fix all the tab stops so they're consecutive
-        if out:
-            out = self.fixTabStops(out)
-
-        if inline:
-            if out:
-                return " " + out[0] + " */"
-            else:
-                return " $0 */"
-        else:
-            return self.createSnippet(out) + ('\n' if self.pluginSettings.get('newline_after_block') else '')
-
-    def alignTags(self, out):
-        def outputWidth(str):
-            # get the length of a string, after it is output as a snippet,
-            # "${1:foo}" --> 3
-            return len(re.sub("[$][{]\\d+:([^}]+)[}]", "\\1", str).replace('\$', '$'))
-
-        # count how many columns we have
-        maxCols = 0
-        # this is a 2d list of the widths per column per line
-        widths = []
-
-        # Grab the return tag if required.
-        if self.pluginSettings.get('per_section_indent'):
-            returnTag = self.pluginSettings.get('return_tag') or '@return'
-        else:
-            returnTag = False
-
-        for line in out:
-            if line.startswith('@'):
-                # Ignore the return tag if we're doing per-section indenting.
-                if returnTag and line.startswith(returnTag):
-                    continue
-                # ignore all the words after `@author`
-                columns = line.split(" ") if not line.startswith('@author') else ['@author']
-                widths.append(list(map(outputWidth, columns)))
-                maxCols = max(maxCols, len(widths[-1]))
-
-        #  initialise a list to 0
-        maxWidths = [0] * maxCols
-
-        if (self.shallowAlignTags):
-            maxCols = 1
-
-        for i in range(0, maxCols):
-            for width in widths:
-                if (i < len(width)):
-                    maxWidths[i] = max(maxWidths[i], width[i])
-
-        # Convert to a dict so we can use .get()
-        maxWidths = dict(enumerate(maxWidths))
-
-        # Minimum spaces between line columns
-        minColSpaces = self.pluginSettings.get('min_spaces_between_columns', 1)
-
-        for index, line in enumerate(out):
-            # format the spacing of columns, but ignore the author tag. (See #197)
-            if line.startswith('@') and not line.startswith('@author'):
-                newOut = []
-                for partIndex, part in enumerate(line.split(" ")):
-                    newOut.append(part)
-                    newOut.append(" " * minColSpaces + (" " * (maxWidths.get(partIndex, 0) - outputWidth(part))))
-                out[index] = "".join(newOut).strip()
-
-        return out
-
-    def substituteVariables(self, out):
-        def getVar(match):
-            varName = match.group(1)
-            if varName == 'datetime':
-                date = datetime.datetime.now().replace(microsecond=0)
-                offset = time.timezone / -3600.0
-                return "%s%s%02d%02d" % (
-                    date.isoformat(),
-                    '+' if offset >= 0 else "-",
-                    abs(offset),
-                    (offset % 1) * 60
-                )
-            elif varName == 'date':
-                return datetime.date.today().isoformat()
-            else:
-                return match.group(0)
-
-        def subLine(line):
-            return re.sub(r'\{\{([^}]+)\}\}', getVar, line)
-
-        return list(map(subLine, out))
-
-    def fixTabStops(self, out):
-        tabIndex = counter()
-
-        def swapTabs(m):
-            return "%s%d%s" % (m.group(1), next(tabIndex), m.group(2))
-
-        for index, outputLine in enumerate(out):
-            out[index] = re.sub("(\\$\\{)\\d+(:[^}]+\\})", swapTabs, outputLine)
-
-        return out
-
-    def createSnippet(self, out):
-        snippet = ""
-        closer = self.parser.settings['commentCloser']
-        if out:
-            if self.pluginSettings.get('spacer_between_sections') == True:
-                lastTag = None
-                for idx, line in enumerate(out):
-                    res = re.match("^\\s*@([a-zA-Z]+)", line)
-                    if res and (lastTag != res.group(1)):
-                        if self.pluginSettings.get('function_description') == False:
-                            if lastTag != None:
-                                out.insert(idx, "")
-                        else:
-                            out.insert(idx, "")
-                        lastTag = res.group(1)
-            elif self.pluginSettings.get('spacer_between_sections') == 'after_description' and self.pluginSettings.get('function_description'):
-                lastLineIsTag = False
-                for idx, line in enumerate(out):
-                    res = re.match("^\\s*@([a-zA-Z]+)", line)
-                    if res:
-                        if not lastLineIsTag:
-                            out.insert(idx, "")
-                        lastLineIsTag = True
-            for line in out:
-                snippet += "\n " + self.prefix + (self.indentSpaces + line if line else "")
-        else:
-            snippet += "\n " + self.prefix + self.indentSpaces + "${0:" + self.trailingString + '}'
-
-        snippet += "\n" + closer
-        return snippet
-
-
-class BespokeDocsParser(object):
-
-    def __init__(self, pluginSettings):
-        self.pluginSettings = pluginSettings
-        self.setupSettings()
-        self.nameOverride = None
-
-    def isExistingComment(self, line):
-        return re.search('^\\s*\\*', line)
-
-    def setNameOverride(self, name):
-        """ overrides the description of the function - used instead of parsed description """
-        self.nameOverride = name
-
-    def getNameOverride(self):
-        return self.nameOverride
-
-    def parse(self, line):
-        if self.pluginSettings.get('simple_mode'):
-            return None
-
-        try:
-            out = self.parseFunction(line)  # (name, args, retval, options)
-            if (out):
-                return self.formatFunction(*out)
-
-            out = self.parseVar(line)
-            if out:
-                return self.formatVar(*out)
-        except:
-            # TODO show exception if dev\debug mode
+    def precomputedSnippet(self, inline):
+        """ the snippet rendered ahead of time for the definition (see `precomputeBlocks`), or None """
+        if inline or self.trailingString or not self.pluginSettings.get('precompute_blocks'):
             return None
+        return precomputed.get(self.view.id(), blockKey(self.parser, self.line, self.bodyText))
 
-        return None
-
-    def formatVar(self, name, val, valType=None):
-        out = []
-        if not valType:
-            if not val or val == '':  # quick short circuit
-                valType = "[type]"
-            else:
-                valType = self.guessTypeFromValue(val) or self.guessTypeFromName(name) or "[type]"
-        if self.inline:
-            out.append("@%s %s${1:%s}%s ${1:[description]}" % (
-                self.settings['typeTag'],
-                "{" if self.settings['curlyTypes'] else "",
-                valType,
-                "}" if self.settings['curlyTypes'] else ""
-            ))
-        else:
-            out.append("${1:[%s description]}" % (escape(name)))
-            out.append("@%s %s${1:%s}%s" % (
-                self.settings['typeTag'],
-                "{" if self.settings['curlyTypes'] else "",
-                valType,
-                "}" if self.settings['curlyTypes'] else ""
-            ))
-
-        return out
-
-    def getTypeInfo(self, argType, argName):
-        typeInfo = ''
-        if self.settings['typeInfo']:
-            typeInfo = '%s${1:%s}%s ' % (
-                "{" if self.settings['curlyTypes'] else "",
-                escape(argType or self.guessTypeFromName(argName) or "[type]"),
-                "}" if self.settings['curlyTypes'] else "",
-            )
-
-        return typeInfo
-
-    def formatFunction(self, name, args, retval, options={}):
-        out = []
-        if 'as_setter' in options:
-            out.append('@private')
-            return out
-
-        extraTagAfter = self.pluginSettings.get("extra_tags_go_after") or False
-
-        description = self.getNameOverride() or ('[%s%sdescription]' % (escape(name), ' ' if name else ''))
-        if self.pluginSettings.get('function_description'):
-            out.append("${1:%s}" % description)
-
-        if (self.pluginSettings.get("autoadd_method_tag") is True):
-            out.append("@%s %s" % (
-                "method",
-                escape(name)
-            ))
-
-        if not extraTagAfter:
-            self.addExtraTags(out)
-
-        # if there are arguments, add a @arg/param for each
-        if (args):
-            # remove comments inside the argument list.
-            args = re.sub(r'/\*.*?\*/', '', args)
-            for argType, argName in self.parseArgs(args):
-                typeInfo = self.getTypeInfo(argType, argName)
-
-                format_str = "@arg %s%s"
-                if (self.pluginSettings.get('prefer_param')):
-                    format_str = "@param %s%s"
-                if (self.pluginSettings.get('param_description')):
-                    format_str += " ${1:[description]}"
-
-                out.append(format_str % (
-                    typeInfo,
-                    escape(argName) if self.pluginSettings.get('param_name') else ''
-                ))
-
-        # return value type might be already available in some languages but
-        # even then ask language specific parser if it wants it listed
-        retType = self.getFunctionReturnType(name, retval)
-        if retType is not None:
-            typeInfo = ''
-            if self.settings['typeInfo']:
-                typeInfo = ' %s${1:%s}%s' % (
-                    "{" if self.settings['curlyTypes'] else "",
-                    retType or "[type]",
-                    "}" if self.settings['curlyTypes'] else ""
-                )
-            format_args = [
-                self.pluginSettings.get('return_tag') or '@return',
-                typeInfo
-            ]
+    def generateSnippet(self, out, inline=False):
+        renderer = DocBlockRenderer(self.pluginSettings, self.parser.settings)
+        return renderer.render(out, inline, self.trailingString)
 
-            if (self.pluginSettings.get('return_description')):
-                format_str = "%s%s %s${1:[description]}"
-                third_arg = ""
 
-                # the extra space here is so that the description will align with the param description
-                if args and self.pluginSettings.get('align_tags') == 'deep':
-                    if not self.pluginSettings.get('per_section_indent'):
-                        third_arg = " "
+class BespokeDocsInsertFieldsCommand(sublime_plugin.TextCommand):
+    """
+    Insert a snippet as plain text, and track its fields as regions: much faster than `insert_snippet` for
+    snippets with hundreds of fields. Tab and Shift+Tab move between them (see `BespokeDocsNextField`).
+    """
+    def run(self, edit, contents):
+        view = self.view
+        point = view.sel()[0].begin()
+        lineStart = view.line(point).begin()
+        before = view.substr(sublime.Region(lineStart, point))
+        expanded = len(view.sel()) == 1 and expandSnippet(contents, before[:len(before) - len(before.lstrip())])
+        if not expanded:
+            view.run_command('insert_snippet', {'contents': contents})
+            return
 
-                format_args.append(third_arg)
-            else:
-                format_str = "%s%s"
+        text, fields, exit = expanded
+        view.erase(edit, view.sel()[0])
+        view.insert(edit, point, text)
+        view.add_regions(FIELDS_KEY, [sublime.Region(point + begin, point + end) for begin, end in fields],
+                         '', '', sublime.HIDDEN)
+        view.add_regions(EXIT_KEY, [sublime.Region(point + exit)], '', '', sublime.HIDDEN)
+        selectField(view, 0)
 
-            out.append(format_str % tuple(format_args))
 
-        for notation in self.getMatchingNotations(name):
-            if 'tags' in notation:
-                out.extend(notation['tags'])
+class BespokeDocsNextField(sublime_plugin.TextCommand):
+    def run(self, edit, forward=True):
+        index = fieldIndexes.get(self.view.id())
+        if index is None:
+            return
+        selectField(self.view, max(0, index + 1 if forward else index - 1))
 
-        if extraTagAfter:
-            self.addExtraTags(out)
 
-        return out
+class BespokeDocsClearFields(sublime_plugin.TextCommand):
+    def run(self, edit):
+        clearFields(self.view)
 
-    def getFunctionReturnType(self, name, retval):
-        """ returns None for no return type. False meaning unknown, or a string """
 
-        if re.match("[A-Z]", name):
-            # no return, but should add a class
-            return None
+class BespokeDocsFieldsListener(sublime_plugin.EventListener):
 
-        if re.match('[$_]?(?:set|add)($|[A-Z_])', name):
-            # setter/mutator, no return
+    def on_query_context(self, view, key, operator, operand, match_all):
+        if key != 'bespoke_docs_fields':
             return None
-
-        if re.match('[$_]?(?:is|has)($|[A-Z_])', name):  # functions starting with 'is' or 'has'
-            return self.settings['bool']
-
-        return self.guessTypeFromName(name) or False
-
-    def parseArgs(self, args):
-        """
-        a list of tuples, the first being the best guess at the type, the second being the name
-        """
-        blocks = splitByCommas(args)
-        out = []
-        for arg in blocks:
-            out.append(self.getArgInfo(arg))
-
-        return flatten(out)
-
-    def getArgInfo(self, arg):
-        """
-        Return a list of tuples, one for each argument derived from the arg param.
-        """
-        return [(self.getArgType(arg), self.getArgName(arg))]
-
-    def getArgType(self, arg):
+        value = view.id() in fieldIndexes and self.inFields(view)
+        if operator == sublime.OP_EQUAL:
+            return value == operand
+        if operator == sublime.OP_NOT_EQUAL:
+            return value != operand
         return None
 
-    def getArgName(self, arg):
-        return arg
-
-    def addExtraTags(self, out):
-        extraTags = self.pluginSettings.get('extra_tags', [])
-        if (len(extraTags) > 0):
-            out.extend(extraTags)
-
-    def guessTypeFromName(self, name):
-        matches = self.getMatchingNotations(name)
-        if len(matches):
-            rule = matches[0]
-            if ('type' in rule):
-                return self.settings[rule['type']] if rule['type'] in self.settings else rule['type']
-
-        if (re.match("(?:is|has)[A-Z_]", name)):
-            return self.settings['bool']
-
-        if (re.match("^(?:cb|callback|done|next|fn)$", name)):
-            return self.settings['function']
-
+    def inFields(self, view):
+        """ whether the cursor is still in the block whose fields are tracked, which stops tracking them if not """
+        fields = view.get_regions(FIELDS_KEY) + view.get_regions(EXIT_KEY)
+        cursor = view.sel()[0] if len(view.sel()) == 1 else None
+        if cursor and fields and min(field.begin() for field in fields) <= cursor.begin() and \
+                cursor.end() <= max(field.end() for field in fields):
+            return True
+        clearFields(view)
         return False
 
-    def getMatchingNotations(self, name):
-        def checkMatch(rule):
-            if 'prefix' in rule:
-                regex = re.escape(rule['prefix'])
-                if re.match('.*[a-z]', rule['prefix']):
-                    regex += '(?:[A-Z_]|$)'
-                return re.match(regex, name)
-            elif 'regex' in rule:
-                return re.search(rule['regex'], name)
-
-        return list(filter(checkMatch, self.pluginSettings.get('notation_map', [])))
-
-    def getDefinition(self, view, pos):
-        """
-        get a relevant definition starting at the given point
-        returns string
-        """
-        maxLines = 25  # don't go further than this
-        openBrackets = 0
-
-        definition = ''
-
-        # count the number of open parentheses
-        def countBrackets(total, bracket):
-            return total + (1 if bracket == '(' else -1)
-
-        for i in range(0, maxLines):
-            line = read_line(view, pos)
-            if line is None:
-                break
-
-            pos += len(line) + 1
-            # strip comments
-            line = re.sub(r"//.*",     "", line)
-            line = re.sub(r"/\*.*\*/", "", line)
+    def on_close(self, view):
+        fieldIndexes.pop(view.id(), None)
 
-            searchForBrackets = line
-
-            # on the first line, only start looking from *after* the actual function starts. This is
-            # needed for cases like this:
-            # (function (foo, bar) { ... })
-            if definition == '':
-                opener = re.search(self.settings['fnOpener'], line) if self.settings['fnOpener'] else False
-                if opener:
-                    # ignore everything before the function opener
-                    searchForBrackets = line[opener.start():]
-
-            openBrackets = reduce(countBrackets, re.findall('[()]', searchForBrackets), openBrackets)
-
-            definition += line
-            if openBrackets == 0:
-                break
-        return definition
-
-
-class BespokeDocsJavascript(BespokeDocsParser):
-    def setupSettings(self):
-        identifier = '[a-zA-Z_$][a-zA-Z_$0-9]*'
-        self.settings = {
-            # curly brackets around the type information
-            "curlyTypes": True,
-            'typeInfo': True,
-            "typeTag": self.pluginSettings.get('override_js_var') or "type",
-            # technically, they can contain all sorts of unicode, but w/e
-            "varIdentifier": identifier,
-            "fnIdentifier":  identifier,
-            "fnOpener": '(?:'
-                    + r'function[\s*]*(?:' + identifier + r')?\s*\('
-                    + '|'
-                    + '(?:' + identifier + r'|\(.*\)\s*=>)'
-                    + '|'
-                    + '(?:' + identifier + r'\s*\(.*\)\s*\{)'
-                    + ')',
-            "commentCloser": " */",
-            "bool": "Boolean",
-            "function": "Function"
-        }
-
-    def parseFunction(self, line):
-        res = re.search(
-            # Normal functions...
-            #   fnName = function,  fnName : function
-            r'(?:(?P<name1>' + self.settings['varIdentifier'] + r')\s*[:=]\s*)?'
-            + 'function'
-            # function fnName, function* fnName
-            + r'(?P<generator>[\s*]+)?(?P<name2>' + self.settings['fnIdentifier'] + ')?'
-            # (arg1, arg2)
-            + r'\s*\(\s*(?P<args>.*)\)',
-            line
-        ) or re.search(
-            # ES6 arrow functions
-            # () => y,  x => y,  (x, y) => y,  (x = 4) => y
-            r'(?:(?P<args>' + self.settings['varIdentifier'] + r')|\(\s*(?P<args2>.*)\))\s*=>',
-            line
-        ) or re.search(
-            # ES6 method initializer shorthand
-            # var person = { getName() { return this.name; } }
-            r'(?P<name1>' + self.settings['varIdentifier'] + ')\s*\((?P<args>.*)\)\s*\{',
-            line
-        )
-        if not res:
-            return None
 
-        groups = {
-            'name1': '',
-            'name2': '',
-            'generator': '',
-            'args': '',
-            'args2': ''
-        }
-        groups.update(res.groupdict())
-        # grab the name out of "name1 = function name2(foo)" preferring name1
-        generatorSymbol = '*' if (groups['generator'] or '').find('*') > -1 else ''
-        name = generatorSymbol + (groups['name1'] or groups['name2'] or '')
-        args = groups['args'] or groups['args2'] or ''
-
-        return (name, args, None)
-
-    def parseVar(self, line):
-        res = re.search(
-            #   var foo = blah,
-            #       foo = blah;
-            #   baz.foo = blah;
-            #   baz = {
-            #        foo : blah
-            #   }
-
-            '(?P<name>' + self.settings['varIdentifier'] + ')\s*[=:]\s*(?P<val>.*?)(?:[;,]|$)',
-            line
-        )
-        if not res:
-            return None
-
-        return (res.group('name'), res.group('val').strip())
-
-    def getArgInfo(self, arg):
-        if (re.search('^\{.*\}$', arg)):
-            subItems = splitByCommas(arg[1:-1])
-            prefix = 'options.'
-        else:
-            subItems = [arg]
-            prefix = ''
-
-        out = []
-        for subItem in subItems:
-            out.append((self.getArgType(subItem), prefix + self.getArgName(subItem)))
-
-        return out
-
-    def getArgType(self, arg):
-        parts = re.split(r'\s*=\s*', arg, 1)
-        # rest parameters
-        if parts[0].find('...') == 0:
-            return '...[type]'
-        elif len(parts) > 1:
-            return self.guessTypeFromValue(parts[1])
-
-    def getArgName(self, arg):
-        namePart = re.split(r'\s*=\s*', arg, 1)[0]
-
-        # check for rest parameters, eg: function (foo, ...rest) {}
-        if namePart.find('...') == 0:
-            return namePart[3:]
-        return namePart
-
-    def getFunctionReturnType(self, name, retval):
-        if name and name[0] == '*':
-            return None
-        return super(BespokeDocsJavascript, self).getFunctionReturnType(name, retval)
-
-    def getMatchingNotations(self, name):
-        out = super(BespokeDocsJavascript, self).getMatchingNotations(name)
-        if name and name[0] == '*':
-            # if '@returns' is preferred, then also use '@yields'. Otherwise, '@return' and '@yield'
-            yieldTag = '@yield' + ('s' if self.pluginSettings.get('return_tag', '_')[-1] == 's' else '')
-            description = ' ${1:[description]}' if self.pluginSettings.get('return_description', True) else ''
-            out.append({ 'tags': [
-                '%s {${1:[type]}}%s' % (yieldTag, description)
-            ]})
-        return out
-
-    def guessTypeFromValue(self, val):
-        lowerPrimitives = self.pluginSettings.get('lower_case_primitives') or False
-        shortPrimitives = self.pluginSettings.get('short_primitives') or False
-        if is_numeric(val):
-            return "number" if lowerPrimitives else "Number"
-        if val[0] == '"' or val[0] == "'":
-            return "string" if lowerPrimitives else "String"
-        if val[0] == '[':
-            return "Array"
-        if val[0] == '{':
-            return "Object"
-        if val == 'true' or val == 'false':
-            returnVal = 'Bool' if shortPrimitives else 'Boolean'
-            return returnVal.lower() if lowerPrimitives else returnVal
-        if re.match('RegExp\\b|\\/[^\\/]', val):
-            return 'RegExp'
-        if val.find('=>') > -1:
-            return 'function' if lowerPrimitives else 'Function'
-        if val[:4] == 'new ':
-            res = re.search('new (' + self.settings['fnIdentifier'] + ')', val)
-            return res and res.group(1) or None
-        return None
-
-
-class BespokeDocsCoffee(BespokeDocsParser):
-    def setupSettings(self):
-        identifier = '[a-zA-Z_$][a-zA-Z_$0-9]*'
-        self.settings = {
-            # curly brackets around the type information
-            'curlyTypes': True,
-            'typeTag': self.pluginSettings.get('override_js_var') or "type",
-            'typeInfo': True,
-            # technically, they can contain all sorts of unicode, but w/e
-            'varIdentifier': identifier,
-            'fnIdentifier': identifier,
-            'fnOpener': None,  # no multi-line function definitions for you, hipsters!
-            'commentCloser': '###',
-            'bool': 'Boolean',
-            'function': 'Function'
-        }
-
-    def parseFunction(self, line):
-        res = re.search(
-            #   fnName = function,  fnName : function
-            '(?:(?P<name>' + self.settings['varIdentifier'] + ')\s*[:=]\s*)?'
-            + '(?:\\((?P<args>[^()]*?)\\))?\\s*([=-]>)',
-            line
-        )
-        if not res:
-            return None
-
-        # grab the name out of "name1 = function name2(foo)" preferring name1
-        name = res.group('name') or ''
-        args = res.group('args')
-
-        return (name, args, None)
-
-    def parseVar(self, line):
-        res = re.search(
-            #   var foo = blah,
-            #       foo = blah;
-            #   baz.foo = blah;
-            #   baz = {
-            #        foo : blah
-            #   }
-
-            '(?P<name>' + self.settings['varIdentifier'] + ')\s*[=:]\s*(?P<val>.*?)(?:[;,]|$)',
-            line
-        )
-        if not res:
-            return None
+class BespokeDocsBenchmarkInsertCommand(sublime_plugin.WindowCommand):
+    """
+    Print to the console how long inserting a block with 10, 100 and 1000 fields takes, as a snippet and as
+    plain text with fields.
+    """
+    def run(self):
+        view = self.window.new_file()
+        view.set_scratch(True)
+        view.set_syntax_file('Packages/JavaScript/JavaScript.sublime-syntax')
+        self.window.run_command('show_panel', {'panel': 'console'})
+        print('%8s %14s %14s' % ('fields', 'snippet (ms)', 'fields (ms)'))
+        for count in (10, 100, 1000):
+            snippet = '/**\n * ${1:[description]}\n%s * $0\n */' % ''.join(
+                ' * @param {${%d:[type]}} arg%d\n' % (i + 2, i) for i in range(count - 1)
+            )
+            timings = []
+            for command in ('insert_snippet', 'bespoke_docs_insert_fields'):
+                start = time.time()
+                view.run_command(command, {'contents': snippet})
+                timings.append((time.time() - start) * 1000)
+                clearFields(view)
+                view.run_command('select_all')
+                view.run_command('right_delete')
+            print('%8d %14.1f %14.1f' % (count, timings[0], timings[1]))
+        view.close()
 
-        return (res.group('name'), res.group('val').strip())
-
-    def guessTypeFromValue(self, val):
-        lowerPrimitives = self.pluginSettings.get('lower_case_primitives') or False
-        if is_numeric(val):
-            return "number" if lowerPrimitives else "Number"
-        if val[0] == '"' or val[0] == "'":
-            return "string" if lowerPrimitives else "String"
-        if val[0] == '[':
-            return "Array"
-        if val[0] == '{':
-            return "Object"
-        if val == 'true' or val == 'false':
-            return "boolean" if lowerPrimitives else "Boolean"
-        if re.match('RegExp\\b|\\/[^\\/]', val):
-            return 'RegExp'
-        if val[:4] == 'new ':
-            res = re.search('new (' + self.settings['fnIdentifier'] + ')', val)
-            return res and res.group(1) or None
-        return None
 
 ############################################################33
 
@@ -814,6 +304,7 @@ class BespokeDocsCoffee(BespokeDocsParser):
 class BespokeDocsIndentCommand(sublime_plugin.TextCommand):
 
     def run(self, edit):
+        scheduler.interactive()
         v = self.view
         currPos = v.sel()[0].begin()
         currLineRegion = v.line(currPos)
@@ -847,25 +338,85 @@ class BespokeDocsIndentCommand(sublime_plugin.TextCommand):
         return None
 
 
+# a character which ends the whitespace and comment leader joined with a line
+reJoinStop = re.compile("[^ \\t*/#!]")
+
+
+def joinLines(text, starts, pattern):
+    """
+    Returns text with each line starting at one of starts (the ascending offsets of consecutive lines) joined
+    to the line after it: pattern, found from the start of each line, is replaced by a space, bottom up, each
+    search running over the lines already joined.
+    """
+    pieces = []  # the text after the current line, joined, last piece first
+    end = len(text)
+    for start in reversed(starts):
+        line = text[start:end]
+        end = start
+        # the joined text after the line, as far as the pattern can reach into it
+        ahead = ''
+        for piece in reversed(pieces):
+            ahead += piece
+            if reJoinStop.search(ahead):
+                break
+        match = pattern.search(line + ahead)
+        if match is None:
+            pieces.append(line)
+            continue
+        consumed = match.end() - len(line)
+        while consumed > 0:
+            piece = pieces.pop()
+            if len(piece) > consumed:
+                pieces.append(piece[consumed:])
+            consumed -= len(piece)
+        pieces.append(line[:match.start()] + ' ' + line[match.end():])
+    return text[:starts[0] if starts else end] + ''.join(reversed(pieces))
+
+
 class BespokeDocsJoinCommand(sublime_plugin.TextCommand):
     def run(self, edit):
         v = self.view
+        builder = editBuilder(v)
+        re_join = re.compile("[ \\t]*\\n[ \\t]*((?:\\*|//[!/]?|#)[ \\t]*)?")
+        # the lines of the selections, in groups of consecutive lines: the join of a line can run into the
+        # line after it, which may be the next selection's
+        starts = []
+        groupEnd = -1
         for sel in v.sel():
-            for lineRegion in reversed(v.lines(sel)):
-                v.replace(edit, v.find("[ \\t]*\\n[ \\t]*((?:\\*|//[!/]?|#)[ \\t]*)?", lineRegion.begin()), ' ')
+            for lineRegion in v.lines(sel):
+                if starts and lineRegion.begin() <= starts[-1]:
+                    continue
+                if starts and lineRegion.begin() > groupEnd:
+                    self.join(builder, starts, groupEnd, re_join)
+                    starts = []
+                starts.append(lineRegion.begin())
+                # the last line is joined with the one after it
+                groupEnd = v.line(min(v.size(), lineRegion.end() + 1)).end()
+        if starts:
+            self.join(builder, starts, groupEnd, re_join)
+        applyEdits(v, edit, builder)
+
+    def join(self, builder, starts, end, re_join):
+        begin = starts[0]
+        text = self.view.substr(sublime.Region(begin, end))
+        builder.replace(begin, end, joinLines(text, [start - begin for start in starts], re_join))
 
 
 class BespokeDocsDecorateCommand(sublime_plugin.TextCommand):
     def run(self, edit):
         v = self.view
+        builder = editBuilder(v)
         re_whitespace = re.compile("^(\\s*)//")
+        re_comment = re.compile("^(\\s*)//\\s*")
         v.run_command('move', {'by': 'characters', 'forward': False})
         v.run_command('expand_selection', {'to': 'scope'})
         for sel in v.sel():
             maxLength = 0
             lines = v.lines(sel)
+            texts = []
             for lineRegion in lines:
                 lineText = v.substr(lineRegion)
+                texts.append(lineText)
                 tabCount = lineText.count("\t")
                 leadingWS = len(re_whitespace.match(lineText).group(1))
                 leadingWS = leadingWS - tabCount
@@ -873,15 +424,18 @@ class BespokeDocsDecorateCommand(sublime_plugin.TextCommand):
 
             lineLength = maxLength - (leadingWS + tabCount)
             leadingWS = tabCount * "\t" + " " * leadingWS
-            v.insert(edit, sel.end(), leadingWS + " ╰─" + "─" * (lineLength - 2) + "┴" + "─" * (max(78, lineLength - 2) - lineLength) + "*/\n")
+            builder.insert(sel.begin(), "/* " + "─" * (lineLength - 2) + "╮\n")
 
-            for lineRegion in reversed(lines):
-                line = v.substr(lineRegion)
+            for lineRegion, line in zip(lines, texts):
                 rPadding = 1 + (maxLength - lineRegion.size())
-                v.replace(edit, lineRegion, leadingWS + re.sub("^(\\s*)//\\s*", "\\1 │ ", line) + (" " * rPadding) + "│\n")
-                # break
+                builder.replace(
+                    lineRegion.begin(), lineRegion.end(),
+                    leadingWS + re_comment.sub("\\1 │ ", line) + (" " * rPadding) + "│\n"
+                )
 
-            v.insert(edit, sel.begin(), "/* " + "─" * (lineLength - 2) + "╮\n")
+            # a selection ending mid line gets the border after that line rather than inside it
+            builder.insert(max(sel.end(), lines[-1].end()), leadingWS + " ╰─" + "─" * (lineLength - 2) + "┴" + "─" * (max(78, lineLength - 2) - lineLength) + "*/\n")
+        applyEdits(v, edit, builder)
 
 
 class BespokeDocsDeindent(sublime_plugin.TextCommand):
@@ -896,34 +450,36 @@ class BespokeDocsDeindent(sublime_plugin.TextCommand):
         v = self.view
         lineRegion = v.line(v.sel()[0])
         line = v.substr(lineRegion)
-        v.insert(edit, v.sel()[0].begin(), re.sub("^(\\s*)\\s\\*/.*", "\n\\1", line))
+        builder = editBuilder(v)
+        builder.insert(v.sel()[0].begin(), re.sub("^(\\s*)\\s\\*/.*", "\n\\1", line))
+        applyEdits(v, edit, builder)
 
 
 class BespokeDocsReparse(sublime_plugin.TextCommand):
     """
-    Reparse a docblock to make the fields 'active' again, so that pressing tab will jump to the next one
+    Reparse a docblock to make the fields 'active' again, so that pressing tab will jump to the next one.
+    The [bracketed] placeholders become fields in place (see `BespokeDocsInsertFieldsCommand`): the text of
+    the block is left alone.
     """
     def run(self, edit):
-        tabIndex = counter()
-
-        def tabStop(m):
-            return "${%d:%s}" % (next(tabIndex), m.group(1))
-
         v = self.view
         v.run_command('clear_fields')
-        sel = getDocBlockRegion(v, v.sel()[0].begin())
-
-        # escape string, so variables starting with $ won't be removed
-        text = escape(v.substr(sel))
-
-        # strip out leading spaces, since inserting a snippet keeps the indentation
-        text = re.sub("\\n\\s+\\*", "\n *", text)
-
-        # replace [bracketed] [text] with a tabstop
-        text = re.sub("(\\[.+?\\])", tabStop, text)
+        clearFields(v)
+        point = v.sel()[0].begin()
+        block = findDocBlock(v, point, getParser(v))
+        if block is None:
+            return
+        text = v.substr(block)
 
-        v.erase(edit, sel)
-        write(v, text)
+        fields = [
+            sublime.Region(block.begin() + match.start(), block.begin() + match.end())
+            for match in re.finditer("\\[.+?\\]", text)
+        ]
+        if not fields:
+            return
+        v.add_regions(FIELDS_KEY, fields, '', '', sublime.HIDDEN)
+        v.add_regions(EXIT_KEY, [sublime.Region(block.end())], '', '', sublime.HIDDEN)
+        selectField(v, 0)
 
 
 class BespokeDocsTrimAutoWhitespace(sublime_plugin.TextCommand):
@@ -940,14 +496,21 @@ class BespokeDocsTrimAutoWhitespace(sublime_plugin.TextCommand):
         v.replace(edit, lineRegion, re.sub("^(\\s*\\*)\\s*$", "\\1\n\\1" + (" " * spaces), line))
 
 
+# view id -> hashes of the blocks known to be wrapped already, with the wrap length, tab size and settings used
+wrappedBlocks = {}
+
+
 class BespokeDocsWrapLines(sublime_plugin.TextCommand):
     """
     Reformat description text inside a comment block to wrap at the correct length.
     Wrap column is set by the first ruler (set in Default.sublime-settings), or 80 by default.
     Shortcut Key: alt+q
+
+    With `blocks`, wraps several blocks of the view at once, in a single edit: "all" of them, those
+    touching the "selections", or those "modified" since the file was last saved.
     """
 
-    def run(self, edit):
+    def run(self, edit, blocks=None):
         v = self.view
         viewSettings = v.settings()
         rulers = viewSettings.get('rulers')
@@ -956,100 +519,522 @@ class BespokeDocsWrapLines(sublime_plugin.TextCommand):
         pluginSettings = sublime.load_settings("BespokeDocs.sublime-settings")
 
         wrapLength = rulers[0] if (len(rulers) > 0) else 80
-        numIndentSpaces = max(0, pluginSettings.get("indentation_spaces", 1))
-        indentSpaces = " " * numIndentSpaces
-        indentSpacesSamePara = " " * max(0, pluginSettings.get("indentation_spaces_same_para", numIndentSpaces))
-        spacerBetweenSections = pluginSettings.get("spacer_between_sections") == True
-        spacerBetweenDescriptionAndTags = pluginSettings.get("spacer_between_sections") == "after_description"
-
-        dbRegion = getDocBlockRegion(v, v.sel()[0].begin())
-
-        # find the first word
-        startPoint = v.find(r"\n\s*\* ", dbRegion.begin()).begin()
-        # find the first tag, or the end of the comment
-        endPoint = v.find(r"\s*\n\s*\*(/)", dbRegion.begin()).begin()
-
-        # replace the selection with this ^ new selection
-        v.sel().clear()
-        v.sel().add(sublime.Region(startPoint, endPoint))
-        # get the description text
-        text = v.substr(v.sel()[0])
-
-        # find the indentation level
-        indentation = len(re.sub('\t', ' ' * tabSize, re.search("\n(\\s*\\*)", text).group(1)))
-        wrapLength -= indentation - tabSize
-
-        # join all the lines, collapsing "empty" lines
-        text = re.sub("\n(\\s*\\*\\s*\n)+", "\n\n", text)
-
-        def wrapPara(para):
-            para = re.sub("(\n|^)\\s*\\*\\s*", " ", para)
-
-            # split the paragraph into words
-            words = para.strip().split(' ')
-            text = '\n'
-            line = ' *' + indentSpaces
-            lineTagged = False  # indicates if the line contains a doc tag
-            paraTagged = False  # indicates if this paragraph contains a doc tag
-            lineIsNew = True
-            tag = ''
-
-            # join all words to create lines, no longer than wrapLength
-            for i, word in enumerate(words):
-                if not word and not lineTagged:
-                    continue
 
-                if lineIsNew and word[0] == '@':
-                    lineTagged = True
-                    paraTagged = True
-                    tag = word
-
-                if len(line) + len(word) >= wrapLength - 1:
-                    # appending the word to the current line would exceed its
-                    # length requirements
-                    text += line.rstrip() + '\n'
-                    line = ' *' + indentSpacesSamePara + word + ' '
-                    lineTagged = False
-                    lineIsNew = True
-                else:
-                    line += word + ' '
-
-                lineIsNew = False
-
-            text += line.rstrip()
-            return {'text':       text,
-                    'lineTagged': lineTagged,
-                    'tagged':     paraTagged,
-                    'tag':        tag}
-        # split the text into paragraphs, where each paragraph is eighter
-        # defined by an empty line or the start of a doc parameter
-        paragraphs = re.split('\n{2,}|\n\\s*\\*\\s*(?=@)', text)
-        wrappedParas = []
-        text = ''
-        for p, para in enumerate(paragraphs):
-            # wrap the lines in the current paragraph
-            wrappedParas.append(wrapPara(para))
-
-        # combine all the paragraphs into a single piece of text
-        for i in range(0, len(wrappedParas)):
-            para = wrappedParas[i]
-            last = i == len(wrappedParas) - 1
-
-            nextIsTagged = not last and wrappedParas[i + 1]['tagged']
-            nextIsSameTag = nextIsTagged and para['tag'] == wrappedParas[i + 1]['tag']
-
-            if last or (para['lineTagged'] or nextIsTagged) and \
-                    not (spacerBetweenSections and not nextIsSameTag) and \
-                    not (not para['lineTagged'] and nextIsTagged and spacerBetweenDescriptionAndTags):
-                text += para['text']
+        if blocks is None:
+            dbRegion = getDocBlockRegion(v, v.sel()[0].begin())
+            spans = [(dbRegion.begin(), dbRegion.end())]
+            # from the start of the line, for the indentation of the block
+            offset = v.line(dbRegion.begin()).begin()
+            text = v.substr(sublime.Region(offset, dbRegion.end()))
+        else:
+            text = v.substr(sublime.Region(0, v.size()))
+            spans = self.findBlocks(text, blocks)
+            offset = 0
+
+        # blocks wrapped under other settings are wrapped again
+        layout = (wrapLength, tabSize) + tuple(pluginSettings.get(name) for name in WRAP_SETTINGS)
+        known = wrappedBlocks.setdefault(v.id(), set())
+        if len(known) > 10000:
+            known.clear()
+        builder = editBuilder(v)
+        # blocks are wrapped bottom up, as one edit: a single undo step
+        for begin, end in spans:
+            blockText = text[begin - offset:end - offset]
+            key = hash((blockText, layout))
+            if key in known:
+                continue
+            lineStart = text.rfind('\n', 0, begin - offset) + 1
+            indent = re.match('[ \t]*', text[lineStart:]).group(0)
+            wrapped = wrapBlock(blockText, indent, wrapLength, tabSize, pluginSettings)
+            if wrapped is not None and wrapped != blockText:
+                builder.replace(begin, end, wrapped)
+                known.add(hash((wrapped, layout)))
             else:
-                text += para['text'] + '\n *'
+                known.add(key)
+        applyEdits(v, edit, builder)
+
+    def findBlocks(self, text, which):
+        """ the (begin, end) of the blocks in text to wrap """
+        spans = [(block.begin, block.end) for block in scanText(text)]
+        if which == 'selections':
+            selections = list(self.view.sel())
+            return [
+                (begin, end) for begin, end in spans
+                if any(sel.intersects(sublime.Region(begin, end)) or sel.empty() and begin <= sel.a <= end
+                       for sel in selections)
+            ]
+        if which == 'modified':
+            if not self.view.is_dirty():
+                return []
+            path = self.view.file_name()
+            try:
+                saved = readSource(path) if path else ''
+            except (IOError, OSError):
+                saved = ''
+            savedBlocks = set(block.text for block in scanText(saved))
+            return [(begin, end) for begin, end in spans if text[begin:end] not in savedBlocks]
+        return spans
+
+
+class BespokeDocsCanonicalTags(sublime_plugin.TextCommand):
+    """
+    Rewrite the synonyms of tags in the docblocks of the view to their canonical name (eg: `@arg` to `@param`),
+    as a single edit.
+    """
+    def run(self, edit):
+        v = self.view
+        builder = editBuilder(v)
+        count = 0
+        for begin, end, tag in iterSynonyms(v.substr(sublime.Region(0, v.size()))):
+            builder.replace(begin, end, tag)
+            count += 1
+        applyEdits(v, edit, builder)
+        sublime.status_message('BespokeDocs: rewrote %d tag%s' % (count, '' if count == 1 else 's'))
+
+
+class BespokeDocsCanonicalTagsProjectCommand(sublime_plugin.WindowCommand):
+    """
+    Rewrite the synonyms of tags in every file of the project, in the background: open files are edited in
+    their view, the others rewritten on disk.
+    """
+    def run(self):
+        window = self.window
+        folders = window.folders()
+        scheduler.submit(('canonical_tags', window.id()), lambda: canonicalizeProject(window, folders), NORMAL)
+
+
+def canonicalizeProject(window, folders):
+    files = tags = count = 0
+    for path in iterSourceFiles(folders):
+        view = window.find_open_file(path)
+        if view is not None:
+            # counted here, rewritten by the command of the view
+            rewritten = len(list(iterSynonyms(view.substr(sublime.Region(0, view.size())))))
+            if rewritten:
+                sublime.set_timeout(lambda view=view: view.run_command('bespoke_docs_canonical_tags'))
+        else:
+            try:
+                text, canonical, rewritten = canonicalizePath(path)
+            except (IOError, OSError):
+                continue
+        if rewritten:
+            files += 1
+            tags += rewritten
+        count += 1
+        if count % 20 == 0:
+            yield
+    message = 'BespokeDocs: rewrote %d tag%s in %d file%s' % (
+        tags, '' if tags == 1 else 's', files, '' if files == 1 else 's'
+    )
+    # after the messages of the views
+    sublime.set_timeout(lambda: sublime.status_message(message))
+
+
+# the tag records of the blocks restyled so far, by block text
+restyleCache = RecordCache()
+
+
+class BespokeDocsRestyle(sublime_plugin.TextCommand):
+    """
+    Render the docblocks of the view again with the current layout settings (`align_tags`, `per_section_indent`,
+    `spacer_between_sections`, `indentation_spaces`...), as new blocks are rendered, in a single edit.
+    """
+    def run(self, edit):
+        v = self.view
+        pluginSettings = sublime.load_settings("BespokeDocs.sublime-settings")
+        builder = editBuilder(v)
+        text = v.substr(sublime.Region(0, v.size()))
+        for begin, end, blockText, restyled, rows in iterRestyled(text, getParser(v), pluginSettings,
+                                                                  restyleCache.get):
+            # restyling again after another change of the settings won't parse the block
+            restyleCache.put(restyled, rows)
+            if restyled != blockText:
+                builder.replace(begin, end, restyled)
+        count = len(builder)
+        applyEdits(v, edit, builder)
+        sublime.status_message('BespokeDocs: restyled %d docblock%s' % (count, '' if count == 1 else 's'))
+
+
+class BespokeDocsRestyleProjectCommand(sublime_plugin.WindowCommand):
+    """
+    Restyle the docblocks of every file of the project, in the background: open files are edited in their
+    view, the others rewritten on disk.
+    """
+    def run(self):
+        window = self.window
+        folders = window.folders()
+        scheduler.submit(('restyle', window.id()), lambda: restyleProject(window, folders), NORMAL)
+
+
+def restyleProject(window, folders):
+    pluginSettings = sublime.load_settings("BespokeDocs.sublime-settings")
+    files = count = 0
+    for path in iterSourceFiles(folders):
+        view = window.find_open_file(path)
+        if view is not None:
+            sublime.set_timeout(lambda view=view: view.run_command('bespoke_docs_restyle'))
+            continue
+        try:
+            text = readExactSource(path)
+            if text is None:
+                continue
+            restyled, blocks = restyleText(path, text, pluginSettings, restyleCache.get)
+            for blockText, rows in blocks.items():
+                restyleCache.put(blockText, rows)
+            if restyled != text:
+                writeSource(path, restyled)
+                files += 1
+        except (IOError, OSError):
+            continue
+        count += 1
+        if count % 20 == 0:
+            yield
+    sublime.status_message('BespokeDocs: restyled the docblocks of %d file%s' % (files, '' if files == 1 else 's'))
+
+
+class WindowIndexes(object):
+    """
+    An index of the files in the folders of each window, made by newIndex and filled with indexPath(path,
+    parser) for each file. Saved files are indexed again with indexText(path, text, parser).
+    """
+
+    def __init__(self, name, newIndex, indexPath, indexText):
+        self.name = name
+        self.newIndex = newIndex
+        self.indexPath = indexPath
+        self.indexText = indexText
+        self.indexes = {}  # window id -> index
+
+    def get(self, window):
+        """ the index of window, which starts being built in the background the first time it's asked for """
+        index = self.indexes.get(window.id())
+        if index is None:
+            index = self.indexes[window.id()] = self.newIndex()
+            folders = window.folders()
+            scheduler.submit(('%s_index' % self.name, window.id()), lambda: self.build(index, folders), BACKGROUND)
+        return index
+
+    def existing(self, window):
+        """ the index of window if it was asked for before, or None """
+        return self.indexes.get(window.id())
+
+    def build(self, index, folders):
+        """ index the files under folders, a few at a time: each step is a chance for other tasks to run """
+        pluginSettings = sublime.load_settings("BespokeDocs.sublime-settings")
+        count = 0
+        for path in iterSourceFiles(folders):
+            try:
+                index.update(path, self.indexPath(path, getParserForFile(path, pluginSettings)))
+            except (IOError, OSError):
+                continue
+            count += 1
+            self.progress(index, count)
+            if count % 20 == 0:
+                yield
+        index.ready = True
+        self.progress(index, count)
+
+    def progress(self, index, count):
+        """ called after each file indexed by `build`, and once the index is ready """
+
+    def update(self, view):
+        """ index view again after it's saved, if its window has an index """
+        window = view.window()
+        index = window and self.indexes.get(window.id())
+        path = view.file_name()
+        if index is None or not path or not path.endswith(SOURCE_EXTENSIONS):
+            return
+        changeCount = view.change_count()
+
+        def reindex():
+            pluginSettings = sublime.load_settings("BespokeDocs.sublime-settings")
+            text = view.substr(sublime.Region(0, view.size()))
+            index.update(path, self.indexText(path, text, getParserForFile(path, pluginSettings)))
+
+        # a view edited since it was saved will be indexed when it's saved again
+        scheduler.submit(
+            ('%s_update' % self.name, view.id()), reindex, NORMAL, delay=0.5,
+            isCurrent=lambda: view.is_valid() and view.change_count() == changeCount
+        )
+
+
+class SearchIndexes(WindowIndexes):
+
+    def progress(self, index, count):
+        if index.ready:
+            sublime.status_message('BespokeDocs: indexed %d docblocks in %d files' % (len(index), count))
+        elif count % 1000 == 0:
+            sublime.status_message('BespokeDocs: indexed the docblocks of %d files' % count)
+
+
+# the SearchIndex of the docblocks in the folders of each window
+searchIndexes = SearchIndexes('search', SearchIndex, indexPath, indexText)
+
+
+class BespokeDocsSearchCommand(sublime_plugin.WindowCommand):
+    """
+    Find the symbols whose docblocks mention some words, tags (eg: @deprecated) or name prefixes.
+    """
+    lastQuery = ''
+
+    def run(self):
+        searchIndexes.get(self.window)
+        self.window.show_input_panel('Search docblocks:', BespokeDocsSearchCommand.lastQuery, self.search, None, None)
+
+    def search(self, query):
+        BespokeDocsSearchCommand.lastQuery = query
+        index = searchIndexes.get(self.window)
+        self.results = index.search(query)
+        if not index.ready:
+            sublime.status_message('BespokeDocs: still indexing, results may be missing')
+        if not self.results:
+            sublime.status_message('BespokeDocs: no docblocks match "%s"' % query)
+            return
+
+        items = []
+        for result in self.results:
+            location = '%s:%d' % (self.relativePath(result['path']), result['row'] + 1)
+            items.append([result['name'] or location, result['summary'] or location])
+        self.window.show_quick_panel(items, self.open)
+
+    def relativePath(self, path):
+        for folder in self.window.folders():
+            if path.startswith(folder + '/') or path.startswith(folder + '\\'):
+                return path[len(folder) + 1:]
+        return path
+
+    def open(self, i):
+        if i < 0:
+            return
+        result = self.results[i]
+        self.window.open_file('%s:%d' % (result['path'], result['row'] + 1), sublime.ENCODED_POSITION)
+
+
+class BespokeDocsSearchListener(sublime_plugin.EventListener):
+
+    def on_post_save(self, view):
+        searchIndexes.update(view)
+
+
+# the CallSiteIndex of the folders of each window: until it's complete, parameters are typed from the calls seen
+# so far
+callSiteIndexes = WindowIndexes('call_site', CallSiteIndex,
+                                lambda path, parser: findCallSites(readSource(path), parser),
+                                lambda path, text, parser: findCallSites(text, parser))
+
+
+class BespokeDocsCallSiteListener(sublime_plugin.EventListener):
+
+    def on_post_save(self, view):
+        callSiteIndexes.update(view)
 
-        text = escape(text)
-        write(v, text)
+
+# the HoverIndex of the docblocks in the folders of each window
+hoverIndexes = WindowIndexes('hover', HoverIndex, describePath, describeText)
+
+
+class BespokeDocsHoverListener(sublime_plugin.EventListener):
+    """
+    Show the docblock of the symbol under the mouse in a popup, from the hover index of the window (see
+    `hover_docs`): hovering never reads a file.
+    """
+
+    def on_activated_async(self, view):
+        # the index is ready by the time the user hovers something
+        window = view.window()
+        if window and self.enabled(view):
+            hoverIndexes.get(window)
+
+    def on_hover(self, view, point, hover_zone):
+        window = view.window()
+        if hover_zone != sublime.HOVER_TEXT or not window or not self.enabled(view) or \
+                view.scope_name(point).find('comment') > -1:
+            return
+        name = view.substr(view.word(point))
+        entries = hoverIndexes.get(window).get(name) if re.match('[a-zA-Z_$][a-zA-Z_$0-9]*$', name) else None
+        if not entries:
+            return
+        # the definitions in this file first
+        path = view.file_name()
+        entries.sort(key=lambda entry: entry[0] != path)
+
+        def relativePath(path):
+            for folder in window.folders():
+                if path.startswith(folder + '/') or path.startswith(folder + '\\'):
+                    return path[len(folder) + 1:]
+            return path
+
+        def navigate(location):
+            view.hide_popup()
+            window.open_file(location, sublime.ENCODED_POSITION)
+        view.show_popup(renderHover(name, entries, relativePath), sublime.HIDE_ON_MOUSE_MOVE_AWAY, point,
+                        max_width=640, on_navigate=navigate)
+
+    def on_post_save(self, view):
+        hoverIndexes.update(view)
+
+    def enabled(self, view):
+        return sublime.load_settings("BespokeDocs.sublime-settings").get('hover_docs') and \
+            re.search('\\bsource\\.(?:js|coffee)\\b', view.scope_name(0)) is not None
+
+
+# the parameters of the signatures following the blocks completions were asked in
+paramCompletions = ParamCompletions()
+
+
+class BespokeDocsParamCompletionsListener(sublime_plugin.EventListener):
+    """
+    Complete the names of the parameters not documented yet after `@param` (or a synonym) in a docblock, from
+    the definition following the block.
+    """
+
+    def on_query_completions(self, view, prefix, locations):
+        point = locations[0]
+        if len(locations) != 1 or view.scope_name(point).find('comment.block') == -1:
+            return None
+        linePrefix = view.substr(sublime.Region(view.line(point).begin(), point))
+        if '@' not in linePrefix:
+            return None
+        pluginSettings = sublime.load_settings("BespokeDocs.sublime-settings")
+        if not pluginSettings.get('param_completions'):
+            return None
+        parser = getParser(view)
+        if pluginSettings.get('call_site_types') and view.window():
+            parser.setCallSites(callSiteIndexes.get(view.window()))
+        block = findDocBlock(view, point, parser)
+        if block is None:
+            return None
+        definition = parser.getDefinition(view, view.line(block.end()).end() + 1)
+        completions = paramCompletions.complete(parser, definition, view.substr(block), linePrefix)
+        if completions is None:
+            return None
+        return ([list(completion) for completion in completions], sublime.INHIBIT_WORD_COMPLETIONS)
+
+
+# the blocks of the undocumented definitions in view, rendered ahead of time
+precomputed = PrecomputedBlocks()
+
+# view id -> (change count, visible region) of the last pass over it
+precomputedPasses = {}
+
+
+def precomputeBlocks(view):
+    """
+    Render the blocks which `BespokeDocsCommand` would insert above the undocumented definitions in the
+    visible part of view, as if the user had typed `/**` on a line of its own before them.
+    """
+    start = time.time()
+    pluginSettings = sublime.load_settings("BespokeDocs.sublime-settings")
+    region = view.line(view.visible_region())
+    parser = getParser(view)
+    window = view.window()
+    if pluginSettings.get('call_site_types') and window:
+        # activating a view doesn't start indexing the project: the blocks are keyed on the index version,
+        # and a new index has the same as none
+        parser.setCallSites(callSiteIndexes.existing(window))
+    renderer = DocBlockRenderer(pluginSettings, parser.settings)
+
+    for offset in undocumentedDefinitions(parser, view.substr(region)):
+        definitionStart = region.begin() + offset
+        line = parser.getDefinition(view, definitionStart)
+        bodyText = readBodyText(view, parser, definitionStart)
+        key = blockKey(parser, line, bodyText)
+        if (view.id(), key) in precomputed:
+            continue
+        renderStart = time.time()
+        parser.setBody(parser.scanBody(bodyText) if bodyText is not None else None)
+        snippet = renderer.render(parser.parse(line))
+        precomputed.put(view.id(), key, snippet, time.time() - renderStart)
+    precomputed.recordPass(time.time() - start)
+
+
+class BespokeDocsPrecomputeListener(sublime_plugin.EventListener):
+    """
+    Render the blocks of the definitions in view while the editor is idle, so that opening a docblock only
+    has to insert one (see `precompute_blocks`).
+    """
+
+    def on_activated_async(self, view):
+        self.schedule(view)
+
+    def on_selection_modified_async(self, view):
+        self.schedule(view)
+
+    def on_modified_async(self, view):
+        # the pass restarts its delay at each edit
+        self.schedule(view)
+
+    def on_close(self, view):
+        precomputed.discard(view.id())
+        precomputedPasses.pop(view.id(), None)
+
+    def schedule(self, view):
+        pluginSettings = sublime.load_settings("BespokeDocs.sublime-settings")
+        if not pluginSettings.get('precompute_blocks') or usesClock(pluginSettings) or \
+                not re.search('\\bsource\\.(?:js|coffee)\\b', view.scope_name(0)):
+            return
+        changeCount = view.change_count()
+        visible = view.visible_region()
+        state = (changeCount, visible.begin(), visible.end())
+        if precomputedPasses.get(view.id()) == state:
+            return
+        precomputedPasses[view.id()] = state
+        scheduler.submit(
+            ('precompute', view.id()), lambda: precomputeBlocks(view), BACKGROUND, delay=0.5,
+            isCurrent=lambda: view.is_valid() and view.change_count() == changeCount
+        )
+
+
+class BespokeDocsPrecomputeStatsCommand(sublime_plugin.WindowCommand):
+    """
+    Print how often opening a docblock found it rendered ahead of time to the console.
+    """
+    def run(self):
+        self.window.run_command('show_panel', {'panel': 'console'})
+        stats = precomputed.stats()
+        print('%8s %8s %9s %9s %16s %8s %14s' % ('hits', 'misses', 'hit rate', 'rendered', 'per block (ms)',
+                                                  'passes', 'per pass (ms)'))
+        print('%8d %8d %8.1f%% %9d %16.2f %8d %14.2f' % (
+            stats['hits'], stats['misses'], stats['hitRate'] * 100, stats['computed'], stats['saved'] * 1000,
+            stats['passes'], stats['passTime'] / stats['passes'] * 1000 if stats['passes'] else 0
+        ))
+
+
+class BespokeDocsInteractionListener(sublime_plugin.EventListener):
+    """
+    Background steps (indexing, precomputing blocks) hold off while the user types.
+    """
+
+    def on_modified_async(self, view):
+        scheduler.interactive()
+
+
+class BespokeDocsSchedulerStatsCommand(sublime_plugin.WindowCommand):
+    """
+    Print how long the background tasks have taken to the console.
+    """
+    def run(self):
+        self.window.run_command('show_panel', {'panel': 'console'})
+        print('%-16s %9s %9s %9s %9s %10s %10s' % ('task', 'completed', 'cancelled', 'coalesced', 'failed',
+                                               'total (s)', 'max (ms)'))
+        for name, counters in sorted(scheduler.stats().items()):
+            print('%-16s %9d %9d %9d %9d %10.2f %10.1f' % (
+                name, counters['completed'], counters['cancelled'], counters['coalesced'], counters['failed'],
+                counters['total'], counters['max'] * 1000
+            ))
+
+
+def plugin_unloaded():
+    scheduler.shutdown()
+    pluginSettings = sublime.load_settings("BespokeDocs.sublime-settings")
+    pluginSettings.clear_on_change('bespoke_docs_precompute')
+    pluginSettings.clear_on_change('bespoke_docs_completions')
 
 
 def plugin_loaded():
     global s
     s = sublime.load_settings("BespokeDocs.sublime-settings")
+    # blocks rendered ahead of time follow the settings they were rendered with
+    s.add_on_change('bespoke_docs_precompute', precomputed.clear)
+    s.add_on_change('bespoke_docs_completions', paramCompletions.clear)
     sublime.active_window().active_view().settings().set("bespoke_docs_development_mode", s.get("development_mode"))
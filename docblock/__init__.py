@@ -0,0 +1,5 @@
+"""
+Editor independent parts of BespokeDocs.
+
+Nothing in this package imports `sublime`, so it can be used by the plugin as well as by headless tools.
+"""
@@ -0,0 +1,280 @@
+"""
+Reading the body of a function, to infer what it returns.
+
+The scanners take the code from the definition on and stop at the end of the function body (or of the
+text they were given, which callers cut to `body_scan_limit` characters). They return a dict, or None
+when there is no body to read:
+
+    {'length': 120, 'complete': True, 'returns': ['"foo"', '42'], 'generator': False, 'async': False}
+
+`returns` holds the expression of each `return` with a value (and, in CoffeeScript, of the implicit
+return), leaving out those of nested functions. `length` is the number of characters the scan covered.
+"""
+import collections
+import hashlib
+import re
+
+
+reJsToken = re.compile(
+    r'//[^\n]*'
+    r'|/\*[\s\S]*?(?:\*/|$)'
+    r'|"(?:\\.|[^"\\\n])*"?'
+    r"|'(?:\\.|[^'\\\n])*'?"
+    r'|`(?:\\[\s\S]|[^`\\])*`?'
+    # a regex literal, or a division: told apart by what precedes it
+    r'|/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/'
+    r'|=>|[{}()\[\];]'
+    r'|\b(?:return|yield|async|function)\b'
+)
+reReturnValue = re.compile(r'[ \t]*([^;\n]*)')
+reWordBefore = re.compile(r'([\w$]+)\s*$')
+reSpace = re.compile(r'\s*')
+
+# a `{` after `keyword (...)` opens a block, after `name (...)` a method
+CONTROL_KEYWORDS = ('if', 'for', 'while', 'switch', 'catch', 'with')
+REGEX_PRECEDERS = '(,=:[!&|?{};+-*%<>~^'
+
+reCoffeeArrow = re.compile(r'[-=]>')
+reCoffeeReturn = re.compile(r'return\b\s*(.*)')
+reCoffeeYield = re.compile(r'\byield\b')
+reCoffeeAwait = re.compile(r'\bawait\b')
+reCoffeeComment = re.compile(r'\s+#(?!\{).*$')
+reCoffeeNoValue = re.compile(r'(?:throw|class)\b')
+
+
+def returnValue(text, pos):
+    """ the expression returned by the `return` ending at pos, or '' """
+    value = reReturnValue.match(text, pos).group(1)
+    if '//' in value:
+        value = value[:value.index('//')]
+    return value.strip().rstrip('}').strip()
+
+
+def isRegex(text, pos, prev):
+    if prev in ('return', 'yield'):
+        return True
+    i = pos - 1
+    while i >= 0 and text[i] in ' \t\r\n':
+        i -= 1
+    return i < 0 or text[i] in REGEX_PRECEDERS
+
+
+def isFunctionParen(text, pos):
+    """ whether the parenthesis at pos holds the parameters of a function, rather than a condition """
+    word = reWordBefore.search(text, max(0, pos - 40), pos)
+    return bool(word) and word.group(1) not in CONTROL_KEYWORDS
+
+
+def scanBraces(text, final=True):
+    """
+    Scan a javascript function: its parameters, then its body, up to the matching closing brace.
+    """
+    info = {'length': len(text), 'complete': False, 'returns': [], 'generator': False, 'async': False}
+    pos = 0
+    brackets = []  # (bracket, offset) of the open parentheses and square brackets
+    lastParen = -1  # offset of the parenthesis closed by the last ')'
+    prev = ''  # the last token, other than comments
+    depth = 0  # brace depth inside of the body, 0 until it opens
+    nested = []  # the brace depths at which nested functions open
+    pending = None  # a `function` or `=>` whose body hasn't opened yet
+
+    while True:
+        m = reJsToken.search(text, pos)
+        if not m:
+            break
+        token = m.group(0)
+        pos = m.end()
+        first = token[0]
+
+        if token[:2] in ('//', '/*'):
+            continue
+        if first == '/':
+            if not isRegex(text, m.start(), prev):
+                pos = m.start() + 1
+                prev = '/'
+            continue
+        if pending == '=>' and token != '{':
+            pending = None
+
+        if first in '"\'`':
+            pass
+        elif first in '([':
+            brackets.append((first, m.start()))
+        elif first in ')]':
+            if brackets:
+                bracket, offset = brackets.pop()
+                if first == ')':
+                    lastParen = offset
+        elif token == '{':
+            if depth:
+                depth += 1
+                if pending or (prev == ')' and isFunctionParen(text, lastParen)):
+                    nested.append(depth)
+                pending = None
+            elif not brackets and prev in (')', '=>'):
+                depth = 1
+        elif token == '}':
+            if depth:
+                if nested and nested[-1] == depth:
+                    nested.pop()
+                depth -= 1
+                if not depth:
+                    info['length'] = pos
+                    info['complete'] = True
+                    return info
+        elif token == '=>':
+            if depth:
+                pending = token
+            elif not brackets and text[reSpace.match(text, pos).end():][:1] != '{':
+                # an arrow function with an expression for its body
+                value = returnValue(text, pos)
+                info['returns'] = [value] if value else []
+                info['length'] = reReturnValue.match(text, pos).end()
+                info['complete'] = True
+                return info
+        elif token == 'function':
+            if depth:
+                pending = token
+        elif token == 'async':
+            if not depth:
+                info['async'] = True
+        elif token == ';':
+            if not depth and not brackets:
+                # the statement ended before any body opened
+                return None
+        elif depth and not nested:
+            if token == 'return':
+                value = returnValue(text, pos)
+                if value:
+                    info['returns'].append(value)
+            elif token == 'yield':
+                info['generator'] = True
+        prev = token
+
+    return info if depth else None
+
+
+def indentation(line):
+    return len(line) - len(line.lstrip())
+
+
+def scanIndented(text, final=True):
+    """
+    Scan a coffeescript function: the rest of its line, then the lines indented under it. `final` tells
+    whether text runs to the end of the file, rather than having been cut short.
+    """
+    lines = text.split('\n')
+    arrow = reCoffeeArrow.search(lines[0])
+    if not arrow:
+        return None
+    info = {'length': len(lines[0]), 'complete': True, 'returns': [], 'generator': False, 'async': False}
+
+    rest = reCoffeeComment.sub('', lines[0][arrow.end():]).strip()
+    if rest:
+        # a one line function
+        returned = reCoffeeReturn.match(rest)
+        info['returns'] = [returned.group(1)] if returned else [rest]
+        info['returns'] = [value for value in info['returns'] if value]
+        return info
+
+    base = indentation(lines[0])
+    bodyIndent = None
+    nested = []  # the indentation of the lines which opened nested functions
+    last = None  # the last statement at the indentation of the body
+    inComment = False
+    offset = len(lines[0]) + 1
+    for i in range(1, len(lines)):
+        line = lines[i]
+        stripped = line.strip()
+        if inComment or stripped.startswith('###'):
+            if stripped.startswith('###'):
+                inComment = not inComment and not (len(stripped) > 3 and stripped.endswith('###'))
+            offset += len(line) + 1
+            continue
+        if not stripped or stripped[0] == '#':
+            offset += len(line) + 1
+            continue
+        indent = indentation(line)
+        if indent <= base:
+            # the scan covers what ended the body
+            info['length'] = offset + indent + 1
+            break
+        if i == len(lines) - 1 and not final:
+            # this line may have been cut short
+            info['complete'] = False
+            break
+        info['length'] = offset + len(line)
+        offset += len(line) + 1
+
+        while nested and indent <= nested[-1]:
+            nested.pop()
+        if nested:
+            continue
+        if bodyIndent is None:
+            bodyIndent = indent
+
+        code = reCoffeeComment.sub('', stripped).strip()
+        arrow = reCoffeeArrow.search(code)
+        if arrow:
+            nested.append(indent)
+            code = code[:arrow.start()].strip()
+        if indent == bodyIndent:
+            last = code
+        returned = reCoffeeReturn.match(code)
+        if returned and returned.group(1):
+            info['returns'].append(returned.group(1))
+        if reCoffeeYield.search(code):
+            info['generator'] = True
+        if reCoffeeAwait.search(code):
+            info['async'] = True
+    else:
+        info['length'] = len(text)
+        info['complete'] = final
+
+    if bodyIndent is None:
+        return None
+    if info['complete'] and last and not reCoffeeReturn.match(last) and not reCoffeeNoValue.match(last):
+        # the value of the last statement is returned
+        info['returns'].append(last)
+    return info
+
+
+class BodyScanner(object):
+    """
+    A scanner with a cache of its recent results. Results are found again by the hash of the code they
+    covered, so an unchanged function isn't scanned twice, whatever changed around it. Only complete
+    scans are kept.
+    """
+
+    def __init__(self, scan, size=64):
+        self.scan = scan
+        self.size = size
+        self.lengths = {}  # first line of a definition -> length of its last scan
+        self.results = collections.OrderedDict()
+
+    def key(self, text):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def __call__(self, text, final=True):
+        head = text[:text.find('\n') + 1] or text
+        length = self.lengths.get(head)
+        if length is not None and length <= len(text):
+            key = self.key(text[:length])
+            if key in self.results:
+                self.results.move_to_end(key)
+                return self.results[key]
+
+        info = self.scan(text, final)
+        # a result is only reused when what decided it is known to be part of its key
+        if info is not None and info['complete'] and info['length'] < len(text):
+            self.lengths[head] = info['length']
+            self.results[self.key(text[:info['length']])] = info
+            while len(self.results) > self.size:
+                self.results.popitem(last=False)
+            if len(self.lengths) > self.size * 4:
+                self.lengths.clear()
+        return info
+
+
+braces = BodyScanner(scanBraces)
+indented = BodyScanner(scanIndented)
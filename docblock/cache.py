@@ -0,0 +1,145 @@
+"""
+A persistent cache of per-file analysis results, stored in a local SQLite database.
+
+Entries are keyed by path, size, modification time and a hash of the content. A file whose size and
+mtime are unchanged is served from the cache after a single `stat`, without being opened. When only
+the mtime changed (eg: after a checkout) the content hash decides, and the entry is refreshed.
+
+Each analysis stores its results under its own namespace, which should change whenever the analysis
+(or the settings it depends on) does: `settingsNamespace` takes a version, to bump whenever the results
+of the code change.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from .project import imapBounded
+
+
+SCHEMA_VERSION = 1
+
+# entries which haven't been used for this many runs are pruned
+KEEP_RUNS = 5
+
+
+def hashContent(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def settingsNamespace(name, version, settings):
+    """ a namespace for version of an analysis, which depends on the plugin settings """
+    return '%s:%d:%s' % (name, version, hashContent(json.dumps(settings, sort_keys=True).encode('utf-8'))[:12])
+
+
+class CachedCall(object):
+    """
+    Wraps `fn(path, text)` so that it returns the cache key of the file it read along with the result.
+    Instances can be sent to worker processes.
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __call__(self, path):
+        stat = os.stat(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        result = self.fn(path, data.decode('utf-8', 'replace'))
+        return (path, stat.st_size, stat.st_mtime_ns, hashContent(data), result)
+
+
+class AnalysisCache(object):
+
+    def __init__(self, path, namespace):
+        self.namespace = namespace
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        self.setupSchema()
+        self.run = int(self.getMeta('run') or 0) + 1
+        self.setMeta('run', self.run)
+        self.seen = []
+        self.hits = self.misses = 0
+
+    def setupSchema(self):
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        if self.getMeta('schema_version') == str(SCHEMA_VERSION):
+            return
+        self.db.execute('DROP TABLE IF EXISTS files')
+        self.db.execute(
+            'CREATE TABLE files ('
+            'namespace TEXT, path TEXT, size INTEGER, mtime INTEGER, hash TEXT, run INTEGER, data TEXT, '
+            'PRIMARY KEY (namespace, path))'
+        )
+        self.setMeta('schema_version', SCHEMA_VERSION)
+        self.db.commit()
+
+    def getMeta(self, key):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row and row[0]
+
+    def setMeta(self, key, value):
+        self.db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def lookup(self, path):
+        """
+        Returns the cached result for path if the file is unchanged, otherwise None.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        row = self.db.execute(
+            'SELECT size, mtime, hash, data FROM files WHERE namespace = ? AND path = ?', (self.namespace, path)
+        ).fetchone()
+        if row is None or row[0] != stat.st_size:
+            self.misses += 1
+            return None
+
+        if row[1] != stat.st_mtime_ns:
+            # touched, but possibly not changed
+            with open(path, 'rb') as f:
+                if hashContent(f.read()) != row[2]:
+                    self.misses += 1
+                    return None
+            self.db.execute(
+                'UPDATE files SET mtime = ? WHERE namespace = ? AND path = ?', (stat.st_mtime_ns, self.namespace, path)
+            )
+
+        self.hits += 1
+        self.seen.append((self.run, self.namespace, path))
+        return json.loads(row[3])
+
+    def store(self, path, size, mtime, hash, result):
+        self.db.execute(
+            'INSERT OR REPLACE INTO files (namespace, path, size, mtime, hash, run, data) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (self.namespace, path, size, mtime, hash, self.run, json.dumps(result))
+        )
+
+    def map(self, fn, paths, jobs=None, initializer=None, initargs=()):
+        """
+        Yields `(path, fn(path, text))` for each of paths, computing only the results which aren't cached.
+        fn must be picklable when jobs != 1.
+        """
+        def lookup(path):
+            result = self.lookup(path)
+            return None if result is None else (path, None, None, None, result)
+
+        for path, size, mtime, hash, result in imapBounded(
+                CachedCall(fn), paths, jobs, initializer, initargs, lookup=lookup):
+            if hash is not None:
+                self.store(path, size, mtime, hash, result)
+            yield path, result
+
+    def prune(self):
+        """
+        Remove the entries which haven't been used for KEEP_RUNS runs (deleted files, old namespaces).
+        """
+        self.db.executemany('UPDATE files SET run = ? WHERE namespace = ? AND path = ?', self.seen)
+        self.seen = []
+        self.db.execute('DELETE FROM files WHERE run <= ?', (self.run - KEEP_RUNS,))
+
+    def close(self):
+        self.prune()
+        self.db.commit()
+        self.db.close()
@@ -0,0 +1,216 @@
+"""
+Parameter types inferred from the calls made across a project.
+
+Every call `name(...)` (or `obj.name(...)`) with literal arguments records the type of each of them, by
+position: numbers, strings, booleans, arrays, objects, functions, regular expressions and `new X`. A
+parameter documented without a type then gets the type passed most often at its position.
+
+    python -m docblock.callsites src/ lib/          # list the types seen for each function
+
+The index is updated file by file, and keeps only counts: memory is bounded by the number of distinct
+(function, position, type) triples, itself capped, and the most common types of each function are kept
+ready, so looking them up while generating a block is a dictionary access.
+"""
+import argparse
+import re
+import sys
+import threading
+from .project import iterSourceFiles, getParserForFile, readSource, imapBounded
+from .settings import loadSettings
+
+
+reCall = re.compile(r'(?:(\bfunction\s+)|(\.\s*))?\b([A-Za-z_$][\w$]*)\s*\(')
+reArgToken = re.compile(r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`(?:\\[\s\S]|[^`\\])*`|[()\[\]{},]')
+reFunctionValue = re.compile(r'(?:async\s+)?function\b')
+# what a literal can start with: anything else (eg: a variable) is passed over without asking the parser
+reLiteralStart = re.compile(r'[-+.\d"\'`\[{/(]|(?:new|function|async|true|false)\b')
+
+# names followed by parentheses which aren't calls
+KEYWORDS = frozenset([
+    'if', 'for', 'while', 'switch', 'catch', 'with', 'return', 'typeof', 'function', 'do', 'else', 'new',
+    'delete', 'void', 'in', 'of', 'instanceof', 'yield', 'await', 'super', 'import', 'require', 'unless',
+    'until', 'when'
+])
+
+# how far to read the arguments of a call
+MAX_ARGS_LENGTH = 1000
+# arguments past this position are left out
+MAX_POSITIONS = 12
+# the number of functions the index keeps types for
+MAX_NAMES = 200000
+
+pluginSettings = None
+
+
+def setup(settings):
+    global pluginSettings
+    pluginSettings = settings
+
+
+def readArgs(text, pos):
+    """
+    The arguments of the call whose opening parenthesis ends at pos (up to MAX_POSITIONS), or None if it
+    isn't closed soon enough.
+    """
+    args = []
+    depth = 1
+    start = pos
+    for match in reArgToken.finditer(text, pos, min(len(text), pos + MAX_ARGS_LENGTH)):
+        char = match.group(0)
+        if char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+            if not depth:
+                args.append(text[start:match.start()].strip())
+                return args[:MAX_POSITIONS] if any(args) else []
+        elif char == ',' and depth == 1:
+            args.append(text[start:match.start()].strip())
+            start = match.end()
+    return None
+
+
+def argumentType(parser, arg):
+    """ the type of a literal argument, or None """
+    if not arg or not reLiteralStart.match(arg) and '>' not in arg:
+        # an arrow function (=> or ->) can start with its parameter
+        return None
+    if reFunctionValue.match(arg):
+        return parser.settings['function']
+    try:
+        return parser.guessTypeFromValue(arg) or None
+    except (IndexError, AttributeError):
+        return None
+
+
+def findCallSites(text, parser):
+    """
+    Returns {(name, position, type): count} for the calls with literal arguments in text.
+    """
+    counts = {}
+    for match in reCall.finditer(text):
+        name = match.group(3)
+        if match.group(1) or (name in KEYWORDS and not match.group(2)):
+            # a definition, or a statement
+            continue
+        for position, arg in enumerate(readArgs(text, match.end()) or ()):
+            argType = argumentType(parser, arg)
+            if argType:
+                key = (name, position, argType)
+                counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def indexFile(path):
+    return path, findCallSites(readSource(path), getParserForFile(path, pluginSettings))
+
+
+class CallSiteIndex(object):
+    """
+    Counts of the argument types passed to each function name, which can be updated file by file and
+    read from other threads.
+    """
+
+    def __init__(self, maxNames=MAX_NAMES):
+        self.lock = threading.Lock()
+        self.maxNames = maxNames
+        self.files = {}  # path -> {(name, position, type): count} of the calls in it
+        self.counts = {}  # name -> [{type: count} for each position]
+        self.best = {}  # name -> [the most common type at each position, or None]
+        self.ready = False  # for whoever builds the index, to tell that it holds the whole project
+        self.version = 0  # incremented on each change, for what depends on the types
+
+    def __len__(self):
+        return len(self.counts)
+
+    def update(self, path, counts):
+        """ replace the call sites of path """
+        with self.lock:
+            stale = self.removeFile(path)
+            kept = {}
+            for key, count in counts.items():
+                name, position, argType = key
+                positions = self.counts.get(name)
+                if positions is None:
+                    if len(self.counts) >= self.maxNames:
+                        continue
+                    positions = self.counts[name] = []
+                    self.best[name] = []
+                best = self.best[name]
+                while len(positions) <= position:
+                    positions.append({})
+                    best.append(None)
+                types = positions[position]
+                types[argType] = total = types.get(argType, 0) + count
+                current = best[position]
+                # ties go to the alphabetically first type, so results don't depend on the indexing order
+                if current is None or (-total, argType) < (-types.get(current, 0), current):
+                    best[position] = argType
+                kept[key] = count
+            if kept:
+                self.files[path] = kept
+            self.rank(stale)
+            if kept or stale:
+                self.version += 1
+
+    def remove(self, path):
+        with self.lock:
+            stale = self.removeFile(path)
+            self.rank(stale)
+            if stale:
+                self.version += 1
+
+    def removeFile(self, path):
+        """ take the counts of path out, returning the (name, position) whose most common type may change """
+        stale = set()
+        for (name, position, argType), count in self.files.pop(path, {}).items():
+            types = self.counts[name][position]
+            types[argType] -= count
+            if not types[argType]:
+                del types[argType]
+            if self.best[name][position] == argType:
+                stale.add((name, position))
+        return stale
+
+    def rank(self, stale):
+        for name, position in stale:
+            positions = self.counts.get(name)
+            if positions is None or position >= len(positions):
+                continue
+            types = positions[position]
+            best = self.best[name]
+            best[position] = min(types, key=lambda argType: (-types[argType], argType)) if types else None
+            while positions and not positions[-1]:
+                positions.pop()
+                best.pop()
+            if not positions:
+                del self.counts[name]
+                del self.best[name]
+
+    def types(self, name):
+        """ the most common type passed at each position in calls to name (None where unknown), or () """
+        return self.best.get(name.lstrip('*'), ())
+
+
+def main(argv=None):
+    argParser = argparse.ArgumentParser(prog='python -m docblock.callsites', description=__doc__.strip().split('\n')[0])
+    argParser.add_argument('paths', nargs='+', help='files or directories to index')
+    argParser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes')
+    argParser.add_argument('-s', '--settings', action='append', default=[], help='user settings file(s) to load')
+    argParser.add_argument('-n', '--name', action='append', default=[], help='only list these functions')
+    args = argParser.parse_args(argv)
+
+    settings = loadSettings(args.settings)
+    index = CallSiteIndex()
+    for path, counts in imapBounded(indexFile, iterSourceFiles(args.paths), args.jobs, setup, (settings,)):
+        index.update(path, counts)
+
+    for name in sorted(args.name or index.best):
+        types = index.types(name)
+        if types:
+            sys.stdout.write('%s(%s)\n' % (name, ', '.join(argType or '?' for argType in types)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Rewrite the synonyms of tags in docblocks to their canonical name, following the table of documentation.js
+(see `tags.SYNONYMS`): `@arg` and `@argument` become `@param`, `@return` becomes `@returns`, `@method`
+becomes `@function`, and so on.
+
+    python -m docblock.canonical src/             # rewrite files in place
+    python -m docblock.canonical --check src/     # print a diff, exit with 1 if anything would change
+
+`prefer_param` and `return_tag` pick the tags of newly generated blocks; this brings existing blocks in
+line. Only tags starting a line of a docblock (or following its opener) are rewritten. Files are searched
+once with a single pattern made from the table, and skipped unless it matches.
+"""
+import argparse
+import bisect
+import difflib
+import re
+import sys
+from .comment import iterDocBlocks
+from .project import iterSourceFiles, readExactSource, writeSource, imapBounded
+from .tags import SYNONYMS
+
+
+# a synonym, at the start of a line of a block or after its opener; longest first, so `@argument` isn't
+# taken for `@arg`
+reSynonym = re.compile(r'(?:^[ \t]*[*#]*|/\*\*|###\*)[ \t]*@(%s)(?![\w-])' % '|'.join(
+    re.escape(tag) for tag in sorted(SYNONYMS, key=len, reverse=True)
+), re.M)
+
+check = False
+
+
+def setup(checking):
+    global check
+    check = checking
+
+
+def iterSynonyms(text):
+    """ (begin, end, canonical tag) of the synonyms in the docblocks of text, the offsets those of the name """
+    matches = list(reSynonym.finditer(text))
+    if not matches:
+        return
+    blocks = list(iterDocBlocks(text))
+    begins = [begin for begin, end in blocks]
+    for match in matches:
+        i = bisect.bisect_right(begins, match.start(1)) - 1
+        if i >= 0 and match.end(1) <= blocks[i][1]:
+            yield match.start(1), match.end(1), SYNONYMS[match.group(1)]
+
+
+def canonicalizeText(text):
+    """ returns (text with canonical tags, the number of tags rewritten) """
+    out = []
+    last = 0
+    count = 0
+    for begin, end, tag in iterSynonyms(text):
+        out.append(text[last:begin])
+        out.append(tag)
+        last = end
+        count += 1
+    if not count:
+        return text, 0
+    out.append(text[last:])
+    return ''.join(out), count
+
+
+def canonicalizePath(path, write=True):
+    """
+    returns (text, canonical text, number of tags rewritten) of the file at path, rewritten if write: only the
+    tags change, line endings included. The texts are None for a file which isn't UTF-8, left as it is.
+    """
+    text = readExactSource(path)
+    if text is None:
+        return None, None, 0
+    if '@' not in text:
+        return text, text, 0
+    canonical, count = canonicalizeText(text)
+    if count and write:
+        writeSource(path, canonical)
+    return text, canonical, count
+
+
+def canonicalizeFile(path):
+    """
+    Returns (path, number of tags rewritten, diff). Unless checking, changed files are rewritten.
+    """
+    text, canonical, count = canonicalizePath(path, not check)
+    if text is None:
+        sys.stderr.write('skipped %s: not UTF-8\n' % path)
+    if not count:
+        return path, 0, ''
+    diff = difflib.unified_diff(
+        text.splitlines(True), canonical.splitlines(True), 'a/' + path.lstrip('/'), 'b/' + path.lstrip('/')
+    )
+    return path, count, ''.join(diff)
+
+
+def main(argv=None):
+    argParser = argparse.ArgumentParser(prog='python -m docblock.canonical',
+                                        description=__doc__.strip().split('\n')[0])
+    argParser.add_argument('paths', nargs='+', help='files or directories to rewrite')
+    argParser.add_argument('--check', action='store_true', help="don't write files, print a diff and exit with 1 if "
+                           "any would change")
+    argParser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes')
+    args = argParser.parse_args(argv)
+
+    changed = tags = 0
+    for path, count, diff in imapBounded(canonicalizeFile, iterSourceFiles(args.paths), args.jobs, setup,
+                                         (args.check,)):
+        if not count:
+            continue
+        changed += 1
+        tags += count
+        if args.check:
+            sys.stdout.write(diff)
+        else:
+            sys.stderr.write('rewrote %d tag%s in %s\n' % (count, '' if count == 1 else 's', path))
+
+    if args.check and changed:
+        sys.stderr.write('%d tag%s in %d file%s would be rewritten\n' % (
+            tags, '' if tags == 1 else 's', changed, '' if changed == 1 else 's'
+        ))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Finding existing docblocks in source text and parsing them back into tag records.
+"""
+import re
+from .render import Tag, Text, CURLY_TYPE
+
+
+# `/** ... */` (but not `/**/` or `/*** banners`) and coffee's `###* ... ###`
+reDocBlock = re.compile(r'/\*\*(?![*/])[\s\S]*?\*/|^[ \t]*###\*[^\n]*\n[\s\S]*?^[ \t]*###', re.M)
+reOpener = re.compile(r'^\s*(?:/\*\*|###\*)\s?')
+reCloser = re.compile(r'\s*(?:\*/|###)\s*$')
+reLeader = re.compile(r'^\s*\*(?!/) ?')
+# a tag starting a line: `@babel/core` or `@foo.bar` in a description isn't one
+reTagStart = re.compile(r'@([a-zA-Z]+)(?=\s|$)\s*')
+reName = re.compile(r'\[[^\]]*\]|\S+')
+
+# tags which are followed by a name (after the optional type)
+NAME_TAGS = frozenset([
+    'alias', 'arg', 'argument', 'callback', 'class', 'constant', 'const', 'constructor', 'event',
+    'external', 'host', 'member', 'mixin', 'module', 'name', 'namespace', 'param', 'prop', 'property',
+    'typedef', 'var'
+])
+
+
+def iterDocBlocks(text, start=0, end=None):
+    """
+    Yields the (begin, end) offsets of every docblock in text.
+    """
+    for match in reDocBlock.finditer(text, start, len(text) if end is None else end):
+        yield match.span()
+
+
+def stripDocBlock(text):
+    """
+    Returns the content lines of a docblock, without the comment opener, closer and leading asterisks.
+    """
+    lines = text.split('\n')
+    lines[0] = reOpener.sub('', lines[0], 1)
+    lines[-1] = reCloser.sub('', lines[-1], 1)
+    out = [reLeader.sub('', line, 1) if i else line for i, line in enumerate(lines)]
+    if out and not out[-1].strip():
+        out.pop()
+    if out and not out[0].strip():
+        out.pop(0)
+    return out
+
+
+def readType(text):
+    """
+    Given text starting with '{', return the type inside the (balanced) curly brackets, and the rest of the text.
+    """
+    depth = 0
+    for i, char in enumerate(text):
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return text[1:i], text[i + 1:].lstrip()
+    return None, text
+
+
+def parseTag(title, text):
+    typeName = None
+    name = None
+    if text.startswith('{'):
+        typeName, text = readType(text)
+    if title in NAME_TAGS and text:
+        match = reName.match(text)
+        name = match.group(0)
+        text = text[match.end():].lstrip()
+    return Tag('@' + title, typeName, name, text or None, CURLY_TYPE if typeName is not None else 0)
+
+
+def parseDocBlock(text):
+    """
+    Parse the text of a docblock into a list of records: an optional `Text` holding the description,
+    followed by a `Tag` for each @tag. Descriptions which span multiple lines are joined with newlines.
+    """
+    out = []
+    description = []
+    current = None
+    currentLines = []
+
+    def finishTag():
+        if current is not None:
+            out.append(parseTag(current, '\n'.join(currentLines).strip()))
+
+    for line in stripDocBlock(text):
+        stripped = line.strip()
+        match = reTagStart.match(stripped)
+        if match:
+            finishTag()
+            current = match.group(1)
+            currentLines = [stripped[match.end():]]
+        elif current is None:
+            description.append(line.rstrip())
+        else:
+            currentLines.append(stripped)
+    finishTag()
+
+    descriptionText = '\n'.join(description).strip()
+    if descriptionText:
+        out.insert(0, Text(descriptionText))
+    return out
@@ -0,0 +1,81 @@
+"""
+Completions of the parameter names left to document, when typing `@param` in an existing docblock.
+
+The parameters are those of the definition following the block, as `BespokeDocsCommand` reads it, typed
+as a generated block would type them. They're cached by the text of that definition (and the version of
+the call site index), so while typing in the block a completion only reads the signature lines again:
+the cached parameters are used until they change.
+"""
+import re
+from .render import escape
+from .tags import canonicalTag
+
+
+# the signatures kept
+MAX_SIGNATURES = 1000
+
+# a tag, and the type if there's one, before the name being typed; eg: ` * @param {String} na`
+PARAM_PREFIX = re.compile('^\\s*[*#]?\\s*@(\\w+)(\\s+\\{[^{}]*\\})?\\s+\\[?[$\\w.]*$')
+
+# the tag and name of a line of a block
+DOCUMENTED = re.compile('@(\\w+)(?:[ \\t]+\\{[^}\\n]*\\})?[ \\t]+\\[?([$\\w.]+)')
+
+
+def documentedParams(blockText):
+    """ the names of the parameters already documented in blockText """
+    return set(name for tag, name in DOCUMENTED.findall(blockText) if canonicalTag(tag) == 'param')
+
+
+class ParamCompletions(object):
+    """
+    The (name, type) of the parameters of each signature seen, the type or None, with the counts of hits
+    and misses.
+    """
+
+    def __init__(self, maxSignatures=MAX_SIGNATURES):
+        self.maxSignatures = maxSignatures
+        self.signatures = {}  # (language, definition, call site version) -> [(name, type), ...]
+        self.counters = {'hits': 0, 'misses': 0}
+
+    def params(self, parser, definition):
+        callSites = parser.callSites.version if parser.callSites is not None else 0
+        key = (parser.settings['language'], definition, callSites)
+        params = self.signatures.get(key)
+        if params is not None:
+            self.counters['hits'] += 1
+            return params
+        self.counters['misses'] += 1
+        params = []
+        out = parser.parseFunction(definition)
+        if out and out[1]:
+            for argType, argName, observedType in parser.iterArgs(out[0], out[1]):
+                params.append((argName, argType or parser.guessTypeFromName(argName) or observedType or None))
+        if len(self.signatures) >= self.maxSignatures:
+            self.signatures.clear()
+        self.signatures[key] = params
+        return params
+
+    def complete(self, parser, definition, blockText, linePrefix):
+        """
+        [(trigger, contents)] of the parameters of definition which blockText doesn't document, for the
+        cursor after linePrefix (the text of its line before it), or None if it isn't after a `@param` tag.
+        """
+        match = PARAM_PREFIX.match(linePrefix)
+        if not match or canonicalTag(match.group(1)) != 'param':
+            return None
+        documented = documentedParams(blockText)
+        # the type goes in front of the name, unless it's been typed
+        withType = parser.settings['typeInfo'] and not match.group(2)
+        out = []
+        for name, argType in self.params(parser, definition):
+            if name in documented:
+                continue
+            contents = name.replace('$', '\\$')
+            if withType and argType:
+                typeText = ('{%s}' if parser.settings['curlyTypes'] else '%s') % argType
+                contents = escape(typeText) + ' ' + contents
+            out.append(('%s\t%s' % (name, argType or 'param'), contents))
+        return out
+
+    def clear(self):
+        self.signatures.clear()
@@ -0,0 +1,253 @@
+"""
+Restricting headless runs to the docblocks touched by a change.
+
+    changes = readDiff(open('change.patch').read())   # or gitDiff('HEAD')
+    for path, ranges in changes:
+        for block in changedBlocks(path, ranges, parser):
+            ...
+
+A block is touched when one of the changed lines of the new side of the diff falls on it, or on the
+definition which follows it (as far as `getDefinition` reads). Files are memory-mapped and only read
+around the changes: from the start to the last changed line to count rows (without decoding), and a
+window around each change to find the blocks in it.
+"""
+import mmap
+import os
+import re
+import subprocess
+import sys
+from .project import SOURCE_EXTENSIONS
+from .scanner import Block, iterBlocks, Markers, countNewlines, CHUNK_SIZE
+from .textview import TextView
+
+
+reFile = re.compile(r'^\+\+\+ (?:b/)?(.*?)\t?$')
+reHunk = re.compile(r'^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+# how far before a change to look for the block it's in, or whose definition it's in
+WINDOW_BEFORE = 1 << 16
+# how far after a change to look for the end of a block it's in
+WINDOW_AFTER = 1 << 16
+
+
+def readDiff(text):
+    """
+    Returns [(path, [(firstRow, lastRow), ...]), ...] from a unified diff: the lines (1 based) which were
+    added or changed in each file of the new side. Removed lines mark the lines around them, and context
+    lines aren't included. Deleted files are left out.
+    """
+    out = []
+    ranges = None
+    oldLeft = newLeft = 0  # the lines of each side left in the current hunk
+    row = 0  # the row of the new side the next line of the hunk is on
+    removed = False  # lines were removed right before row, and none added in their place yet
+
+    def mark(first, last):
+        if ranges and ranges[-1][1] >= first - 1:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], last))
+        else:
+            ranges.append((first, last))
+
+    for line in text.splitlines():
+        if oldLeft or newLeft:
+            kind = line[:1]
+            if kind == '\\':
+                # "\ No newline at end of file"
+                continue
+            if removed and kind != '-' and kind != '+':
+                # lines removed between two rows
+                mark(max(1, row - 1), row)
+            if kind == '+':
+                mark(row, row)
+                row += 1
+                newLeft -= 1
+            elif kind == '-':
+                oldLeft -= 1
+            else:
+                row += 1
+                oldLeft -= 1
+                newLeft -= 1
+            removed = kind == '-'
+            if removed and not oldLeft and not newLeft:
+                mark(max(1, row - 1), row)
+            continue
+        match = reFile.match(line)
+        if match:
+            ranges = None
+            if match.group(1) != '/dev/null':
+                ranges = []
+                out.append((match.group(1), ranges))
+            continue
+        match = ranges is not None and reHunk.match(line)
+        if match:
+            oldLeft = 1 if match.group(1) is None else int(match.group(1))
+            newLeft = 1 if match.group(3) is None else int(match.group(3))
+            # without lines on the new side, the row is the one the hunk comes after
+            row = int(match.group(2)) + (0 if newLeft else 1)
+            removed = False
+    return [(path, ranges) for path, ranges in out if ranges]
+
+
+def gitDiff(revision, cwd=None):
+    """
+    The changes between revision and the working tree, as `readDiff` returns them, with paths relative to
+    cwd. Staged and unstaged changes are included: the files on disk are what will be read.
+    """
+    output = subprocess.check_output(
+        ['git', 'diff', '--no-color', '--no-ext-diff', '--unified=0', '--relative', revision, '--'], cwd=cwd
+    )
+    changes = readDiff(output.decode('utf-8', 'replace'))
+    return [(os.path.join(cwd, path) if cwd else path, ranges) for path, ranges in changes]
+
+
+def filterChanges(changes, paths=(), extensions=SOURCE_EXTENSIONS):
+    """ the changes to source files, under one of paths if any are given """
+    prefixes = [os.path.normpath(path) for path in paths]
+    out = []
+    for path, ranges in changes:
+        if not path.endswith(extensions):
+            continue
+        normalized = os.path.normpath(path)
+        if prefixes and not any(normalized == prefix or normalized.startswith(prefix.rstrip(os.sep) + os.sep)
+                                for prefix in prefixes):
+            continue
+        out.append((path, ranges))
+    return out
+
+
+def addArguments(argParser):
+    """ the options of the headless tools which restrict them to a change """
+    group = argParser.add_mutually_exclusive_group()
+    group.add_argument('--diff', metavar='FILE', help='only the docblocks touched by the unified diff in FILE '
+                       '(- for stdin); paths, if given, filter its files')
+    group.add_argument('--rev', metavar='REVISION', help='only the docblocks touched since REVISION (as given to '
+                       'git diff, eg: HEAD or origin/master); paths, if given, filter its files')
+
+
+def readChanges(args):
+    """ the changes given by --diff or --rev, or None when neither was """
+    if args.diff:
+        if args.diff == '-':
+            changes = readDiff(sys.stdin.read())
+        else:
+            with open(args.diff, encoding='utf-8', errors='replace') as f:
+                changes = readDiff(f.read())
+    elif args.rev:
+        changes = gitDiff(args.rev)
+    else:
+        return None
+    return [(path, ranges) for path, ranges in filterChanges(changes, args.paths) if os.path.isfile(path)]
+
+
+def mergeRanges(ranges):
+    out = []
+    for start, end in sorted(ranges):
+        if out and start <= out[-1][1] + 1:
+            out[-1] = (out[-1][0], max(out[-1][1], end))
+        else:
+            out.append((start, end))
+    return out
+
+
+class LineCursor(object):
+    """ finds the offsets of rows in buf, moving forward only """
+
+    def __init__(self, buf, markers):
+        self.buf = buf
+        self.newline = markers.newline
+        self.row = 0
+        self.offset = 0
+
+    def seek(self, row):
+        """ the offset of the start of row (0 based), or the size of buf if it has fewer rows """
+        buf = self.buf
+        # skip whole chunks while the row is further on
+        while row - self.row > 1:
+            chunk = buf[self.offset:self.offset + CHUNK_SIZE]
+            count = chunk.count(self.newline)
+            if not chunk or count >= row - self.row:
+                break
+            self.offset += len(chunk)
+            self.row += count
+        while self.row < row:
+            found = buf.find(self.newline, self.offset)
+            if found == -1:
+                return len(buf)
+            self.offset = found + 1
+            self.row += 1
+        return self.offset
+
+
+class CountingView(TextView):
+    """ a TextView which counts the lines read from it """
+
+    def __init__(self, text):
+        super(CountingView, self).__init__(text)
+        self.lines = 0
+
+    def line(self, point):
+        self.lines += 1
+        return super(CountingView, self).line(point)
+
+
+def definitionRows(parser, block):
+    """ how many rows of code following block its definition spans """
+    following = block.following()
+    if following is None:
+        return 0
+    view = CountingView(following)
+    parser.getDefinition(view, 0)
+    return view.lines
+
+
+def changedBlocks(path, ranges, parser):
+    """
+    Yields a scanner `Block` (with byte offsets) for each docblock of the file at path touched by ranges,
+    in order. As with scanFile, the code after a block can be read while the scan runs.
+    """
+    with open(path, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return
+        try:
+            for block in iterChangedBlocks(buf, mergeRanges(ranges), parser):
+                yield block
+        finally:
+            buf.close()
+
+
+def iterChangedBlocks(buf, ranges, parser):
+    markers = Markers(buf)
+    lines = LineCursor(buf, markers)
+    decode = lambda data: data.decode('utf-8', 'replace')
+    seen = set()
+    for first, last in ranges:
+        changeStart = lines.seek(first - 1)
+        startRow = lines.row
+        changeEnd = lines.seek(last)
+        # a window of whole lines around the change
+        windowStart = max(0, changeStart - WINDOW_BEFORE)
+        if windowStart:
+            windowStart = buf.find(markers.newline, windowStart) + 1
+        windowEnd = buf.find(markers.newline, min(len(buf), changeEnd + WINDOW_AFTER))
+        windowEnd = len(buf) if windowEnd == -1 else windowEnd
+        window = buf[windowStart:windowEnd]
+        windowRow = startRow - countNewlines(buf, windowStart, changeStart, markers.newline)
+
+        for found in iterBlocks(window, len(window), decode):
+            begin = windowStart + found.begin
+            if begin in seen:
+                continue
+            nextLine = buf.find(markers.newline, windowStart + found.end)
+            block = Block(
+                begin, windowStart + found.end, windowRow + found.row, windowRow + found.endRow, found.text,
+                buf, nextLine + 1 if nextLine != -1 else -1, decode
+            )
+            # rows are 0 based, ranges 1 based
+            if block.row + 1 > last:
+                break
+            lastRow = block.endRow + 1 + definitionRows(parser, block)
+            if lastRow >= first:
+                seen.add(begin)
+                yield block
@@ -0,0 +1,92 @@
+"""
+Coalescing text edits.
+
+Commands describe their changes against the original text (no need to track how earlier edits moved
+later positions), and the builder turns them into as few replacements as possible: edits close to each
+other are merged into one, and each replacement is trimmed to the part which actually changes.
+"""
+
+
+# edits separated by at most this many unchanged characters are merged
+MAX_GAP = 1024
+
+
+class EditBuilder(object):
+
+    def __init__(self, source):
+        """
+        `source(begin, end)` returns the original text between two offsets.
+        """
+        self.source = source
+        self.edits = []
+
+    def __len__(self):
+        return len(self.edits)
+
+    def replace(self, begin, end, text):
+        self.edits.append((begin, end, len(self.edits), text))
+
+    def insert(self, point, text):
+        self.replace(point, point, text)
+
+    def erase(self, begin, end):
+        self.replace(begin, end, '')
+
+    def merged(self):
+        """
+        Returns the replacements to make, as a sorted list of (begin, end, text) in original offsets.
+        Edits at the same point are applied in the order they were added.
+        """
+        out = []  # [begin, end, parts of the text]
+        for begin, end, order, text in sorted(self.edits):
+            if out and begin < out[-1][1]:
+                raise ValueError('overlapping edits at %d' % begin)
+            if out and begin - out[-1][1] <= MAX_GAP:
+                last = out[-1]
+                last[2].append(self.source(last[1], begin))
+                last[2].append(text)
+                last[1] = end
+            else:
+                out.append([begin, end, [text]])
+
+        return [edit for edit in (self.trim((begin, end, ''.join(parts))) for begin, end, parts in out) if edit]
+
+    def trim(self, edit):
+        """ shrink a replacement to the characters which change, or return None if nothing does """
+        begin, end, text = edit
+        original = self.source(begin, end)
+        if original == text:
+            return None
+        prefix = 0
+        limit = min(len(original), len(text))
+        while prefix < limit and original[prefix] == text[prefix]:
+            prefix += 1
+        suffix = 0
+        limit -= prefix
+        while suffix < limit and original[-1 - suffix] == text[-1 - suffix]:
+            suffix += 1
+        return (begin + prefix, end - suffix, text[prefix:len(text) - suffix])
+
+    def apply(self, replace):
+        """
+        Calls `replace(begin, end, text)` for each replacement, last one first so the offsets stay valid.
+        Returns the number of replacements.
+        """
+        edits = self.merged()
+        for begin, end, text in reversed(edits):
+            replace(begin, end, text)
+        return len(edits)
+
+    def applyToString(self, text):
+        out = []
+        last = 0
+        for begin, end, replacement in self.merged():
+            out.append(text[last:begin])
+            out.append(replacement)
+            last = end
+        out.append(text[last:])
+        return ''.join(out)
+
+
+def stringSource(text):
+    return lambda begin, end: text[begin:end]
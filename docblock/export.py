@@ -0,0 +1,126 @@
+"""
+Stream every docblock of a project as JSON lines, in a shape compatible with documentation.js' comments.
+
+    python -m docblock.export src/ lib/foo.js > docs.jsonl
+    python -m docblock.export --rev HEAD > changed.jsonl    # only the blocks touched by uncommitted changes
+
+Each line holds one docblock: its description, its tags (with synonyms such as `@arg` or `@return`
+rewritten to their canonical name), the flattened tags, and the definition which follows the block as
+understood by the parser.
+"""
+import argparse
+import json
+import sys
+from .cache import AnalysisCache, settingsNamespace
+from .comment import parseDocBlock
+from .diff import addArguments, readChanges, changedBlocks
+from .project import iterSourceFiles, getParserForFile, imapBounded
+from .render import Tag
+from .scanner import scanFile, scanText
+from .settings import loadSettings
+from .tags import canonicalTag, flattenTags
+from .textview import TextView
+
+
+# bump whenever the exported lines change, so that cached files are exported again
+EXPORT_VERSION = 1
+
+pluginSettings = None
+
+
+def setup(settings):
+    global pluginSettings
+    pluginSettings = settings
+
+
+def exportBlock(parser, path, block):
+    records = parseDocBlock(block.text)
+    comment = {'description': '', 'tags': []}
+    for record in records:
+        if isinstance(record, Tag):
+            comment['tags'].append({
+                'title': canonicalTag(record.tag[1:]),
+                'type': record.type,
+                'name': record.name,
+                'description': record.description
+            })
+        else:
+            comment['description'] = record.text
+    flattenTags(comment['tags'], comment)
+    comment['loc'] = {'file': path, 'start': {'line': block.row + 1}, 'end': {'line': block.endRow + 1}}
+
+    # the definition starts on the line following the block
+    following = block.following()
+    if following is not None:
+        code = parser.getDefinition(TextView(following), 0)
+        limit = parser.bodyScanLimit()
+        parser.setBody(parser.scanBody(block.following(limit)) if limit else None)
+        comment['context'] = {'code': code, 'loc': {'start': {'line': block.endRow + 2}}}
+        comment['definition'] = parser.describe(code) if code.strip() else None
+    return comment
+
+
+def exportBlocks(path, blocks, parser=None):
+    parser = parser or getParserForFile(path, pluginSettings)
+    return ''.join(json.dumps(exportBlock(parser, path, block), sort_keys=True) + '\n' for block in blocks)
+
+
+def exportText(path, text):
+    """
+    Returns the JSON lines for all the docblocks in the source of path, as a single string.
+    """
+    if '/**' not in text and '###*' not in text:
+        return ''
+    return exportBlocks(path, scanText(text))
+
+
+def exportFile(path):
+    """ like exportText, reading the file through a memory map, so files of any size can be exported """
+    return exportBlocks(path, scanFile(path))
+
+
+def exportChanges(change):
+    """ like exportFile, for the blocks of a (path, ranges) change only """
+    path, ranges = change
+    parser = getParserForFile(path, pluginSettings)
+    return exportBlocks(path, changedBlocks(path, ranges, parser), parser)
+
+
+def main(argv=None):
+    argParser = argparse.ArgumentParser(prog='python -m docblock.export', description=__doc__.strip().split('\n')[0])
+    argParser.add_argument('paths', nargs='*', help='files or directories to export')
+    argParser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes')
+    argParser.add_argument('-s', '--settings', action='append', default=[], help='user settings file(s) to load')
+    argParser.add_argument('-o', '--output', default='-', help='output file (default: stdout)')
+    argParser.add_argument('--cache', help='SQLite file in which to cache the results of unchanged files')
+    addArguments(argParser)
+    args = argParser.parse_args(argv)
+    changes = readChanges(args)
+    if changes is None and not args.paths:
+        argParser.error('paths are required without --diff or --rev')
+
+    settings = loadSettings(args.settings)
+    paths = iterSourceFiles(args.paths) if changes is None else None
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    cache = None
+    try:
+        if changes is not None:
+            # a change is a few blocks: not worth starting processes for, unless asked to
+            results = imapBounded(exportChanges, changes, args.jobs or 1, setup, (settings,))
+        elif args.cache:
+            cache = AnalysisCache(args.cache, settingsNamespace('export', EXPORT_VERSION, settings))
+            results = (lines for path, lines in cache.map(exportText, paths, args.jobs, setup, (settings,)))
+        else:
+            results = imapBounded(exportFile, paths, args.jobs, setup, (settings,))
+        for lines in results:
+            out.write(lines)
+    finally:
+        if cache:
+            cache.close()
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
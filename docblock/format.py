@@ -0,0 +1,277 @@
+"""
+Reformat every docblock of a project with the wrapping and alignment rules of the editor commands.
+
+    python -m docblock.format src/             # rewrite files in place
+    python -m docblock.format --check src/     # print a diff, exit with 1 if anything would change
+    python -m docblock.format --check --rev HEAD   # only the blocks touched by uncommitted changes
+
+Tags are aligned like newly generated blocks (`align_tags`, `min_spaces_between_columns`,
+`per_section_indent`), then the text is wrapped like `BespokeDocsWrapLines` does (`indentation_spaces`,
+`indentation_spaces_same_para`, `spacer_between_sections`). Formatting is idempotent: lines aren't broken
+in front of an `@word` of the text, which would read as a tag. Files keep their line endings, and those
+which aren't UTF-8 are skipped.
+
+Single line blocks, and blocks holding examples or fenced code, are left alone since reflowing would
+mangle them.
+"""
+import argparse
+import difflib
+import re
+import sys
+from .comment import iterDocBlocks, parseDocBlock, NAME_TAGS
+from .diff import addArguments, readChanges, changedBlocks
+from .project import iterSourceFiles, getParserForFile, readExactSource, writeSource, imapBounded
+from .render import DocBlockRenderer, Tag, Text
+from .settings import loadSettings
+from .wrap import wrapLines
+
+
+reOpener = re.compile(r'/\*\*|###\*')
+
+options = None
+
+
+class Options(object):
+
+    def __init__(self, pluginSettings, wrapLength=80, tabSize=4, check=False):
+        self.pluginSettings = pluginSettings
+        self.wrapLength = wrapLength
+        self.tabSize = tabSize
+        self.check = check
+
+
+def setup(opts):
+    global options
+    options = opts
+
+
+def cleanRecords(records):
+    """ trim the lines of text records, and collapse the whitespace of tag descriptions """
+    for record in records:
+        if isinstance(record, Text):
+            record.text = '\n'.join(line.rstrip() for line in record.text.split('\n'))
+        elif record.description:
+            record.description = ' '.join(record.description.split())
+    return records
+
+
+def normalizeRecords(records, pluginSettings):
+    hasNames = any(isinstance(record, Tag) and record.name for record in records)
+    # give typed tags without a name (eg: @return) an empty name column, so their description lines up
+    # with the others, as in generated blocks
+    emptyNameColumn = hasNames and pluginSettings.get('align_tags') == 'deep' and \
+        not pluginSettings.get('per_section_indent')
+    for record in cleanRecords(records):
+        if emptyNameColumn and isinstance(record, Tag) and record.name is None and record.type is not None and \
+                record.tag[1:] not in NAME_TAGS:
+            record.name = ''
+    return records
+
+
+def isFormattable(blockText):
+    """ whether a block can be rendered again: reflowing single line blocks, examples and code would mangle them """
+    return '\n' in blockText and '@example' not in blockText and '```' not in blockText
+
+
+def renderBody(records, indent, parser, layout):
+    """ the body of a docblock rendering records, from the newline after its opener to the end of its last line """
+    renderer = DocBlockRenderer(layout, parser.settings, snippet=False)
+    rendered = renderer.render(records)
+    return rendered[:rendered.rindex('\n')].replace('\n', '\n' + indent)
+
+
+def alignBody(blockText, indent, parser, pluginSettings):
+    """
+    Returns the body of a docblock (from its opener to its closer) with its tags aligned, from the newline
+    after the opener to the end of the last line, or None to leave the block as is.
+    """
+    if not isFormattable(blockText):
+        return None
+    records = parseDocBlock(blockText)
+    if not records:
+        return None
+
+    layout = dict(pluginSettings, spacer_between_sections=False, newline_after_block=False)
+    return renderBody(normalizeRecords(records, pluginSettings), indent, parser, layout)
+
+
+def alignBlock(blockText, indent, parser, pluginSettings):
+    """
+    Returns the text of a docblock with its tags aligned, but its lines left unwrapped, or None to leave it
+    as is.
+    """
+    body = alignBody(blockText, indent, parser, pluginSettings)
+    if body is None:
+        return None
+    opener = reOpener.match(blockText).group(0)
+    return opener + body + '\n' + indent + parser.settings['commentCloser']
+
+
+def formatBlock(blockText, indent, parser, opts):
+    """
+    Returns the reformatted text of a docblock (from its opener to its closer), or None to leave it as is.
+    """
+    body = alignBody(blockText, indent, parser, opts.pluginSettings)
+    if body is None:
+        return None
+
+    wrapped = wrapLines(body, opts.wrapLength, opts.tabSize, opts.pluginSettings)
+    opener = reOpener.match(blockText).group(0)
+    return opener + wrapped.replace('\n', '\n' + indent) + '\n' + indent + parser.settings['commentCloser']
+
+
+def formatText(path, text, opts):
+    parser = getParserForFile(path, opts.pluginSettings)
+    out = []
+    last = 0
+    for begin, end in iterDocBlocks(text):
+        blockText = text[begin:end]
+        leading = len(blockText) - len(blockText.lstrip(' \t'))
+        begin += leading
+        indent = text[text.rfind('\n', 0, begin) + 1:begin]
+        if indent.strip():
+            # code before the block on the same line
+            continue
+        blockText = text[begin:end]
+        crlf = '\r\n' in blockText
+        formatted = formatBlock(blockText.replace('\r\n', '\n') if crlf else blockText, indent, parser, opts)
+        if formatted is not None and crlf:
+            formatted = formatted.replace('\n', '\r\n')
+        if formatted is not None and formatted != blockText:
+            out.append(text[last:begin])
+            out.append(formatted)
+            last = end
+    if not out:
+        return text
+    out.append(text[last:])
+    return ''.join(out)
+
+
+def formatFile(path):
+    """
+    Returns (path, diff) where diff is empty when the file is already formatted. Unless checking, changed
+    files are rewritten, their line endings kept; files which aren't UTF-8 are skipped.
+    """
+    text = readExactSource(path)
+    if text is None:
+        sys.stderr.write('skipped %s: not UTF-8\n' % path)
+        return path, ''
+    if '/**' not in text and '###*' not in text:
+        return path, ''
+    formatted = formatText(path, text, options)
+    if formatted == text:
+        return path, ''
+    if not options.check:
+        writeSource(path, formatted)
+    diff = difflib.unified_diff(
+        text.splitlines(True), formatted.splitlines(True), 'a/' + path.lstrip('/'), 'b/' + path.lstrip('/')
+    )
+    return path, ''.join(diff)
+
+
+def formatChanges(change):
+    """
+    Like formatFile, for the blocks of a (path, ranges) change only: the file is only read around them,
+    and only rewritten if one of them changes.
+    """
+    path, ranges = change
+    parser = getParserForFile(path, options.pluginSettings)
+    edits = []  # (start, end, row, old lines, new lines), start and end in bytes
+    for block in changedBlocks(path, ranges, parser):
+        buf = block.buf
+        lineStart = buf.rfind(b'\n', 0, block.begin) + 1
+        lineEnd = buf.find(b'\n', block.end)
+        lineEnd = len(buf) if lineEnd == -1 else lineEnd + 1
+        try:
+            buf[lineStart:lineEnd].decode('utf-8')
+        except UnicodeDecodeError:
+            # lines which aren't UTF-8 couldn't be written back as they were
+            continue
+        prefix = block.decode(buf[lineStart:block.begin])
+        suffix = block.decode(buf[block.end:lineEnd])
+        crlf = suffix.endswith('\r\n')
+        blockText = block.text.replace('\r\n', '\n')
+        lines = prefix + blockText + suffix.replace('\r\n', '\n')
+
+        begin = len(prefix) + len(blockText) - len(blockText.lstrip(' \t'))
+        end = len(prefix) + len(blockText)
+        indent = lines[:begin]
+        if indent.strip():
+            # code before the block on the same line
+            continue
+        formatted = formatBlock(lines[begin:end], indent, parser, options)
+        if formatted is not None and formatted != lines[begin:end]:
+            replaced = lines[:begin] + formatted + lines[end:]
+            if crlf:
+                lines = lines.replace('\n', '\r\n')
+                replaced = replaced.replace('\n', '\r\n')
+            edits.append((lineStart, lineEnd, block.row, lines, replaced))
+    if not edits:
+        return path, ''
+
+    if not options.check:
+        with open(path, 'rb') as f:
+            data = f.read()
+        for start, end, row, old, new in reversed(edits):
+            data = data[:start] + new.encode('utf-8') + data[end:]
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    name = path.lstrip('/')
+    diff = ['--- a/%s\n' % name, '+++ b/%s\n' % name]
+    delta = 0
+    for start, end, row, old, new in edits:
+        old = old.splitlines(True)
+        new = new.splitlines(True)
+        while len(old) > 1 and len(new) > 1 and old[-1] == new[-1]:
+            old.pop()
+            new.pop()
+        while len(old) > 1 and len(new) > 1 and old[0] == new[0]:
+            del old[0], new[0]
+            row += 1
+        diff.append('@@ -%d,%d +%d,%d @@\n' % (row + 1, len(old), row + 1 + delta, len(new)))
+        diff.extend('-' + line for line in old)
+        diff.extend('+' + line for line in new)
+        delta += len(new) - len(old)
+    return path, ''.join(diff)
+
+
+def main(argv=None):
+    argParser = argparse.ArgumentParser(prog='python -m docblock.format', description=__doc__.strip().split('\n')[0])
+    argParser.add_argument('paths', nargs='*', help='files or directories to format')
+    argParser.add_argument('--check', action='store_true', help="don't write files, print a diff and exit with 1 if "
+                           "any would change")
+    argParser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes')
+    argParser.add_argument('-s', '--settings', action='append', default=[], help='user settings file(s) to load')
+    argParser.add_argument('--wrap-length', type=int, default=80, help='column to wrap at (default: 80)')
+    argParser.add_argument('--tab-size', type=int, default=4, help='tab size (default: 4)')
+    addArguments(argParser)
+    args = argParser.parse_args(argv)
+    changes = readChanges(args)
+    if changes is None and not args.paths:
+        argParser.error('paths are required without --diff or --rev')
+
+    opts = Options(loadSettings(args.settings), args.wrap_length, args.tab_size, args.check)
+    if changes is None:
+        results = imapBounded(formatFile, iterSourceFiles(args.paths), args.jobs, setup, (opts,))
+    else:
+        # a change is a few blocks: not worth starting processes for, unless asked to
+        results = imapBounded(formatChanges, changes, args.jobs or 1, setup, (opts,))
+    changed = 0
+    for path, diff in results:
+        if not diff:
+            continue
+        changed += 1
+        if args.check:
+            sys.stdout.write(diff)
+        else:
+            sys.stderr.write('reformatted %s\n' % path)
+
+    if args.check and changed:
+        sys.stderr.write('%d file%s would be reformatted\n' % (changed, '' if changed == 1 else 's'))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
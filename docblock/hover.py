@@ -0,0 +1,129 @@
+"""
+The docblocks of a project by the name of the symbol they document, for hover popups at call sites.
+
+The index is built in the background, a file at a time, from the blocks `docblock.scanner` finds: each
+keeps its summary, parameters and return value, so showing one is a dict lookup and a few lines of HTML,
+without reading any file.
+"""
+import html
+import threading
+from .comment import parseDocBlock
+from .render import Tag
+from .scanner import scanFile, scanText
+from .tags import canonicalTag
+from .textview import TextView
+
+
+# the symbols of a name shown in one popup
+MAX_SHOWN = 3
+
+
+def describeBlocks(blocks, parser):
+    """
+    Returns (name, row, doc) for the blocks (from docblock.scanner) followed by a named definition, where doc
+    is {'kind', 'summary', 'params': [(name, type, description)], 'returns': (type, description) or None,
+    'deprecated'}.
+    """
+    out = []
+    for block in blocks:
+        following = block.following()
+        definition = following is not None and parser.describe(parser.getDefinition(TextView(following), 0))
+        if not definition or not definition['name']:
+            continue
+        doc = {'kind': definition['kind'], 'summary': '', 'params': [], 'returns': None, 'deprecated': False}
+        for record in parseDocBlock(block.text):
+            if not isinstance(record, Tag):
+                doc['summary'] = doc['summary'] or record.text.strip().split('\n\n')[0]
+                continue
+            tag = canonicalTag(record.tag[1:])
+            if tag == 'param':
+                doc['params'].append((record.name or '', record.type, record.description))
+            elif tag == 'returns':
+                doc['returns'] = (record.type, record.description)
+            elif tag == 'deprecated':
+                doc['deprecated'] = True
+        out.append((definition['name'], block.row, doc))
+    return out
+
+
+def describeText(path, text, parser):
+    return describeBlocks(scanText(text), parser)
+
+
+def describePath(path, parser):
+    """ like describeText, reading the file at path through a memory map """
+    return describeBlocks(scanFile(path), parser)
+
+
+class HoverIndex(object):
+    """
+    The documented symbols of a project by name, which can be updated file by file and read from other threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.symbols = {}  # name -> [(path, row, doc), ...]
+        self.files = {}  # path -> the names documented in it
+        self.ready = False  # for whoever builds the index, to tell that it holds the whole project
+
+    def __len__(self):
+        return sum(len(names) for names in self.files.values())
+
+    def update(self, path, symbols):
+        """ replace the symbols of path by symbols, from describeBlocks """
+        with self.lock:
+            self.removeFile(path)
+            names = self.files[path] = []
+            for name, row, doc in symbols:
+                self.symbols.setdefault(name, []).append((path, row, doc))
+                names.append(name)
+
+    def remove(self, path):
+        with self.lock:
+            self.removeFile(path)
+
+    def removeFile(self, path):
+        for name in set(self.files.pop(path, ())):
+            entries = [entry for entry in self.symbols[name] if entry[0] != path]
+            if entries:
+                self.symbols[name] = entries
+            else:
+                del self.symbols[name]
+
+    def get(self, name):
+        """ the (path, row, doc) of the symbols named name """
+        with self.lock:
+            return list(self.symbols.get(name, ()))
+
+
+def renderHover(name, entries, relativePath=lambda path: path):
+    """
+    The minihtml of a popup showing the entries of name (from `HoverIndex.get`), each linking to its
+    `path:row` (1 based).
+    """
+    parts = []
+    for path, row, doc in entries[:MAX_SHOWN]:
+        location = '%s:%d' % (path, row + 1)
+        parts.append('<div><b>%s</b>%s <a href="%s">%s</a></div>' % (
+            html.escape(name), ' <i>deprecated</i>' if doc['deprecated'] else '', html.escape(location, True),
+            html.escape('%s:%d' % (relativePath(path), row + 1))
+        ))
+        if doc['summary']:
+            parts.append('<p>%s</p>' % html.escape(doc['summary']).replace('\n', '<br>'))
+        lines = []
+        for paramName, paramType, description in doc['params']:
+            lines.append('<code>%s</code>%s%s' % (
+                html.escape(paramName), ' <i>%s</i>' % html.escape(paramType) if paramType else '',
+                ' &mdash; %s' % html.escape(description) if description else ''
+            ))
+        if doc['returns']:
+            returnType, description = doc['returns']
+            lines.append('<b>returns</b>%s%s' % (
+                ' <i>%s</i>' % html.escape(returnType) if returnType else '',
+                ' &mdash; %s' % html.escape(description) if description else ''
+            ))
+        if lines:
+            parts.append('<div>%s</div>' % '<br>'.join(lines))
+    if len(entries) > MAX_SHOWN:
+        parts.append('<div><i>and %d more</i></div>' % (len(entries) - MAX_SHOWN))
+    return '<body id="bespoke-docs-hover">%s</body>' % ''.join(parts)
@@ -0,0 +1,775 @@
+"""
+Language parsers: recognise a function or variable definition and describe its docblock as tag records.
+
+Based on DocBlockr v2.14.1 by Nick Fisher (https://github.com/spadgos/sublime-jsdocs)
+"""
+import re
+from . import body
+from .template import TemplateError, compileTemplate
+from .textview import TextView
+from .render import Tag, Text, TYPE_STOP, DESCRIPTION_STOP, CURLY_TYPE, STOP, RAW
+
+
+# put before the identifier a rule starts with: a search then only tries it from the start of words, as
+# none of the rules can match from inside an identifier without matching from its start
+IDENTIFIER_START = r'(?<![a-zA-Z_$])'
+
+# the variable definitions parseVar recognises, for an identifier pattern:
+#   var foo = blah,
+#       foo = blah;
+#   baz.foo = blah;
+#   baz = {
+#        foo : blah
+#   }
+VAR_PATTERN = r'(?P<name>' + IDENTIFIER_START + r'%s)\s*[=:]\s*(?P<val>[^;,\n]*)(?:[;,]|$)'
+
+# the start of the lines which may hold a definition (all the rules need one of these characters, and
+# comments are stripped), or a block comment (for a pattern), whose lines `scan` skips
+SCAN_PATTERN = r'^(?=[^\n=:(>/]*[=:(>/])|(%s)'
+
+
+# for splitByCommas: text outside of sections, a comma, or a section inside which commas don't separate
+# arguments: from a quote or opening bracket to the next matching quote or closing bracket (not nested), or
+# to the end of the text
+reSplitToken = re.compile(
+    r'''[^,"'<({]+|,'''
+    + ''.join(r'|%s(?:\\[\s\S]|[^%s\\])*(?:%s|\\?)' % (re.escape(opener), re.escape(closer), re.escape(closer))
+              for opener, closer in ('""', "''", '<>', '()', '{}'))
+)
+reEscape = re.compile(r'\\([\s\S]?)')
+
+
+def read_line(view, point):
+    if (point >= view.size()):
+        return
+
+    next_line = view.line(point)
+    return view.substr(next_line)
+
+
+def is_numeric(val):
+    try:
+        float(val)
+        return True
+    except ValueError:
+        return False
+
+
+def splitByCommas(str):
+    """
+    Split a string by unenclosed commas: that is, commas which are not inside of quotes or brackets.
+
+    splitByCommas('foo, bar(baz, quux), fwip = "hey, hi"')
+     ==> ['foo', 'bar(baz, quux)', 'fwip = "hey, hi"']
+    """
+    out = []
+
+    if not str:
+        return out
+
+    # the current token
+    current = ''
+    for token in reSplitToken.findall(str):
+        if token == ',':
+            out.append(current.strip())
+            current = ''
+        elif token[0] in '"\'<({':
+            # a section: backslashes escape the character after them, and are left out
+            current += reEscape.sub('\\1', token) if '\\' in token else token
+        else:
+            current += token
+
+    out.append(current.strip())
+    return out
+
+
+def flatten(theList):
+    """
+    Flatten a shallow list. Only works when all items are lists.
+    [[(1,1)], [(2,2), (3, 3)]] --> [(1,1), (2,2), (3,3)]
+    """
+    return [item for sublist in theList for item in sublist]
+
+
+class BespokeDocsParser(object):
+
+    def __init__(self, pluginSettings):
+        self.pluginSettings = pluginSettings
+        self.setupSettings()
+        self.nameOverride = None
+        self.body = None
+        self.inline = False
+        self.templates = {}  # kind -> compiled template, or None
+        self.callSites = None
+        self.nameTypes = {}  # name -> guessTypeFromName(name)
+
+    def isExistingComment(self, line):
+        return re.search('^\\s*\\*', line)
+
+    def setNameOverride(self, name):
+        """ overrides the description of the function - used instead of parsed description """
+        self.nameOverride = name
+
+    def getNameOverride(self):
+        return self.nameOverride
+
+    def setBody(self, body):
+        """ the analysis of the body of the function being documented (see `scanBody`), or None if it wasn't read """
+        self.body = body
+
+    def setCallSites(self, index):
+        """ a `callsites.CallSiteIndex` to type parameters from the arguments passed to the function """
+        self.callSites = index
+
+    def observedTypes(self, name):
+        """ the most common type of each argument passed to the function name, as far as it was seen """
+        return self.callSites.types(name) if self.callSites is not None and name else ()
+
+    def bodyScanLimit(self):
+        """ the number of characters of code to read for `scanBody`, or 0 to not read function bodies """
+        return self.pluginSettings.get('body_scan_limit', 0) or 0
+
+    def scanBody(self, text):
+        """
+        Analyse the body of the function defined at the start of text, which should be at most `bodyScanLimit`
+        characters of code. Returns None if there is no body to read.
+        """
+        return self.settings['bodyScanner'](text, len(text) < self.bodyScanLimit())
+
+    def parseFunction(self, line):
+        """ (name, args, retval) of the function defined in line, or None """
+        for hints, pattern in self.settings['fnRules']:
+            # a rule can't match a line holding none of its hints
+            for hint in hints:
+                if hint in line:
+                    res = pattern.search(line)
+                    if res:
+                        return self.functionFromGroups(res.groupdict())
+                    break
+        return None
+
+    def parseVar(self, line):
+        """ (name, value) of the variable defined in line, or None """
+        hints, pattern = self.settings['varRule']
+        for hint in hints:
+            if hint in line:
+                res = pattern.search(line)
+                return res and self.varFromGroups(res.groupdict())
+        return None
+
+    def varFromGroups(self, res):
+        return (res['name'], res['val'].strip())
+
+    def parse(self, line):
+        if self.pluginSettings.get('simple_mode'):
+            return None
+
+        try:
+            out = self.parseFunction(line)  # (name, args, retval, options)
+            if (out):
+                template = self.getTemplate('function')
+                if template:
+                    return self.alignDescriptions(template(self.functionContext(*out), self.typeFlags()))
+                return self.formatFunction(*out)
+
+            out = self.parseVar(line)
+            if out:
+                template = self.getTemplate('var')
+                if template:
+                    return template(self.varContext(*out), self.typeFlags())
+                return self.formatVar(*out)
+        except:
+            # TODO show exception if dev\debug mode
+            return None
+
+        return None
+
+    def describe(self, line):
+        """
+        Describe the definition in line as a dict, or return None if it isn't one. eg:
+        {'kind': 'function', 'name': 'foo', 'generator': False, 'params': [{'name': 'bar', 'type': None}], 'returns': False}
+        {'kind': 'var', 'name': 'foo', 'type': 'Number'}
+        """
+        return self.describeDefinition(line, self.body)
+
+    def describeDefinition(self, line, retval, skipNames=()):
+        """
+        describe, with retval the analysis of the body of a function defined in line (or None). None if the
+        function is named in skipNames.
+        """
+        try:
+            out = self.parseFunction(line)
+            if out:
+                if out[0] in skipNames:
+                    return None
+                return self.describeFunction(out[0], out[1], retval)
+
+            out = self.parseVar(line)
+            if out:
+                return self.describeVar(out[0], out[1])
+        except:
+            return None
+
+        return None
+
+    def describeFunction(self, name, args, retval):
+        params = []
+        if args:
+            for argType, argName in self.parseArgs(re.sub(r'/\*.*?\*/', '', args)):
+                params.append({'name': argName, 'type': argType or self.guessTypeFromName(argName) or None})
+        return {
+            'kind': 'function',
+            'name': name.lstrip('*'),
+            'generator': name.startswith('*'),
+            'params': params,
+            'returns': self.getFunctionReturnType(name, retval)
+        }
+
+    def describeVar(self, name, val):
+        valType = (val and self.guessTypeFromValue(val)) or self.guessTypeFromName(name) or None
+        return {'kind': 'var', 'name': name, 'type': valType}
+
+    def scan(self, text):
+        """
+        Yields a description (as made by `describe`) of every definition in text, in order, with the
+        'begin' and 'end' offsets of the lines it spans. Each line which doesn't start in a block comment is
+        read as `getDefinition` would from its start, except that a line closing more brackets than it
+        opens is read alone (it ends a definition rather than starts one). Function bodies aren't read, and
+        statements like `if (x) {`, which read as methods named after the keyword, are skipped.
+
+        A single pattern walks the text, stopping only at the lines with a character some rule needs.
+        """
+        fnOpener = self.settings['fnOpener'] and re.compile(self.settings['fnOpener'])
+        view = None
+        for match in re.finditer(SCAN_PATTERN % self.settings['blockComment'], text, re.M):
+            if match.group(1) is not None:
+                continue
+            begin = match.start()
+            end = text.find('\n', begin)
+            if end < 0:
+                end = len(text)
+            line = text[begin:end]
+            if '//' in line or '/*' in line:
+                line = re.sub(r"/\*.*\*/", "", re.sub(r"//.*", "", line))
+            if '(' in line:
+                opener = fnOpener.search(line) if fnOpener else None
+                brackets = line[opener.start():] if opener else line
+                if brackets.count('(') > brackets.count(')'):
+                    # the definition goes on over the next lines
+                    if view is None:
+                        view = TextView(text)
+                    line, pos = self.readDefinition(view, begin)
+                    end = min(pos - 1, len(text))
+            described = self.describeDefinition(line, None, body.CONTROL_KEYWORDS)
+            if described:
+                described['begin'] = begin
+                described['end'] = end
+                yield described
+
+    def getTemplate(self, kind):
+        """
+        The compiled template of the `templates` setting for a kind of definition ('function' or 'var') in
+        this language, or None to use the built-in one. Templates are looked up once per parser, and
+        inline blocks always use the built-in ones. A broken template is reported on the console, and the
+        built-in one used instead.
+        """
+        if self.inline:
+            return None
+        if kind not in self.templates:
+            templates = self.pluginSettings.get('templates') or {}
+            language = templates.get(self.settings['language']) or {}
+            lines = language.get(kind) or (templates.get('*') or {}).get(kind)
+            try:
+                self.templates[kind] = compileTemplate(lines) if lines else None
+            except TemplateError as error:
+                print('BespokeDocs: the "templates" setting has a broken %s template for %s, using the built-in '
+                      'one: %s' % (kind, self.settings['language'], error))
+                self.templates[kind] = None
+        return self.templates[kind]
+
+    def alignDescriptions(self, records):
+        """
+        Give the tags of a template without a name column an empty one, so their description lines up with
+        those of the tags with a name, as formatFunction does for the return tag.
+        """
+        if self.pluginSettings.get('align_tags') != 'deep' or self.pluginSettings.get('per_section_indent'):
+            return records
+        if any(isinstance(record, Tag) and record.name for record in records):
+            for record in records:
+                if isinstance(record, Tag) and record.name is None and record.type is not None and \
+                        record.description is not None:
+                    record.name = ''
+        return records
+
+    def functionContext(self, name, args, retval):
+        """ the variables of the templates of functions """
+        params = []
+        if args:
+            for argType, argName in self.iterParams(name, args):
+                params.append({'name': argName, 'type': argType})
+        retType = self.getFunctionReturnType(name, retval)
+        return {
+            'name': name.lstrip('*'),
+            'description': self.getNameOverride() or ('[%s%sdescription]' % (name, ' ' if name else '')),
+            'params': params,
+            # None when nothing is returned
+            'returns': None if retType is None else (retType or '[type]'),
+            'generator': name.startswith('*') or bool(retval and retval['generator']),
+            'async': bool(retval and retval['async'])
+        }
+
+    def varContext(self, name, val):
+        """ the variables of the templates of variables """
+        valType = (val and self.guessTypeFromValue(val)) or self.guessTypeFromName(name) or '[type]'
+        return {
+            'name': name,
+            'description': '[%s description]' % name,
+            'type': valType if self.settings['typeInfo'] else None,
+            'value': val
+        }
+
+    def formatVar(self, name, val, valType=None):
+        out = []
+        if not valType:
+            if not val or val == '':  # quick short circuit
+                valType = "[type]"
+            else:
+                valType = self.guessTypeFromValue(val) or self.guessTypeFromName(name) or "[type]"
+        typeTag = '@' + self.settings['typeTag']
+        if self.inline:
+            out.append(Tag(typeTag, valType, description='[description]', flags=self.typeFlags() | DESCRIPTION_STOP))
+        else:
+            out.append(Text('[%s description]' % name, STOP))
+            out.append(Tag(typeTag, valType, flags=self.typeFlags()))
+
+        return out
+
+    def typeFlags(self):
+        return TYPE_STOP | (CURLY_TYPE if self.settings['curlyTypes'] else 0)
+
+    def getTypeInfo(self, argType, argName, observedType=None):
+        """
+        returns the type to document for an argument, or None if the language has no type info
+        observedType is the type most often passed for the argument, if known
+        """
+        if self.settings['typeInfo']:
+            return argType or self.guessTypeFromName(argName) or observedType or "[type]"
+
+        return None
+
+    def formatFunction(self, name, args, retval, options={}):
+        out = []
+        if 'as_setter' in options:
+            out.append(Tag('@private'))
+            return out
+
+        extraTagAfter = self.pluginSettings.get("extra_tags_go_after") or False
+
+        description = self.getNameOverride() or ('[%s%sdescription]' % (name, ' ' if name else ''))
+        if self.pluginSettings.get('function_description'):
+            out.append(Text(description, STOP))
+
+        if (self.pluginSettings.get("autoadd_method_tag") is True):
+            out.append(Tag('@method', name=name))
+
+        if not extraTagAfter:
+            self.addExtraTags(out)
+
+        # if there are arguments, add a @arg/param for each
+        if (args):
+            paramTag = '@param' if self.pluginSettings.get('prefer_param') else '@arg'
+            paramDescription = '[description]' if self.pluginSettings.get('param_description') else None
+            # comments inside the argument list are removed
+            for argType, argName in self.iterParams(name, args):
+                out.append(Tag(
+                    paramTag,
+                    argType,
+                    argName if self.pluginSettings.get('param_name') else '',
+                    paramDescription,
+                    self.typeFlags() | DESCRIPTION_STOP
+                ))
+
+        # return value type might be already available in some languages but
+        # even then ask language specific parser if it wants it listed
+        retType = self.getFunctionReturnType(name, retval)
+        if retType is not None:
+            returnTag = Tag(
+                self.pluginSettings.get('return_tag') or '@return',
+                (retType or "[type]") if self.settings['typeInfo'] else None,
+                flags=self.typeFlags() | DESCRIPTION_STOP
+            )
+
+            if (self.pluginSettings.get('return_description')):
+                returnTag.description = '[description]'
+
+                # the empty name column is so that the description will align with the param description
+                if args and self.pluginSettings.get('align_tags') == 'deep':
+                    if not self.pluginSettings.get('per_section_indent'):
+                        returnTag.name = ''
+
+            out.append(returnTag)
+
+        for notation in self.getMatchingNotations(name):
+            if 'tags' in notation:
+                out.extend(tag if isinstance(tag, Tag) else Text(tag, RAW) for tag in notation['tags'])
+
+        if extraTagAfter:
+            self.addExtraTags(out)
+
+        return out
+
+    def getFunctionReturnType(self, name, retval):
+        """
+        returns None for no return type. False meaning unknown, or a string
+        retval is the analysis of the function body, when it was read
+        """
+
+        if re.match("[A-Z]", name):
+            # no return, but should add a class
+            return None
+
+        if retval:
+            if retval['generator']:
+                return None
+            bodyType = self.getBodyReturnType(retval)
+            if retval['async']:
+                return 'Promise' + ('.<%s>' % bodyType if bodyType else '')
+            if bodyType is None:
+                # nothing is returned
+                return None
+            if bodyType:
+                return bodyType
+
+        if re.match('[$_]?(?:set|add)($|[A-Z_])', name):
+            # setter/mutator, no return
+            return None
+
+        if re.match('[$_]?(?:is|has)($|[A-Z_])', name):  # functions starting with 'is' or 'has'
+            return self.settings['bool']
+
+        return self.guessTypeFromName(name) or False
+
+    def getBodyReturnType(self, body):
+        """
+        the type of the values returned by a function body: None if it returns none, False if unknown
+        """
+        if not body['returns']:
+            return None if body['complete'] else False
+
+        types = []
+        for value in body['returns']:
+            valType = self.guessTypeFromValue(value)
+            if not valType:
+                return False
+            if valType not in types:
+                types.append(valType)
+        return '|'.join(types)
+
+    def parseArgs(self, args):
+        """
+        a list of tuples, the first being the best guess at the type, the second being the name
+        """
+        return flatten(self.parseArgPositions(args))
+
+    def parseArgPositions(self, args):
+        """ like parseArgs, with a list of tuples for each position (more than one for destructured arguments) """
+        return [self.getArgInfo(arg) for arg in splitByCommas(args)]
+
+    def iterParams(self, name, args):
+        """ the (type, name) of each parameter in args, where the type includes the types observed in calls """
+        for argType, argName, observedType in self.iterArgs(name, args):
+            yield self.getTypeInfo(argType, argName, observedType), argName
+
+    def iterArgs(self, name, args):
+        """ the (declared type, name, type observed in calls) of each parameter in args, the types or None """
+        observed = self.observedTypes(name)
+        for position, params in enumerate(self.parseArgPositions(re.sub(r'/\*.*?\*/', '', args))):
+            observedType = observed[position] if len(params) == 1 and position < len(observed) else None
+            for argType, argName in params:
+                yield argType, argName, observedType
+
+    def getArgInfo(self, arg):
+        """
+        Return a list of tuples, one for each argument derived from the arg param.
+        """
+        return [(self.getArgType(arg), self.getArgName(arg))]
+
+    def getArgType(self, arg):
+        return None
+
+    def getArgName(self, arg):
+        return arg
+
+    def addExtraTags(self, out):
+        extraTags = self.pluginSettings.get('extra_tags', [])
+        if (len(extraTags) > 0):
+            out.extend(Text(tag, RAW) for tag in extraTags)
+
+    def guessTypeFromName(self, name):
+        # names come up again and again while scanning a file
+        if name not in self.nameTypes:
+            if len(self.nameTypes) > 10000:
+                self.nameTypes.clear()
+            self.nameTypes[name] = self.findTypeFromName(name)
+        return self.nameTypes[name]
+
+    def findTypeFromName(self, name):
+        matches = self.getMatchingNotations(name)
+        if len(matches):
+            rule = matches[0]
+            if ('type' in rule):
+                return self.settings[rule['type']] if rule['type'] in self.settings else rule['type']
+
+        if (re.match("(?:is|has)[A-Z_]", name)):
+            return self.settings['bool']
+
+        if (re.match("^(?:cb|callback|done|next|fn)$", name)):
+            return self.settings['function']
+
+        return False
+
+    def getMatchingNotations(self, name):
+        def checkMatch(rule):
+            if 'prefix' in rule:
+                regex = re.escape(rule['prefix'])
+                if re.match('.*[a-z]', rule['prefix']):
+                    regex += '(?:[A-Z_]|$)'
+                return re.match(regex, name)
+            elif 'regex' in rule:
+                return re.search(rule['regex'], name)
+
+        return list(filter(checkMatch, self.pluginSettings.get('notation_map', [])))
+
+    def getDefinition(self, view, pos):
+        """
+        get a relevant definition starting at the given point
+        returns string
+        """
+        return self.readDefinition(view, pos)[0]
+
+    def readDefinition(self, view, pos):
+        """ like getDefinition, returning (definition, the point past the last line read) """
+        maxLines = 25  # don't go further than this
+        openBrackets = 0
+
+        definition = ''
+
+        for i in range(0, maxLines):
+            line = read_line(view, pos)
+            if line is None:
+                break
+
+            pos += len(line) + 1
+            # strip comments
+            if '/' in line:
+                line = re.sub(r"//.*",     "", line)
+                line = re.sub(r"/\*.*\*/", "", line)
+
+            searchForBrackets = line
+
+            # on the first line, only start looking from *after* the actual function starts. This is
+            # needed for cases like this:
+            # (function (foo, bar) { ... })
+            if definition == '':
+                opener = re.search(self.settings['fnOpener'], line) if self.settings['fnOpener'] else False
+                if opener:
+                    # ignore everything before the function opener
+                    searchForBrackets = line[opener.start():]
+
+            # count the number of open parentheses
+            openBrackets += searchForBrackets.count('(') - searchForBrackets.count(')')
+
+            definition += line
+            if openBrackets == 0:
+                break
+        return definition, pos
+
+
+class BespokeDocsJavascript(BespokeDocsParser):
+    def setupSettings(self):
+        identifier = '[a-zA-Z_$][a-zA-Z_$0-9]*'
+        self.settings = {
+            # curly brackets around the type information
+            "curlyTypes": True,
+            'typeInfo': True,
+            'language': 'js',
+            "typeTag": self.pluginSettings.get('override_js_var') or "type",
+            # technically, they can contain all sorts of unicode, but w/e
+            "varIdentifier": identifier,
+            "fnIdentifier":  identifier,
+            "fnOpener": '(?:'
+                    + r'function[\s*]*(?:' + identifier + r')?\s*\('
+                    + '|'
+                    + '(?:' + identifier + r'|\(.*\)\s*=>)'
+                    + '|'
+                    + '(?:' + identifier + r'\s*\(.*\)\s*\{)'
+                    + ')',
+            # the definitions parseFunction recognises, tried in order, after the strings (hints) a line
+            # must hold one of for each to match
+            "fnRules": [
+                # Normal functions...
+                #   fnName = function,  fnName : function
+                (('function',), re.compile(
+                    r'(?:(?P<name1>' + IDENTIFIER_START + identifier + r')\s*[:=]\s*)?'
+                    + 'function'
+                    # function fnName, function* fnName
+                    + r'(?P<generator>[\s*]+)?(?P<name2>' + identifier + ')?'
+                    # (arg1, arg2)
+                    + r'\s*\(\s*(?P<args>.*)\)'
+                )),
+                # ES6 arrow functions
+                # () => y,  x => y,  (x, y) => y,  (x = 4) => y
+                (('=>',), re.compile(
+                    r'(?:(?P<args>' + IDENTIFIER_START + identifier + r')|\(\s*(?P<args2>.*)\))\s*=>'
+                )),
+                # ES6 method initializer shorthand
+                # var person = { getName() { return this.name; } }
+                (('{',), re.compile(r'(?P<name1>' + IDENTIFIER_START + identifier + r')\s*\((?P<args>.*)\)\s*\{'))
+            ],
+            "varRule": (('=', ':'), re.compile(VAR_PATTERN % identifier)),
+            "blockComment": r'/\*[\s\S]*?\*/',
+            "commentCloser": " */",
+            "bodyScanner": body.braces,
+            "bool": "Boolean",
+            "function": "Function"
+        }
+
+    def functionFromGroups(self, res):
+        groups = {
+            'name1': '',
+            'name2': '',
+            'generator': '',
+            'args': '',
+            'args2': ''
+        }
+        groups.update(res)
+        # grab the name out of "name1 = function name2(foo)" preferring name1
+        generatorSymbol = '*' if (groups['generator'] or '').find('*') > -1 else ''
+        name = generatorSymbol + (groups['name1'] or groups['name2'] or '')
+        args = groups['args'] or groups['args2'] or ''
+
+        return (name, args, self.body)
+
+    def getArgInfo(self, arg):
+        if arg[:1] == '{' and re.search('^\{.*\}$', arg):
+            subItems = splitByCommas(arg[1:-1])
+            prefix = 'options.'
+        else:
+            subItems = [arg]
+            prefix = ''
+
+        out = []
+        for subItem in subItems:
+            out.append((self.getArgType(subItem), prefix + self.getArgName(subItem)))
+
+        return out
+
+    def getArgType(self, arg):
+        parts = re.split(r'\s*=\s*', arg, 1) if '=' in arg else [arg]
+        # rest parameters
+        if parts[0].find('...') == 0:
+            return '...[type]'
+        elif len(parts) > 1:
+            return self.guessTypeFromValue(parts[1])
+
+    def getArgName(self, arg):
+        namePart = re.split(r'\s*=\s*', arg, 1)[0] if '=' in arg else arg
+
+        # check for rest parameters, eg: function (foo, ...rest) {}
+        if namePart.find('...') == 0:
+            return namePart[3:]
+        return namePart
+
+    def getFunctionReturnType(self, name, retval):
+        if name and name[0] == '*':
+            return None
+        return super(BespokeDocsJavascript, self).getFunctionReturnType(name, retval)
+
+    def getMatchingNotations(self, name):
+        out = super(BespokeDocsJavascript, self).getMatchingNotations(name)
+        if name and name[0] == '*':
+            # if '@returns' is preferred, then also use '@yields'. Otherwise, '@return' and '@yield'
+            yieldTag = '@yield' + ('s' if self.pluginSettings.get('return_tag', '_')[-1] == 's' else '')
+            description = '[description]' if self.pluginSettings.get('return_description', True) else None
+            out.append({ 'tags': [
+                Tag(yieldTag, '[type]', description=description, flags=TYPE_STOP | CURLY_TYPE | DESCRIPTION_STOP)
+            ]})
+        return out
+
+    def guessTypeFromValue(self, val):
+        lowerPrimitives = self.pluginSettings.get('lower_case_primitives') or False
+        shortPrimitives = self.pluginSettings.get('short_primitives') or False
+        if is_numeric(val):
+            return "number" if lowerPrimitives else "Number"
+        if val[0] == '"' or val[0] == "'":
+            return "string" if lowerPrimitives else "String"
+        if val[0] == '[':
+            return "Array"
+        if val[0] == '{':
+            return "Object"
+        if val == 'true' or val == 'false':
+            returnVal = 'Bool' if shortPrimitives else 'Boolean'
+            return returnVal.lower() if lowerPrimitives else returnVal
+        if re.match('RegExp\\b|\\/[^\\/]', val):
+            return 'RegExp'
+        if val.find('=>') > -1:
+            return 'function' if lowerPrimitives else 'Function'
+        if val[:4] == 'new ':
+            res = re.search('new (' + self.settings['fnIdentifier'] + ')', val)
+            return res and res.group(1) or None
+        return None
+
+
+class BespokeDocsCoffee(BespokeDocsParser):
+    def setupSettings(self):
+        identifier = '[a-zA-Z_$][a-zA-Z_$0-9]*'
+        self.settings = {
+            # curly brackets around the type information
+            'curlyTypes': True,
+            'typeTag': self.pluginSettings.get('override_js_var') or "type",
+            'typeInfo': True,
+            'language': 'coffee',
+            # technically, they can contain all sorts of unicode, but w/e
+            'varIdentifier': identifier,
+            'fnIdentifier': identifier,
+            'fnOpener': None,  # no multi-line function definitions for you, hipsters!
+            'fnRules': [
+                #   fnName = function,  fnName : function
+                (('>',), re.compile(
+                    '(?:(?P<name>' + IDENTIFIER_START + identifier + ')\\s*[:=]\\s*)?'
+                    + '(?:\\((?P<args>[^()]*?)\\))?\\s*([=-]>)'
+                ))
+            ],
+            'varRule': (('=', ':'), re.compile(VAR_PATTERN % identifier)),
+            'blockComment': '###[\\s\\S]*?###',
+            'commentCloser': '###',
+            'bodyScanner': body.indented,
+            'bool': 'Boolean',
+            'function': 'Function'
+        }
+
+    def functionFromGroups(self, res):
+        # grab the name out of "name1 = function name2(foo)" preferring name1
+        name = res['name'] or ''
+        args = res['args']
+
+        return (name, args, self.body)
+
+    def guessTypeFromValue(self, val):
+        lowerPrimitives = self.pluginSettings.get('lower_case_primitives') or False
+        if is_numeric(val):
+            return "number" if lowerPrimitives else "Number"
+        if val[0] == '"' or val[0] == "'":
+            return "string" if lowerPrimitives else "String"
+        if val[0] == '[':
+            return "Array"
+        if val[0] == '{':
+            return "Object"
+        if val == 'true' or val == 'false':
+            return "boolean" if lowerPrimitives else "Boolean"
+        if re.match('RegExp\\b|\\/[^\\/]', val):
+            return 'RegExp'
+        if val[:4] == 'new ':
+            res = re.search('new (' + self.settings['fnIdentifier'] + ')', val)
+            return res and res.group(1) or None
+        return None
@@ -0,0 +1,96 @@
+"""
+Docblocks rendered ahead of time, for the definitions the user is likely to document next.
+
+While the editor is idle, the plugin renders the blocks of the undocumented definitions in view, and the
+command generating a block looks its definition up here before parsing anything. Entries are found by
+what a generated block depends on (the definition, the code of its body, the call site index and the
+date) rather than by position, so they survive edits elsewhere in the view: typing the `/**` which asks
+for a block is one.
+"""
+import threading
+from .render import getVariable
+
+
+# the blocks kept per view
+MAX_BLOCKS = 500
+
+
+def usesClock(pluginSettings):
+    """ whether generated blocks show the time, which rules out rendering them ahead """
+    return '{{datetime}}' in repr((pluginSettings.get('templates'), pluginSettings.get('extra_tags')))
+
+
+def blockKey(parser, line, bodyText):
+    """ what the block generated for the definition line, followed by bodyText, depends on """
+    # a new index holds no types, like no index at all
+    callSites = parser.callSites.version if parser.callSites is not None else 0
+    return (parser.settings['language'], line, hash(bodyText), callSites, getVariable('date'))
+
+
+def undocumentedDefinitions(parser, text):
+    """ the offsets of the lines of the definitions in text which don't follow a comment """
+    closer = parser.settings['commentCloser'].strip()
+    for described in parser.scan(text):
+        end = described['begin']
+        while end > 0 and text[end - 1].isspace():
+            end -= 1
+        if text.endswith(closer, 0, end):
+            continue
+        yield described['begin']
+
+
+class PrecomputedBlocks(object):
+    """
+    Rendered snippets by view and key (see `blockKey`), filled from a background thread and read by the
+    command, with the counts of hits and misses.
+    """
+
+    def __init__(self, maxBlocks=MAX_BLOCKS):
+        self.lock = threading.Lock()
+        self.maxBlocks = maxBlocks
+        self.views = {}  # view id -> {key: snippet}
+        self.counters = {'hits': 0, 'misses': 0, 'computed': 0, 'computeTime': 0.0, 'passes': 0, 'passTime': 0.0}
+
+    def __contains__(self, item):
+        viewId, key = item
+        with self.lock:
+            return key in self.views.get(viewId, ())
+
+    def get(self, viewId, key):
+        """ the snippet rendered for key, or None; counted as a hit or a miss """
+        with self.lock:
+            snippet = self.views.get(viewId, {}).get(key)
+            self.counters['misses' if snippet is None else 'hits'] += 1
+            return snippet
+
+    def put(self, viewId, key, snippet, seconds):
+        """ keep a snippet which took seconds to render """
+        with self.lock:
+            blocks = self.views.setdefault(viewId, {})
+            if len(blocks) >= self.maxBlocks:
+                blocks.clear()
+            blocks[key] = snippet
+            self.counters['computed'] += 1
+            self.counters['computeTime'] += seconds
+
+    def recordPass(self, seconds):
+        with self.lock:
+            self.counters['passes'] += 1
+            self.counters['passTime'] += seconds
+
+    def discard(self, viewId):
+        with self.lock:
+            self.views.pop(viewId, None)
+
+    def clear(self):
+        with self.lock:
+            self.views.clear()
+
+    def stats(self):
+        """ the counters, with the hit rate and the average time a hit saved (in seconds) """
+        with self.lock:
+            out = dict(self.counters)
+        lookups = out['hits'] + out['misses']
+        out['hitRate'] = out['hits'] / lookups if lookups else 0.0
+        out['saved'] = out['computeTime'] / out['computed'] if out['computed'] else 0.0
+        return out
@@ -0,0 +1,108 @@
+"""
+Walking a project, and mapping a function over its files in parallel.
+"""
+import os
+import collections
+from .parser import BespokeDocsJavascript, BespokeDocsCoffee
+
+
+SOURCE_EXTENSIONS = ('.js', '.jsx', '.mjs', '.es6', '.coffee')
+IGNORED_DIRECTORIES = ('.git', '.hg', '.svn', 'node_modules', 'bower_components')
+
+
+def iterSourceFiles(paths, extensions=SOURCE_EXTENSIONS, ignored=IGNORED_DIRECTORIES):
+    """
+    Yields every source file under paths (files or directories), lazily and in a stable order.
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+            except OSError:
+                continue
+            subdirectories = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in ignored:
+                        subdirectories.append(entry.path)
+                elif entry.name.endswith(extensions):
+                    yield entry.path
+            stack.extend(reversed(subdirectories))
+
+
+def getParserForFile(path, pluginSettings):
+    if path.endswith('.coffee'):
+        return BespokeDocsCoffee(pluginSettings)
+    return BespokeDocsJavascript(pluginSettings)
+
+
+def readSource(path):
+    with open(path, encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def readExactSource(path):
+    """
+    The text of the file at path with its line endings as they are, for the tools which write it back; None
+    if it isn't valid UTF-8, as it couldn't be written back unchanged.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+
+
+def writeSource(path, text):
+    """ write text (from readExactSource) back to path, without translating its line endings """
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+class Done(object):
+    """ a result which is already known, queued alongside the pending futures """
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+def imapBounded(fn, iterable, jobs=None, initializer=None, initargs=(), window=None, lookup=None):
+    """
+    Like `map(fn, iterable)`, but run in a pool of `jobs` processes. Results are yielded in order, and at most
+    `window` items are in flight at any time, so that memory stays bounded however long iterable is.
+    With jobs=1 everything runs in this process.
+
+    If given, `lookup(item)` is called first (in this process), and fn is skipped for items where it
+    returns something other than None.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        if initializer:
+            initializer(*initargs)
+        for item in iterable:
+            result = lookup(item) if lookup else None
+            yield fn(item) if result is None else result
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    window = window or jobs * 4
+    pending = collections.deque()
+    with ProcessPoolExecutor(jobs, initializer=initializer, initargs=initargs) as pool:
+        for item in iterable:
+            result = lookup(item) if lookup else None
+            pending.append(pool.submit(fn, item) if result is None else Done(result))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
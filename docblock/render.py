@@ -0,0 +1,251 @@
+"""
+Intermediate representation of a docblock and the renderer which turns it into text.
+
+The parsers describe a block as a list of `Tag` and `Text` records. `DocBlockRenderer` walks that list
+once, numbering the tab stops, substituting variables, aligning the tag columns and adding the spacers
+between sections as it goes.
+"""
+import re
+import datetime
+import time
+
+
+# Tag flags: which fields are tab stops, and whether the type is wrapped in curly brackets
+TYPE_STOP = 1
+NAME_STOP = 2
+DESCRIPTION_STOP = 4
+CURLY_TYPE = 8
+
+# Text flags
+STOP = 1  # the whole line is a single tab stop
+RAW = 2   # snippet text supplied by the user (extra_tags, notation_map), used as is
+
+
+def counter():
+    count = 0
+    while True:
+        count += 1
+        yield(count)
+
+
+def escape(str):
+    return str.replace('$', '\$').replace('{', '\{').replace('}', '\}')
+
+
+class Tag(object):
+    """
+    A single @tag line. A field set to None is left out, an empty string keeps its (empty) column.
+    """
+    __slots__ = ('tag', 'type', 'name', 'description', 'flags')
+
+    def __init__(self, tag, type=None, name=None, description=None, flags=0):
+        self.tag = tag
+        self.type = type
+        self.name = name
+        self.description = description
+        self.flags = flags
+
+    def asDict(self):
+        return {
+            'tag': self.tag[1:],
+            'type': self.type,
+            'name': self.name or None,
+            'description': self.description
+        }
+
+    def __eq__(self, other):
+        return isinstance(other, Tag) and all(getattr(self, k) == getattr(other, k) for k in Tag.__slots__)
+
+    def __repr__(self):
+        return 'Tag(%r, %r, %r, %r, %d)' % (self.tag, self.type, self.name, self.description, self.flags)
+
+
+class Text(object):
+    """
+    A line without tag columns: the description, or raw snippet text taken from the settings.
+    """
+    __slots__ = ('text', 'flags')
+
+    def __init__(self, text, flags=0):
+        self.text = text
+        self.flags = flags
+
+    def asDict(self):
+        return {'text': self.text}
+
+    def __eq__(self, other):
+        return isinstance(other, Text) and self.text == other.text and self.flags == other.flags
+
+    def __repr__(self):
+        return 'Text(%r, %d)' % (self.text, self.flags)
+
+
+reTabStop = re.compile('(\\$\\{)\\d+(:[^}]+\\})')
+reSnippetField = re.compile('[$][{]\\d+:([^}]+)[}]')
+reVariable = re.compile(r'\{\{([^}]+)\}\}')
+reTagName = re.compile('^\\s*@([a-zA-Z]+)(?=\\s|$)')
+
+
+def outputWidth(str):
+    # get the length of a string, after it is output as a snippet,
+    # "${1:foo}" --> 3
+    return len(reSnippetField.sub('\\1', str).replace('\$', '$'))
+
+
+def getVar(match):
+    value = getVariable(match.group(1))
+    return match.group(0) if value is None else value
+
+
+def getVariable(varName):
+    """ the value of a {{variable}} of the snippets in the settings, or None if there is no such variable """
+    if varName == 'datetime':
+        date = datetime.datetime.now().replace(microsecond=0)
+        offset = time.timezone / -3600.0
+        return "%s%s%02d%02d" % (
+            date.isoformat(),
+            '+' if offset >= 0 else "-",
+            abs(offset),
+            (offset % 1) * 60
+        )
+    elif varName == 'date':
+        return datetime.date.today().isoformat()
+    return None
+
+
+class DocBlockRenderer(object):
+    """
+    Renders a list of records as a snippet (the default) or as plain text.
+    """
+
+    def __init__(self, pluginSettings, parserSettings, snippet=True):
+        get = pluginSettings.get
+        self.snippet = snippet
+        self.prefix = "*"
+        self.indentSpaces = " " * max(0, get("indentation_spaces", 1))
+        self.commentCloser = parserSettings['commentCloser']
+
+        alignTags = get("align_tags", 'deep')
+        self.deepAlignTags = alignTags == 'deep'
+        self.shallowAlignTags = alignTags in ('shallow', True)
+        self.minColSpaces = get('min_spaces_between_columns', 1)
+        # the return tag isn't aligned with the other sections when indenting per section
+        self.returnTag = (get('return_tag') or '@return') if get('per_section_indent') else False
+
+        spacer = get('spacer_between_sections')
+        self.spacerBetweenSections = spacer == True
+        self.spacerAfterDescription = spacer == 'after_description' and bool(get('function_description'))
+        self.noFunctionDescription = get('function_description') == False
+        self.newlineAfterBlock = bool(get('newline_after_block'))
+
+    def field(self, text, isStop, tabIndex):
+        if not self.snippet:
+            return text
+        if isStop:
+            return "${%d:%s}" % (next(tabIndex), escape(text))
+        return escape(text)
+
+    def rawText(self, text, tabIndex):
+        text = reVariable.sub(getVar, text)
+        if not self.snippet:
+            return reSnippetField.sub('\\1', text)
+
+        def swapTabs(m):
+            return "%s%d%s" % (m.group(1), next(tabIndex), m.group(2))
+        return reTabStop.sub(swapTabs, text)
+
+    def render(self, records, inline=False, trailingString=''):
+        tabIndex = counter()
+        align = (self.shallowAlignTags or self.deepAlignTags) and not inline
+
+        # each row is (tag name or None, text or list of columns, column widths or None)
+        rows = []
+        maxWidths = []
+        for record in records or []:
+            if isinstance(record, Tag):
+                flags = record.flags
+                columns = [record.tag]
+                if record.type is not None:
+                    typeText = self.field(record.type, flags & TYPE_STOP, tabIndex)
+                    if flags & CURLY_TYPE:
+                        typeText = '{' + typeText + '}'
+                    columns.append(typeText)
+                if record.name is not None:
+                    columns.append(self.field(record.name, flags & NAME_STOP, tabIndex))
+                if record.description is not None:
+                    columns.append(self.field(record.description, flags & DESCRIPTION_STOP, tabIndex))
+                match = reTagName.match(record.tag)
+                rows.append((match and match.group(1), columns, None))
+            else:
+                if record.flags & RAW:
+                    text = self.rawText(record.text, tabIndex)
+                else:
+                    text = self.field(record.text, record.flags & STOP, tabIndex)
+                match = reTagName.match(text)
+                columns = text.split(" ") if align and match and text.startswith('@') else text
+                rows.append((match and match.group(1), columns, None))
+
+            if not align or isinstance(rows[-1][1], str):
+                continue
+
+            columns = rows[-1][1]
+            if columns[0] == '@author':
+                # ignore all the words after `@author`, and don't reformat the line itself
+                rows[-1] = (rows[-1][0], ' '.join(columns), None)
+                widths = [len(columns[0])]
+            else:
+                widths = list(map(outputWidth, columns))
+                rows[-1] = (rows[-1][0], columns, widths)
+            # ignore the return tag if we're doing per-section indenting
+            if self.returnTag and columns[0].startswith(self.returnTag):
+                continue
+            for i in range(0, 1 if self.shallowAlignTags else len(widths)):
+                if i == len(maxWidths):
+                    maxWidths.append(widths[i])
+                elif widths[i] > maxWidths[i]:
+                    maxWidths[i] = widths[i]
+
+        lines = []
+        lastTag = None
+        seenTag = False
+        for tagName, columns, widths in rows:
+            if isinstance(columns, str):
+                line = columns
+            elif widths is None:
+                line = " ".join(columns)
+            else:
+                parts = []
+                for i, part in enumerate(columns):
+                    parts.append(part)
+                    parts.append(" " * self.minColSpaces)
+                    if i < len(maxWidths):
+                        parts.append(" " * (maxWidths[i] - widths[i]))
+                line = "".join(parts).strip()
+
+            if tagName and not inline:
+                if self.spacerBetweenSections and lastTag != tagName:
+                    if not (self.noFunctionDescription and lastTag is None):
+                        lines.append("")
+                    lastTag = tagName
+                elif self.spacerAfterDescription and not seenTag:
+                    lines.append("")
+                seenTag = True
+            # multi-line text (eg: a description parsed from an existing block) gets a prefix on each line
+            lines.extend(line.split('\n'))
+
+        if inline:
+            if lines:
+                return " " + lines[0] + " */"
+            return " $0 */"
+
+        snippet = ""
+        if lines:
+            for line in lines:
+                snippet += "\n " + self.prefix + (self.indentSpaces + line if line else "")
+        elif self.snippet:
+            snippet += "\n " + self.prefix + self.indentSpaces + "${0:" + escape(trailingString) + '}'
+        else:
+            snippet += "\n " + self.prefix + self.indentSpaces + trailingString
+
+        snippet += "\n" + self.commentCloser
+        return snippet + ('\n' if self.newlineAfterBlock else '')
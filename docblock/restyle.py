@@ -0,0 +1,208 @@
+"""
+Render existing docblocks again with the current layout settings, as `BespokeDocsCommand` renders new ones.
+
+    python -m docblock.restyle src/             # rewrite files in place
+    python -m docblock.restyle --check src/     # print a diff, exit with 1 if anything would change
+
+Blocks are parsed back into tag records (descriptions, types and names are kept), then rendered following
+`align_tags`, `min_spaces_between_columns`, `per_section_indent`, `spacer_between_sections` and
+`indentation_spaces`. Lines aren't wrapped: `docblock.format` does that.
+
+Parsing doesn't depend on the settings, so the editor keeps the records in a `RecordCache`, by the text of
+the block they were parsed from and by the text they were rendered to: after another change of the
+settings, the blocks restyled last time are rendered again without being parsed. Single line blocks, and
+blocks holding examples or fenced code, are left alone. Files keep their line endings, and files which
+aren't UTF-8 are skipped.
+"""
+import argparse
+import difflib
+import re
+import sys
+from .comment import parseDocBlock, stripDocBlock
+from .format import cleanRecords, normalizeRecords, isFormattable, renderBody, reOpener
+from .project import iterSourceFiles, getParserForFile, readExactSource, writeSource, imapBounded
+from .render import Tag, Text
+from .scanner import scanText
+from .settings import loadSettings
+
+
+# the blocks kept in a RecordCache
+MAX_BLOCKS = 20000
+
+pluginSettings = None
+check = False
+
+
+def setup(settings, checking=False):
+    global pluginSettings, check
+    pluginSettings = settings
+    check = checking
+
+
+def toRows(records):
+    """ records as tuples, which can be shared """
+    return [
+        ('tag', record.tag, record.type, record.name, record.description, record.flags) if isinstance(record, Tag)
+        else ('text', record.text, record.flags)
+        for record in records
+    ]
+
+
+def toRecords(rows):
+    """ fresh records from rows, for the renderer to use """
+    return [Tag(*row[1:]) if row[0] == 'tag' else Text(*row[1:]) for row in rows]
+
+
+def parseRows(blockText):
+    records = cleanRecords(parseDocBlock(blockText))
+    # the indentation every line of the block has (`indentation_spaces` past the first) isn't part of the
+    # description, which is indented again as it's rendered
+    lines = [line for line in stripDocBlock(blockText) if line.strip()]
+    common = min(len(line) - len(line.lstrip(' ')) for line in lines) if lines else 0
+    if common and records and isinstance(records[0], Text):
+        records[0].text = re.sub('\n {1,%d}' % common, '\n', records[0].text)
+    return toRows(records)
+
+
+class RecordCache(object):
+    """
+    The rows of parsed blocks by block text. `get` parses the blocks it doesn't hold; `put` adds a block
+    text, as rendered from rows, without parsing it.
+    """
+
+    def __init__(self, maxBlocks=MAX_BLOCKS):
+        self.maxBlocks = maxBlocks
+        self.blocks = {}
+        self.counters = {'hits': 0, 'misses': 0}
+
+    def get(self, blockText):
+        rows = self.blocks.get(blockText)
+        if rows is not None:
+            self.counters['hits'] += 1
+            return rows
+        self.counters['misses'] += 1
+        rows = parseRows(blockText)
+        self.put(blockText, rows)
+        return rows
+
+    def put(self, blockText, rows):
+        if len(self.blocks) >= self.maxBlocks:
+            self.blocks.clear()
+        self.blocks[blockText] = rows
+
+    def clear(self):
+        self.blocks.clear()
+
+
+class Overrides(object):
+    """ settings (a dict, or the editor's settings) with some of their values replaced """
+
+    def __init__(self, settings, **values):
+        self.settings = settings
+        self.values = values
+
+    def get(self, key, default=None):
+        return self.values[key] if key in self.values else self.settings.get(key, default)
+
+
+def restyleBlock(blockText, indent, parser, settings, rows):
+    """ the text of a docblock rendering rows (parsed from blockText) with the layout of settings """
+    layout = Overrides(settings, newline_after_block=False)
+    body = renderBody(normalizeRecords(toRecords(rows), settings), indent, parser, layout)
+    return reOpener.match(blockText).group(0) + body + '\n' + indent + parser.settings['commentCloser']
+
+
+def iterRestyled(text, parser, settings, rowsOf):
+    """
+    Yields (begin, end, block text, restyled text, rows) for the blocks of text which can be restyled, where
+    `rowsOf(blockText)` returns the rows of a block.
+    """
+    for block in scanText(text):
+        begin, end = block.begin, block.end
+        blockText = text[begin:end]
+        begin += len(blockText) - len(blockText.lstrip(' \t'))
+        blockText = text[begin:end]
+        indent = text[text.rfind('\n', 0, begin) + 1:begin]
+        crlf = '\r\n' in blockText
+        source = blockText.replace('\r\n', '\n') if crlf else blockText
+        if indent.strip() or not isFormattable(source):
+            # code before the block on the same line
+            continue
+        rows = rowsOf(source)
+        if rows:
+            restyled = restyleBlock(source, indent, parser, settings, rows)
+            yield begin, end, blockText, restyled.replace('\n', '\r\n') if crlf else restyled, rows
+
+
+def restyleText(path, text, settings, rowsOf=parseRows):
+    """
+    Returns (the restyled text, {block text: rows}) where the block texts are those of the blocks before
+    and after being restyled.
+    """
+    out = []
+    blocks = {}
+    last = 0
+    for begin, end, blockText, restyled, rows in iterRestyled(text, getParserForFile(path, settings), settings,
+                                                               rowsOf):
+        blocks[blockText] = blocks[restyled] = rows
+        if restyled != blockText:
+            out.append(text[last:begin])
+            out.append(restyled)
+            last = end
+    if not out:
+        return text, blocks
+    out.append(text[last:])
+    return ''.join(out), blocks
+
+
+def restyleFile(path):
+    """
+    Returns (path, whether it changes, diff). Unless checking, changed files are rewritten; the diff is
+    only made when checking, it takes longer than restyling. Files which aren't UTF-8 are skipped.
+    """
+    text = readExactSource(path)
+    if text is None:
+        sys.stderr.write('skipped %s: not UTF-8\n' % path)
+        return path, False, ''
+    if '/**' not in text and '###*' not in text:
+        return path, False, ''
+    restyled, blocks = restyleText(path, text, pluginSettings)
+    if restyled == text:
+        return path, False, ''
+    if not check:
+        writeSource(path, restyled)
+        return path, True, ''
+    diff = difflib.unified_diff(
+        text.splitlines(True), restyled.splitlines(True), 'a/' + path.lstrip('/'), 'b/' + path.lstrip('/')
+    )
+    return path, True, ''.join(diff)
+
+
+def main(argv=None):
+    argParser = argparse.ArgumentParser(prog='python -m docblock.restyle', description=__doc__.strip().split('\n')[0])
+    argParser.add_argument('paths', nargs='+', help='files or directories to restyle')
+    argParser.add_argument('--check', action='store_true', help="don't write files, print a diff and exit with 1 if "
+                           "any would change")
+    argParser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes')
+    argParser.add_argument('-s', '--settings', action='append', default=[], help='user settings file(s) to load')
+    args = argParser.parse_args(argv)
+
+    changed = 0
+    for path, changes, diff in imapBounded(restyleFile, iterSourceFiles(args.paths), args.jobs, setup,
+                                           (loadSettings(args.settings), args.check)):
+        if not changes:
+            continue
+        changed += 1
+        if args.check:
+            sys.stdout.write(diff)
+        else:
+            sys.stderr.write('restyled %s\n' % path)
+
+    if args.check and changed:
+        sys.stderr.write('%d file%s would be restyled\n' % (changed, '' if changed == 1 else 's'))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
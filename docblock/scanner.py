@@ -0,0 +1,168 @@
+"""
+Finding docblocks in files of any size, without reading them into memory.
+
+    for block in scanFile('dist/bundle.js'):
+        print(block.row, block.definition())
+
+A file is memory-mapped and searched with `find` for the comment markers, so the bytes are only
+touched by the operating system's page cache and C level searches: a few hundred MB bundle is
+scanned at about the speed of the disk, in constant memory. Only the blocks, and the code following
+them as far as they are asked for, are decoded.
+
+The blocks found are the same as those of `comment.iterDocBlocks`: `/** ... */` (but not `/**/` or
+`/*** banners`) and coffee's `###* ... ###` on lines of their own. `scanText` does the same on a string.
+"""
+import mmap
+
+
+# how much code following a block to read, by default
+FOLLOWING_LENGTH = 4096
+
+# how much to count newlines in at once
+CHUNK_SIZE = 1 << 20
+
+
+class Block(object):
+    """
+    A docblock: its offsets (in bytes for files, characters for strings), 0 based rows and text.
+    The code after it can be read as long as the scan which found it is running.
+    """
+    __slots__ = ('begin', 'end', 'row', 'endRow', 'text', 'buf', 'nextLine', 'decode')
+
+    def __init__(self, begin, end, row, endRow, text, buf, nextLine, decode):
+        self.begin = begin
+        self.end = end
+        self.row = row
+        self.endRow = endRow
+        self.text = text
+        self.buf = buf
+        self.nextLine = nextLine
+        self.decode = decode
+
+    def following(self, length=FOLLOWING_LENGTH):
+        """
+        The code from the line after the block on, up to length characters (bytes, for files), or None
+        if nothing follows the line the block ends on.
+        """
+        if self.nextLine == -1:
+            return None
+        return self.decode(self.buf[self.nextLine:self.nextLine + length])
+
+    def definition(self):
+        """ the line following the block, or None """
+        following = self.following()
+        return following if following is None else following.split('\n', 1)[0]
+
+
+class Markers(object):
+    """ the comment markers, and the newline, as bytes or as str to search buf with """
+
+    def __init__(self, buf):
+        def encode(marker):
+            return marker if isinstance(buf, str) else marker.encode('ascii')
+        self.jsOpener = encode('/**')
+        self.jsCloser = encode('*/')
+        self.coffee = encode('###')
+        self.newline = encode('\n')
+        self.star = encode('*')
+        self.slash = encode('/')
+        self.blank = encode(' \t')
+
+
+def countNewlines(buf, begin, end, newline):
+    if isinstance(buf, str):
+        return buf.count(newline, begin, end)
+    count = 0
+    for start in range(begin, end, CHUNK_SIZE):
+        count += buf[start:min(end, start + CHUNK_SIZE)].count(newline)
+    return count
+
+
+def lineStart(buf, pos, markers):
+    """ the start of the line holding pos, if only blanks precede pos on it; otherwise -1 """
+    i = pos
+    while i > 0 and buf[i - 1:i] in (markers.blank[:1], markers.blank[1:]):
+        i -= 1
+    return i if i == 0 or buf[i - 1:i] == markers.newline else -1
+
+
+def iterBlockSpans(buf, size, markers):
+    """ yields the (begin, end) of each docblock in buf """
+    pos = 0
+    nextJs = nextCoffee = None
+    while pos < size:
+        # each marker is searched for again only once the scan has gone past its last occurrence
+        if nextJs is None or (nextJs != -1 and nextJs < pos):
+            nextJs = buf.find(markers.jsOpener, pos)
+            while nextJs != -1 and buf[nextJs + 3:nextJs + 4] in (markers.star, markers.slash):
+                nextJs = buf.find(markers.jsOpener, nextJs + 1)
+        if nextCoffee is None or (nextCoffee != -1 and nextCoffee < pos):
+            nextCoffee = buf.find(markers.coffee, pos)
+            while nextCoffee != -1 and (buf[nextCoffee + 3:nextCoffee + 4] != markers.star or
+                                        lineStart(buf, nextCoffee, markers) == -1):
+                nextCoffee = buf.find(markers.coffee, nextCoffee + 1)
+
+        if nextJs == -1 and nextCoffee == -1:
+            return
+        if nextCoffee == -1 or (nextJs != -1 and nextJs < lineStart(buf, nextCoffee, markers)):
+            end = buf.find(markers.jsCloser, nextJs + 3)
+            if end == -1:
+                # no opener further on can be closed either
+                nextJs = -1
+                continue
+            yield nextJs, end + 2
+            pos = end + 2
+            continue
+
+        begin = lineStart(buf, nextCoffee, markers)
+        closer = buf.find(markers.newline, nextCoffee)
+        end = -1
+        while closer != -1:
+            closer = buf.find(markers.coffee, closer + 1)
+            if closer != -1 and lineStart(buf, closer, markers) != -1:
+                end = closer + 3
+                break
+        if end == -1:
+            nextCoffee = -1
+            continue
+        yield begin, end
+        pos = end
+
+
+def iterBlocks(buf, size, decode):
+    markers = Markers(buf)
+    row = 0
+    counted = 0
+    for begin, end in iterBlockSpans(buf, size, markers):
+        row += countNewlines(buf, counted, begin, markers.newline)
+        endRow = row + countNewlines(buf, begin, end, markers.newline)
+        counted = end
+        nextLine = buf.find(markers.newline, end)
+        if nextLine != -1:
+            nextLine += 1
+        yield Block(begin, end, row, endRow, decode(buf[begin:end]), buf, nextLine, decode)
+        row = endRow
+
+
+def scanText(text):
+    """
+    Yields a `Block` for every docblock in text, with character offsets.
+    """
+    return iterBlocks(text, len(text), lambda text: text)
+
+
+def scanFile(path):
+    """
+    Yields a `Block` for every docblock in the (utf-8) file at path, with byte offsets.
+    """
+    with open(path, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can't be mapped
+            return
+        try:
+            for block in iterBlocks(buf, len(buf), lambda data: data.decode('utf-8', 'replace')):
+                yield block
+        finally:
+            buf.close()
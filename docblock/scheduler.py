@@ -0,0 +1,200 @@
+"""
+Background work: a small pool of threads running keyed tasks by priority.
+
+    scheduler = Scheduler()
+    scheduler.submit(('lint', view.id()), lint, priority=NORMAL, delay=0.3,
+                     isCurrent=lambda: view.change_count() == changeCount)
+
+A task submitted under the key of a pending one replaces it, and a delay restarts, so a burst of
+`on_modified` events runs the task once. Before each run the task's `isCurrent` is asked whether its
+result would still be of use; it's dropped when not.
+
+A task returning a generator is run one step at a time, and queued again after each step, so a long
+job (eg: indexing a project) gives way to more urgent tasks as it goes. Background tasks also wait
+while the user is typing (see `interactive`), and never take the last free worker.
+"""
+import heapq
+import itertools
+import threading
+import time
+import traceback
+import types
+
+
+INTERACTIVE = 0
+NORMAL = 1
+BACKGROUND = 2
+
+# background steps don't start until this long after the last keystroke
+QUIET_PERIOD = 0.25
+
+
+class Task(object):
+
+    def __init__(self, key, fn, priority, due, isCurrent):
+        self.key = key
+        self.fn = fn
+        self.priority = priority
+        self.due = due
+        self.isCurrent = isCurrent
+        self.cancelled = False
+        self.steps = None  # the generator of a task run in steps
+        self.elapsed = 0.0
+
+    @property
+    def name(self):
+        return self.key[0] if isinstance(self.key, tuple) else self.key
+
+
+class Scheduler(object):
+
+    def __init__(self, workers=2, clock=time.monotonic):
+        self.clock = clock
+        self.condition = threading.Condition()
+        self.queue = []  # heap of (priority, due, sequence, task)
+        self.sequence = itertools.count()
+        self.pending = {}  # key -> the queued task
+        self.running = {}  # key -> the task being run
+        self.busy = 0
+        self.lastInteraction = 0
+        self.counters = {}
+        self.stopped = False
+        self.threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self.work, name='BespokeDocs worker %d' % i)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, key, fn, priority=NORMAL, delay=0, isCurrent=None):
+        """
+        Queue `fn()` to run in at least `delay` seconds, replacing the pending task of the same key.
+        """
+        with self.condition:
+            previous = self.pending.pop(key, None)
+            if previous:
+                previous.cancelled = True
+                self.count(previous, 'coalesced')
+            running = self.running.get(key)
+            if running and running.steps:
+                # a new version of a task being run in steps supersedes it
+                running.cancelled = True
+            task = Task(key, fn, priority, self.clock() + delay, isCurrent)
+            self.push(task)
+            return task
+
+    def cancel(self, key):
+        with self.condition:
+            for task in (self.pending.pop(key, None), self.running.get(key)):
+                if task:
+                    task.cancelled = True
+
+    def interactive(self):
+        """ note a keystroke: background steps hold off for a moment """
+        self.lastInteraction = self.clock()
+
+    def push(self, task):
+        self.pending[task.key] = task
+        heapq.heappush(self.queue, (task.priority, task.due, next(self.sequence), task))
+        self.condition.notify()
+
+    def next(self):
+        """ the next task which may run now, and how long to wait if there is none """
+        now = self.clock()
+        wait = None
+        skipped = []
+        task = None
+        while self.queue:
+            entry = heapq.heappop(self.queue)
+            candidate = entry[3]
+            if candidate.cancelled:
+                continue
+            ready = candidate.due
+            if candidate.priority == BACKGROUND:
+                ready = max(ready, self.lastInteraction + QUIET_PERIOD)
+                if self.busy >= len(self.threads) - 1 and len(self.threads) > 1:
+                    # keep a worker free for more urgent tasks
+                    skipped.append(entry)
+                    continue
+            if candidate.key in self.running or ready > now:
+                if ready > now:
+                    wait = ready - now if wait is None else min(wait, ready - now)
+                skipped.append(entry)
+                continue
+            task = candidate
+            break
+        for entry in skipped:
+            heapq.heappush(self.queue, entry)
+        return task, wait
+
+    def work(self):
+        while True:
+            with self.condition:
+                while True:
+                    if self.stopped:
+                        return
+                    task, wait = self.next()
+                    if task:
+                        break
+                    self.condition.wait(wait)
+                del self.pending[task.key]
+                self.running[task.key] = task
+                self.busy += 1
+
+            try:
+                self.run(task)
+            finally:
+                # whatever happened, the worker goes back to the pool
+                with self.condition:
+                    self.busy -= 1
+                    del self.running[task.key]
+                    if task.steps and not task.cancelled and task.key not in self.pending:
+                        task.due = self.clock()
+                        self.push(task)
+                    else:
+                        self.condition.notify_all()
+
+    def run(self, task):
+        start = self.clock()
+        try:
+            # isCurrent may fail too (eg: asking a view which has been closed)
+            if task.isCurrent and not task.isCurrent():
+                self.count(task, 'cancelled')
+                task.steps = None
+                return
+            if task.steps is None:
+                result = task.fn()
+                if isinstance(result, types.GeneratorType):
+                    task.steps = result
+            if task.steps is not None:
+                next(task.steps)
+        except StopIteration:
+            task.steps = None
+        except Exception:
+            task.steps = None
+            self.count(task, 'failed')
+            traceback.print_exc()
+            return
+        task.elapsed += self.clock() - start
+        if task.steps is None:
+            self.count(task, 'completed', task.elapsed)
+
+    def count(self, task, event, elapsed=None):
+        with self.condition:
+            counters = self.counters.setdefault(task.name, {
+                'completed': 0, 'cancelled': 0, 'coalesced': 0, 'failed': 0, 'total': 0.0, 'max': 0.0
+            })
+            counters[event] += 1
+            if elapsed is not None:
+                counters['total'] += elapsed
+                counters['max'] = max(counters['max'], elapsed)
+
+    def stats(self):
+        """ per task name, how many ran, were dropped or failed, and the total and longest run time in seconds """
+        with self.condition:
+            return dict((name, dict(counters)) for name, counters in self.counters.items())
+
+    def shutdown(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
@@ -0,0 +1,237 @@
+"""
+Full text search over the docblocks of a project.
+
+An inverted index maps each word of the docblocks, each tag (as `@deprecated`) and each part of the
+documented names to the symbols they document, so a query only touches the symbols which match it.
+
+    python -m docblock.search "@deprecated user" src/ lib/
+
+Every term of a query must match, and each one matches the words it is a prefix of.
+"""
+import argparse
+import bisect
+import heapq
+import re
+import sys
+import threading
+from .comment import parseDocBlock
+from .project import iterSourceFiles, getParserForFile, imapBounded
+from .render import Tag
+from .scanner import scanFile, scanText
+from .settings import loadSettings
+from .tags import canonicalTag
+from .textview import TextView
+
+
+reWord = re.compile(r'@?[a-z0-9_$]+')
+reNamePart = re.compile(r'[A-Z]?[a-z0-9$]+|[A-Z]+(?![a-z])')
+
+# prefixes shorter than this only match whole words
+MIN_PREFIX = 2
+
+# the removed symbols are dropped from the index once they are half of it, and at least this many
+COMPACT_MIN = 1000
+
+pluginSettings = None
+
+
+def setup(settings):
+    global pluginSettings
+    pluginSettings = settings
+
+
+def tokenize(text):
+    return set(reWord.findall(text.lower()))
+
+
+def nameTokens(name):
+    """ a name, and the words of it: getUserName -> getusername, get, user, name """
+    tokens = set(part.lower() for part in reNamePart.findall(name))
+    tokens.add(name.lower())
+    return tokens
+
+
+def indexBlocks(blocks, parser):
+    """
+    Returns the symbols documented by blocks (from docblock.scanner), as tuples of (name, kind, row,
+    summary, tokens), where tokens includes the words of the name.
+    """
+    out = []
+    for block in blocks:
+        tokens = set()
+        summary = ''
+        for record in parseDocBlock(block.text):
+            if isinstance(record, Tag):
+                tokens.add('@' + canonicalTag(record.tag[1:]).lower())
+                for field in (record.type, record.name, record.description):
+                    if field:
+                        tokens |= tokenize(field)
+            else:
+                summary = record.text.strip().split('\n')[0]
+                tokens |= tokenize(record.text)
+
+        name = kind = ''
+        following = block.following()
+        if following is not None:
+            definition = parser.describe(parser.getDefinition(TextView(following), 0))
+            if definition:
+                name = definition['name']
+                kind = definition['kind']
+                tokens |= nameTokens(name)
+        out.append((name, kind, block.row, summary, tokens))
+    return out
+
+
+def indexText(path, text, parser):
+    return indexBlocks(scanText(text), parser)
+
+
+def indexPath(path, parser):
+    """ like indexText, reading the file at path through a memory map """
+    return indexBlocks(scanFile(path), parser)
+
+
+def indexFile(path):
+    return path, indexPath(path, getParserForFile(path, pluginSettings))
+
+
+class SearchIndex(object):
+    """
+    An inverted index of symbols, which can be updated file by file and queried from other threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.symbols = []  # (path, name, kind, row, summary, tokens), or None once removed
+        self.removed = 0  # the number of None in symbols
+        self.files = {}  # path -> ids of its symbols
+        self.postings = {}  # token -> ids of the symbols it appears in
+        self.names = {}  # token -> ids of the symbols whose name it appears in
+        self.vocabulary = None  # sorted tokens, for prefix queries
+        self.ready = False  # for whoever builds the index, to tell that it holds the whole project
+
+    def __len__(self):
+        return sum(len(ids) for ids in self.files.values())
+
+    def update(self, path, symbols):
+        """ replace the symbols of path """
+        with self.lock:
+            self.removeFile(path)
+            ids = self.files[path] = []
+            for name, kind, row, summary, tokens in symbols:
+                id = len(self.symbols)
+                self.symbols.append((path, name, kind, row, summary, tokens))
+                ids.append(id)
+                for token in tokens:
+                    posting = self.postings.get(token)
+                    if posting is None:
+                        posting = self.postings[token] = set()
+                        self.vocabulary = None
+                    posting.add(id)
+                for token in nameTokens(name):
+                    self.names.setdefault(token, set()).add(id)
+
+    def remove(self, path):
+        with self.lock:
+            self.removeFile(path)
+
+    def removeFile(self, path):
+        for id in self.files.pop(path, ()):
+            for token in self.symbols[id][5]:
+                posting = self.postings[token]
+                posting.discard(id)
+                if not posting:
+                    del self.postings[token]
+                    self.vocabulary = None
+            for token in nameTokens(self.symbols[id][1]):
+                posting = self.names[token]
+                posting.discard(id)
+                if not posting:
+                    del self.names[token]
+            self.symbols[id] = None
+            self.removed += 1
+        if self.removed >= COMPACT_MIN and self.removed * 2 >= len(self.symbols):
+            self.compact()
+
+    def compact(self):
+        """ drop the removed symbols, numbering the others again in the same order """
+        ids = {}
+        symbols = []
+        for id, symbol in enumerate(self.symbols):
+            if symbol is not None:
+                ids[id] = len(symbols)
+                symbols.append(symbol)
+        self.symbols = symbols
+        self.removed = 0
+        self.files = dict((path, [ids[id] for id in fileIds]) for path, fileIds in self.files.items())
+        self.postings = dict((token, set(ids[id] for id in posting)) for token, posting in self.postings.items())
+        self.names = dict((token, set(ids[id] for id in posting)) for token, posting in self.names.items())
+
+    def matching(self, term, postings):
+        """ the ids of the symbols with a token starting with term """
+        if len(term) < MIN_PREFIX:
+            return postings.get(term, set())
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.postings)
+        i = bisect.bisect_left(self.vocabulary, term)
+        ids = set()
+        # every name token is in postings as well, so the vocabulary covers both
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+            ids.update(postings.get(self.vocabulary[i], ()))
+            i += 1
+        return ids
+
+    def intersect(self, terms, postings):
+        matches = sorted((self.matching(term, postings) for term in terms), key=len)
+        return matches[0].intersection(*matches[1:])
+
+    def search(self, query, limit=100):
+        """
+        Returns up to limit symbols matching every term of query, as dicts of path, name, kind, row and
+        summary. Symbols whose name matches every term come first, then the others in the order they were
+        indexed.
+        """
+        terms = set(reWord.findall(query.lower()))
+        if not terms:
+            return []
+        with self.lock:
+            matches = self.intersect(terms, self.postings)
+            if not matches:
+                return []
+            # only the ids of the results are sorted, however many symbols match
+            byName = matches & self.intersect(terms, self.names)
+            ids = heapq.nsmallest(limit, byName)
+            if len(ids) < limit:
+                ids += heapq.nsmallest(limit - len(ids), matches - byName)
+            symbols = [self.symbols[id] for id in ids]
+
+        return [
+            {'path': path, 'name': name, 'kind': kind, 'row': row, 'summary': summary}
+            for path, name, kind, row, summary, tokens in symbols
+        ]
+
+
+def main(argv=None):
+    argParser = argparse.ArgumentParser(prog='python -m docblock.search', description=__doc__.strip().split('\n')[0])
+    argParser.add_argument('query', help='words, tags or name prefixes which must all match')
+    argParser.add_argument('paths', nargs='+', help='files or directories to search')
+    argParser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes')
+    argParser.add_argument('-s', '--settings', action='append', default=[], help='user settings file(s) to load')
+    argParser.add_argument('-n', '--limit', type=int, default=100, help='maximum number of results (default: 100)')
+    args = argParser.parse_args(argv)
+
+    settings = loadSettings(args.settings)
+    index = SearchIndex()
+    for path, symbols in imapBounded(indexFile, iterSourceFiles(args.paths), args.jobs, setup, (settings,)):
+        index.update(path, symbols)
+
+    results = index.search(args.query, args.limit)
+    for result in results:
+        sys.stdout.write('%s:%d: %s %s\n' % (
+            result['path'], result['row'] + 1, result['name'] or '(anonymous)', result['summary']
+        ))
+    return 0 if results else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
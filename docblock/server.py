@@ -0,0 +1,489 @@
+"""
+A JSON-RPC server on stdin and stdout, giving other editors and tools the docblock commands.
+
+    python -m docblock.server [-s user.sublime-settings] [--wrap-length 80] [--tab-size 4] [--stats]
+
+Messages are framed as in the Language Server Protocol: a `Content-Length` header, a blank line, then the
+JSON body. Positions are `{"line", "character"}` with characters counted in code points (the "utf-32"
+position encoding), and edits are LSP `TextEdit`s. The methods are:
+
+    initialize, shutdown, exit
+    textDocument/didOpen, didChange (whole text only), didClose
+    textDocument/codeAction   the actions at a range: "Generate docblock", or "Wrap docblock" and "Align
+                              docblock" inside a block, each with its edit
+    bespoke/generate          {textDocument, position, inline?}: the block `BespokeDocsCommand` inserts,
+                              as an edit and as a snippet. position is either right after a typed `/**`,
+                              or on the line of the definition (the block then goes above it)
+    bespoke/wrap              {textDocument, position, wrapLength?, tabSize?}: the block at position wrapped
+                              as `BespokeDocsWrapLines` does
+    bespoke/align             {textDocument, position}: the tags of the block at position aligned
+    bespoke/stats             the latency of the requests handled so far, by method
+
+`textDocument` is `{"uri"}` for an open document, or `{"uri", "text"}`. The edit methods return null when
+there is nothing to do.
+
+The server stays up between requests: settings are loaded, parsers built and patterns compiled once, and
+the line offsets and docblocks of a document are kept until it changes. `Client` runs the server in a
+subprocess, as an editor would:
+
+    client = Client()
+    client.request('bespoke/generate', {'textDocument': {'uri': 'a.js', 'text': text}, 'position': position})
+    client.close()
+"""
+import argparse
+import collections
+import itertools
+import json
+import re
+import subprocess
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from .comment import iterDocBlocks
+from .format import alignBlock
+from .parser import BespokeDocsJavascript, BespokeDocsCoffee
+from .render import DocBlockRenderer
+from .settings import loadSettings, PACKAGE_DIR
+from .textview import TextView
+from .wrap import wrapBlock
+
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+# the latencies kept by method, for the percentiles
+LATENCY_SAMPLES = 1000
+
+OPENERS = {'js': '/**', 'coffee': '###*'}
+
+reOpenerBefore = re.compile(r'(?:/\*\*|###\*)$')
+reIndent = re.compile(r'[ \t]*')
+reCloserAfter = re.compile(r'\s*\*/\s*$')
+# after a malformed header, the unread body runs on to the next message's header
+reContentLength = re.compile(br'content-length\s*:(.*)$', re.I)
+
+
+class RpcError(Exception):
+
+    def __init__(self, code, message):
+        Exception.__init__(self, message)
+        self.code = code
+
+
+class Document(object):
+    """ the text of a document, with its line offsets and docblocks worked out when first needed """
+
+    def __init__(self, uri, text, language=None):
+        self.uri = uri
+        self.text = text
+        self.language = language if language in OPENERS else ('coffee' if uri.endswith('.coffee') else 'js')
+        self.view = TextView(text)
+        self.lineStarts = None
+        self.blocks = None
+        self.blockEnds = None
+
+    def offset(self, position):
+        """ the offset of an LSP position, clamped to its line """
+        if self.lineStarts is None:
+            self.lineStarts = [0] + [match.end() for match in re.finditer('\n', self.text)]
+        try:
+            line = int(position['line'])
+            character = int(position['character'])
+        except (KeyError, TypeError, ValueError):
+            raise RpcError(INVALID_PARAMS, 'invalid position: %r' % (position,))
+        if line < 0:
+            raise RpcError(INVALID_PARAMS, 'invalid position: %r' % (position,))
+        if line >= len(self.lineStarts):
+            return len(self.text)
+        lineEnd = self.lineStarts[line + 1] - 1 if line + 1 < len(self.lineStarts) else len(self.text)
+        return min(self.lineStarts[line] + max(0, character), lineEnd)
+
+    def position(self, offset):
+        if self.lineStarts is None:
+            self.offset({'line': 0, 'character': 0})
+        line = bisect_right(self.lineStarts, offset) - 1
+        return {'line': line, 'character': offset - self.lineStarts[line]}
+
+    def range(self, begin, end):
+        return {'start': self.position(begin), 'end': self.position(end)}
+
+    def blockAt(self, offset):
+        """ (begin, end, indent) of the docblock holding offset, from its opener, or None """
+        if self.blocks is None:
+            self.blocks = []
+            for begin, end in iterDocBlocks(self.text):
+                # coffee blocks are matched from the start of their line
+                begin += len(reIndent.match(self.text, begin).group(0))
+                self.blocks.append((begin, end))
+            self.blockEnds = [end for begin, end in self.blocks]
+        i = bisect_left(self.blockEnds, offset)
+        if i == len(self.blocks) or self.blocks[i][0] > offset:
+            return None
+        begin, end = self.blocks[i]
+        lineStart = self.text.rfind('\n', 0, begin) + 1
+        indent = self.text[lineStart:begin]
+        if indent.strip():
+            # code before the block on the same line
+            indent = reIndent.match(indent).group(0)
+        return begin, end, indent
+
+
+class Server(object):
+    """
+    Handles JSON-RPC messages (as dicts), keeping open documents, parsers and renderers between them.
+    """
+
+    def __init__(self, pluginSettings, wrapLength=80, tabSize=4):
+        self.pluginSettings = pluginSettings
+        self.wrapLength = wrapLength
+        self.tabSize = tabSize
+        self.parsers = {'js': BespokeDocsJavascript(pluginSettings), 'coffee': BespokeDocsCoffee(pluginSettings)}
+        self.renderers = {}  # (language, snippet) -> DocBlockRenderer
+        self.documents = {}  # uri -> Document
+        self.latencies = {}  # method -> deque of the last durations, in seconds
+        self.totals = {}  # method -> [count, total seconds, max seconds]
+        self.isShutdown = False
+        self.exited = False
+        self.methods = {
+            'initialize': self.initialize,
+            'shutdown': self.shutdown,
+            'exit': self.exit,
+            'textDocument/didOpen': self.didOpen,
+            'textDocument/didChange': self.didChange,
+            'textDocument/didClose': self.didClose,
+            'textDocument/codeAction': self.codeAction,
+            'bespoke/generate': self.generate,
+            'bespoke/wrap': self.wrap,
+            'bespoke/align': self.align,
+            'bespoke/stats': self.stats,
+        }
+
+    def handle(self, message):
+        """ the response to a message, or None for a notification """
+        start = time.perf_counter()
+        if not isinstance(message, dict) or not isinstance(message.get('method'), str):
+            return self.error(message.get('id') if isinstance(message, dict) else None, INVALID_REQUEST,
+                              'not a JSON-RPC request')
+        method = message['method']
+        isRequest = 'id' in message
+        try:
+            fn = self.methods.get(method)
+            if fn is None:
+                if not isRequest or method.startswith('$/'):
+                    # unknown notifications are ignored
+                    return None
+                raise RpcError(METHOD_NOT_FOUND, 'unknown method: %s' % method)
+            if self.isShutdown and method != 'exit':
+                raise RpcError(INVALID_REQUEST, 'the server is shutting down')
+            params = message.get('params')
+            result = fn(params if isinstance(params, dict) else {})
+            response = {'jsonrpc': '2.0', 'id': message['id'], 'result': result} if isRequest else None
+        except RpcError as e:
+            response = self.error(message.get('id'), e.code, str(e)) if isRequest else None
+        except Exception as e:
+            response = self.error(message.get('id'), INTERNAL_ERROR, '%s: %s' % (type(e).__name__, e)) \
+                if isRequest else None
+        if fn is not None:
+            self.record(method, time.perf_counter() - start)
+        return response
+
+    def error(self, id, code, message):
+        return {'jsonrpc': '2.0', 'id': id, 'error': {'code': code, 'message': message}}
+
+    def record(self, method, seconds):
+        samples = self.latencies.get(method)
+        if samples is None:
+            samples = self.latencies[method] = collections.deque(maxlen=LATENCY_SAMPLES)
+            self.totals[method] = [0, 0.0, 0.0]
+        samples.append(seconds)
+        totals = self.totals[method]
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds)
+
+    def stats(self, params=None):
+        """ {method: {count, mean, p50, p95, max}}, the times in milliseconds (the percentiles of recent requests) """
+        out = {}
+        for method, (count, total, longest) in self.totals.items():
+            samples = sorted(self.latencies[method])
+            out[method] = {
+                'count': count,
+                'mean': total / count * 1000,
+                'p50': samples[len(samples) // 2] * 1000,
+                'p95': samples[min(len(samples) - 1, len(samples) * 95 // 100)] * 1000,
+                'max': longest * 1000
+            }
+        return out
+
+    def initialize(self, params):
+        return {
+            'capabilities': {
+                'positionEncoding': 'utf-32',
+                'textDocumentSync': 1,  # full
+                'codeActionProvider': {'codeActionKinds': ['refactor', 'refactor.rewrite']},
+                'experimental': {'bespokeDocs': ['bespoke/generate', 'bespoke/wrap', 'bespoke/align', 'bespoke/stats']}
+            },
+            'serverInfo': {'name': 'bespoke-docs'}
+        }
+
+    def shutdown(self, params):
+        self.isShutdown = True
+        return None
+
+    def exit(self, params):
+        self.exited = True
+
+    def didOpen(self, params):
+        item = params.get('textDocument') or {}
+        if 'uri' not in item or 'text' not in item:
+            raise RpcError(INVALID_PARAMS, 'textDocument needs a uri and text')
+        self.documents[item['uri']] = Document(item['uri'], item['text'], item.get('languageId'))
+
+    def didChange(self, params):
+        uri = (params.get('textDocument') or {}).get('uri')
+        old = self.documents.get(uri)
+        for change in params.get('contentChanges') or ():
+            if 'range' in change:
+                raise RpcError(INVALID_PARAMS, 'only whole document changes are supported')
+            self.documents[uri] = Document(uri, change['text'], old and old.language)
+
+    def didClose(self, params):
+        self.documents.pop((params.get('textDocument') or {}).get('uri'), None)
+
+    def document(self, params):
+        item = params.get('textDocument')
+        if not isinstance(item, dict) or 'uri' not in item:
+            raise RpcError(INVALID_PARAMS, 'textDocument is required')
+        if 'text' in item:
+            return Document(item['uri'], item['text'], item.get('languageId'))
+        doc = self.documents.get(item['uri'])
+        if doc is None:
+            raise RpcError(INVALID_PARAMS, 'unknown document: %s' % item['uri'])
+        return doc
+
+    def renderer(self, language, snippet):
+        renderer = self.renderers.get((language, snippet))
+        if renderer is None:
+            renderer = self.renderers[(language, snippet)] = DocBlockRenderer(
+                self.pluginSettings, self.parsers[language].settings, snippet
+            )
+        return renderer
+
+    def textEdit(self, doc, begin, end, text):
+        return {'range': doc.range(begin, end), 'newText': text}
+
+    def generateAt(self, doc, point, inline=False, definitionOnly=False):
+        """
+        {edit, snippet} of the block to generate at point, or None if there is none (or, with
+        definitionOnly, if no definition was recognised).
+        """
+        text = doc.text
+        parser = self.parsers[doc.language]
+        lineBegin, lineEnd = doc.view.line(point)
+        indent = reIndent.match(text, lineBegin).group(0)
+        if reOpenerBefore.search(text, lineBegin, point):
+            # as after typing the opener in the editor: the rest of the line is the description
+            trailingString = reCloserAfter.sub('', text[point:lineEnd].strip())
+            definitionStart = lineEnd + 1
+            begin, end = point, lineEnd
+            opener = ''
+        else:
+            trailingString = ''
+            definitionStart = lineBegin
+            begin = end = lineBegin + len(indent)
+            opener = OPENERS[doc.language]
+            inline = False
+
+        line = parser.getDefinition(doc.view, definitionStart) or ''
+        if parser.isExistingComment(line):
+            return None
+        parser.inline = inline
+        parser.setNameOverride(trailingString or None)
+        parser.setBody(None)
+        limit = parser.bodyScanLimit()
+        if limit and definitionStart < len(text):
+            parser.setBody(parser.scanBody(text[definitionStart:definitionStart + limit]))
+        records = parser.parse(line)
+        if records is None and definitionOnly:
+            return None
+
+        snippet = self.renderer(doc.language, True).render(records, inline, trailingString)
+        plain = self.renderer(doc.language, False).render(records, inline, trailingString)
+        plain = plain.replace('\n', '\n' + indent)
+        if opener:
+            # above the definition, which keeps its indentation
+            snippet = opener + snippet + '\n'
+            plain = opener + plain.rstrip(' \t') + '\n' + indent
+        return {'edit': self.textEdit(doc, begin, end, plain), 'snippet': snippet}
+
+    def generate(self, params):
+        doc = self.document(params)
+        return self.generateAt(doc, doc.offset(params.get('position') or {}), bool(params.get('inline')))
+
+    def wrapAt(self, doc, point, wrapLength=None, tabSize=None):
+        block = doc.blockAt(point)
+        if block is None:
+            return None
+        begin, end, indent = block
+        blockText = doc.text[begin:end]
+        wrapped = wrapBlock(blockText, indent, wrapLength or self.wrapLength, tabSize or self.tabSize,
+                            self.pluginSettings)
+        if wrapped is None or wrapped == blockText:
+            return None
+        return self.textEdit(doc, begin, end, wrapped)
+
+    def wrap(self, params):
+        doc = self.document(params)
+        return self.wrapAt(doc, doc.offset(params.get('position') or {}), params.get('wrapLength'),
+                           params.get('tabSize'))
+
+    def alignAt(self, doc, point):
+        block = doc.blockAt(point)
+        if block is None:
+            return None
+        begin, end, indent = block
+        blockText = doc.text[begin:end]
+        aligned = alignBlock(blockText, indent, self.parsers[doc.language], self.pluginSettings)
+        if aligned is None or aligned == blockText:
+            return None
+        return self.textEdit(doc, begin, end, aligned)
+
+    def align(self, params):
+        doc = self.document(params)
+        return self.alignAt(doc, doc.offset(params.get('position') or {}))
+
+    def codeAction(self, params):
+        doc = self.document(params)
+        point = doc.offset((params.get('range') or {}).get('start') or {})
+        actions = []
+
+        def action(title, kind, edit):
+            if edit is not None:
+                actions.append({'title': title, 'kind': kind, 'edit': {'changes': {doc.uri: [edit]}}})
+
+        if doc.blockAt(point) is not None:
+            action('Wrap docblock', 'refactor.rewrite', self.wrapAt(doc, point))
+            action('Align docblock', 'refactor.rewrite', self.alignAt(doc, point))
+        else:
+            generated = self.generateAt(doc, point, definitionOnly=True)
+            action('Generate docblock', 'refactor', generated and generated['edit'])
+        return actions
+
+
+def readMessage(stream):
+    """
+    the body of the next message of a binary stream, or None at its end. Raises RpcError(PARSE_ERROR) for a
+    message without a valid Content-Length, once its header is read.
+    """
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            if length is None:
+                continue
+            break
+        match = reContentLength.search(line)
+        if match:
+            length = match.group(1).strip()
+    if not length.isdigit():
+        raise RpcError(PARSE_ERROR, 'invalid Content-Length: %r' % length.decode('latin-1'))
+    return stream.read(int(length))
+
+
+def writeMessage(stream, message):
+    body = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    stream.write(b'Content-Length: %d\r\n\r\n' % len(body))
+    stream.write(body)
+    stream.flush()
+
+
+def serve(server, inStream, outStream):
+    """ answer the messages of inStream until `exit`, or its end """
+    while not server.exited:
+        try:
+            body = readMessage(inStream)
+        except RpcError as e:
+            writeMessage(outStream, server.error(None, e.code, str(e)))
+            continue
+        if body is None:
+            break
+        try:
+            message = json.loads(body.decode('utf-8'))
+        except ValueError as e:
+            writeMessage(outStream, server.error(None, PARSE_ERROR, str(e)))
+            continue
+        response = server.handle(message)
+        if response is not None:
+            writeMessage(outStream, response)
+
+
+class Client(object):
+    """
+    Runs the server in a subprocess and talks to it as an editor would: for tests and benchmarks.
+    """
+
+    def __init__(self, args=()):
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'docblock.server'] + list(args),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=PACKAGE_DIR
+        )
+        self.ids = itertools.count(1)
+
+    def request(self, method, params=None):
+        """ the result of a request, raising RpcError for an error response """
+        id = next(self.ids)
+        writeMessage(self.process.stdin, {'jsonrpc': '2.0', 'id': id, 'method': method, 'params': params or {}})
+        while True:
+            body = readMessage(self.process.stdout)
+            if body is None:
+                raise RpcError(INTERNAL_ERROR, 'the server exited')
+            response = json.loads(body.decode('utf-8'))
+            if response.get('id') != id:
+                continue
+            if 'error' in response:
+                raise RpcError(response['error']['code'], response['error']['message'])
+            return response.get('result')
+
+    def notify(self, method, params=None):
+        writeMessage(self.process.stdin, {'jsonrpc': '2.0', 'method': method, 'params': params or {}})
+
+    def close(self):
+        try:
+            self.request('shutdown')
+            self.notify('exit')
+        except (RpcError, IOError, OSError):
+            pass
+        self.process.stdin.close()
+        self.process.wait()
+        self.process.stdout.close()
+
+
+def main(argv=None):
+    argParser = argparse.ArgumentParser(prog='python -m docblock.server', description=__doc__.strip().split('\n')[0])
+    argParser.add_argument('-s', '--settings', action='append', default=[], help='user settings file(s) to load')
+    argParser.add_argument('--wrap-length', type=int, default=80, help='default column to wrap at (default: 80)')
+    argParser.add_argument('--tab-size', type=int, default=4, help='default tab size (default: 4)')
+    argParser.add_argument('--stats', action='store_true', help='print the latency of each method on exit')
+    args = argParser.parse_args(argv)
+
+    server = Server(loadSettings(args.settings), args.wrap_length, args.tab_size)
+    serve(server, sys.stdin.buffer, sys.stdout.buffer)
+    if args.stats:
+        sys.stderr.write('%-24s %8s %9s %9s %9s %9s\n' % ('method', 'count', 'mean (ms)', 'p50 (ms)', 'p95 (ms)',
+                                                          'max (ms)'))
+        for method, counters in sorted(server.stats().items()):
+            sys.stderr.write('%-24s %8d %9.3f %9.3f %9.3f %9.3f\n' % (
+                method, counters['count'], counters['mean'], counters['p50'], counters['p95'], counters['max']
+            ))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
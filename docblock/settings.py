@@ -0,0 +1,35 @@
+"""
+Reading BespokeDocs.sublime-settings outside of Sublime Text.
+
+The result is a plain dict, which offers the same `get(key, default)` interface the parsers use on
+`sublime.Settings`.
+"""
+import json
+import os
+import re
+
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SETTINGS = os.path.join(PACKAGE_DIR, 'BespokeDocs.sublime-settings')
+
+# strings are matched first so that comment markers and commas inside of them are left alone
+reJsonNoise = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*[\s\S]*?\*/|,(?=\s*[}\]])')
+
+
+def parseSettings(text):
+    """
+    Parse the relaxed JSON used by Sublime Text: comments and trailing commas are allowed.
+    """
+    return json.loads(reJsonNoise.sub(lambda m: m.group(1) or '', text))
+
+
+def loadSettings(paths=(), overrides=None):
+    """
+    Load the default settings of the package, then merge each of `paths` (user settings) and `overrides` into it.
+    """
+    settings = {}
+    for path in (DEFAULT_SETTINGS,) + tuple(paths):
+        with open(path, encoding='utf-8') as f:
+            settings.update(parseSettings(f.read()))
+    settings.update(overrides or {})
+    return settings
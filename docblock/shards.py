@@ -0,0 +1,257 @@
+"""
+A project index of definitions and their docblocks, split into shards, for monorepos.
+
+    python -m docblock.shards . --index .bespokedocs          # build, or bring up to date
+    python -m docblock.shards . --index .bespokedocs --find parseArgs
+
+Files are grouped by package: the nearest directory above them holding a `package.json`, or the root.
+Each package gets its own shard, a sorted `store` index saved on disk, which is only rebuilt when one of
+its files is added, removed or modified (by size and mtime). Changed shards are built in parallel by a
+pool of processes, then all the shards are merged with a k-way merge (they're sorted by name already)
+into one index, by string ids, without decoding rows. Queries read the merged index through a memory
+map: a lookup is a binary search, and nothing else is loaded.
+
+Each row is a definition found by `parser.scan`: its name, kind ("function" or "var"), path (relative
+to the root), 0 based row, whether a docblock precedes it, and the first line of that block.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from bisect import bisect_right
+from .comment import iterDocBlocks, parseDocBlock
+from .project import SOURCE_EXTENSIONS, IGNORED_DIRECTORIES, getParserForFile, readSource, imapBounded
+from .render import Text
+from .settings import loadSettings
+from .store import IndexBuilder, IndexReader, mergeIndexes, STRING
+
+
+COLUMNS = {'name': STRING, 'kind': STRING, 'path': STRING, 'row': 'I', 'documented': 'B', 'summary': STRING}
+MANIFEST_VERSION = 1
+
+pluginSettings = None
+
+
+def setup(settings):
+    global pluginSettings
+    pluginSettings = settings
+
+
+def iterPackages(root, extensions=SOURCE_EXTENSIONS, ignored=IGNORED_DIRECTORIES):
+    """
+    Returns {package directory: [(path, size, mtime), ...]} for the source files under root, where package
+    directories are relative to root ('.' for the root itself).
+    """
+    packages = {}
+    stack = [(root, '.')]
+    while stack:
+        directory, package = stack.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            continue
+        if directory != root and any(entry.name == 'package.json' for entry in entries):
+            package = os.path.relpath(directory, root)
+        files = packages.setdefault(package, [])
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in ignored:
+                    stack.append((entry.path, package))
+            elif entry.name.endswith(extensions):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+    return dict((package, sorted(files)) for package, files in packages.items() if files)
+
+
+def fingerprint(files):
+    """ changes whenever a file is added, removed, or written to """
+    digest = hashlib.sha1()
+    for path, size, mtime in files:
+        digest.update(('%s\0%d\0%d\n' % (path, size, mtime)).encode('utf-8', 'surrogateescape'))
+    return digest.hexdigest()
+
+
+def summaryOf(blockText):
+    for record in parseDocBlock(blockText):
+        if isinstance(record, Text):
+            return record.text.strip().split('\n')[0]
+    return ''
+
+
+def indexDefinitions(text, parser):
+    """ (name, kind, row, documented, summary) for each named definition of text """
+    blocks = list(iterDocBlocks(text)) if '/**' in text or '###*' in text else []
+    blockEnds = [end for begin, end in blocks]
+    out = []
+    row = 0
+    last = 0
+    for described in parser.scan(text):
+        name = described['name']
+        if not name:
+            continue
+        begin = described['begin']
+        row += text.count('\n', last, begin)
+        last = begin
+        # the block ending closest before the definition, if only whitespace is between them
+        i = bisect_right(blockEnds, begin) - 1
+        documented = i >= 0 and not text[blockEnds[i]:begin].strip()
+        summary = summaryOf(text[blocks[i][0]:blockEnds[i]]) if documented else ''
+        out.append((name, described['kind'], row, documented, summary))
+    return out
+
+
+def buildShard(task):
+    """ index the files of a package into the shard file path; returns (package, rows) """
+    root, package, files, path = task
+    builder = IndexBuilder(COLUMNS, sortedBy='name')
+    for filePath, size, mtime in files:
+        try:
+            text = readSource(filePath)
+        except (IOError, OSError):
+            continue
+        relative = os.path.relpath(filePath, root)
+        for name, kind, row, documented, summary in indexDefinitions(text, getParserForFile(filePath, pluginSettings)):
+            builder.add(name=name, kind=kind, path=relative, row=row, documented=int(documented), summary=summary)
+    builder.save(path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return package, len(builder)
+
+
+def mergeShards(paths, path):
+    """ merge the shard files at paths into one index at path; returns its number of rows """
+    if paths:
+        rows = mergeIndexes(paths, path + '.tmp')
+    else:
+        # no source files (left): an empty index
+        IndexBuilder(COLUMNS, sortedBy='name').save(path + '.tmp')
+        rows = 0
+    os.replace(path + '.tmp', path)
+    return rows
+
+
+class ShardedIndex(object):
+    """
+    The shards and merged index of a project, in the directory `directory`.
+    """
+
+    def __init__(self, root, directory, pluginSettings):
+        self.root = os.path.abspath(root)
+        self.directory = directory
+        self.pluginSettings = pluginSettings
+        self.manifestPath = os.path.join(directory, 'manifest.json')
+        self.mergedPath = os.path.join(directory, 'merged.idx')
+        self.reader = None
+
+    def readManifest(self):
+        try:
+            with open(self.manifestPath, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('root') != self.root:
+            return {}
+        return manifest.get('shards', {})
+
+    def shardPath(self, package):
+        return os.path.join(self.directory, 'shards', hashlib.sha1(package.encode('utf-8')).hexdigest()[:16] + '.idx')
+
+    def update(self, jobs=None):
+        """
+        Rebuild the shards of the packages which changed, and the merged index if any did. Returns
+        {'packages', 'rebuilt', 'removed', 'rows', 'build', 'merge'}, the times in seconds.
+        """
+        os.makedirs(os.path.join(self.directory, 'shards'), exist_ok=True)
+        shards = self.readManifest()
+        packages = iterPackages(self.root)
+
+        start = time.time()
+        tasks = []
+        current = {}
+        for package, files in sorted(packages.items()):
+            entry = {'file': self.shardPath(package), 'fingerprint': fingerprint(files)}
+            current[package] = entry
+            previous = shards.get(package) or {}
+            if previous.get('fingerprint') != entry['fingerprint'] or not os.path.exists(entry['file']):
+                tasks.append((self.root, package, files, entry['file']))
+        removed = [package for package in shards if package not in current]
+        for package in removed:
+            try:
+                os.remove(shards[package]['file'])
+            except OSError:
+                pass
+        for package, rows in imapBounded(buildShard, tasks, jobs, setup, (self.pluginSettings,)):
+            current[package]['rows'] = rows
+        for package, entry in current.items():
+            if 'rows' not in entry:
+                entry['rows'] = shards[package].get('rows', 0)
+        built = time.time()
+
+        rows = sum(entry['rows'] for entry in current.values())
+        if tasks or removed or not self.exists():
+            self.close()
+            rows = mergeShards([current[package]['file'] for package in sorted(current)], self.mergedPath)
+        with open(self.manifestPath + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'root': self.root, 'shards': current}, f, sort_keys=True)
+        os.replace(self.manifestPath + '.tmp', self.manifestPath)
+
+        return {
+            'packages': len(current), 'rebuilt': len(tasks), 'removed': len(removed), 'rows': rows,
+            'build': built - start, 'merge': time.time() - built
+        }
+
+    def exists(self):
+        """ whether the index was built """
+        return os.path.exists(self.mergedPath)
+
+    def find(self, name):
+        """ the definitions named name, as dicts of the columns; none before the index is built """
+        if self.reader is None:
+            if not self.exists():
+                return []
+            self.reader = IndexReader(self.mergedPath)
+        return [self.reader.row(row) for row in self.reader.find(name)]
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+def main(argv=None):
+    argParser = argparse.ArgumentParser(prog='python -m docblock.shards', description=__doc__.strip().split('\n')[0])
+    argParser.add_argument('root', help='the root directory of the project')
+    argParser.add_argument('--index', default=None, help='directory of the index (default: ROOT/.bespokedocs)')
+    argParser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes')
+    argParser.add_argument('-s', '--settings', action='append', default=[], help='user settings file(s) to load')
+    argParser.add_argument('--find', action='append', default=[], help="list the definitions of a name, without "
+                           "updating the index")
+    args = argParser.parse_args(argv)
+
+    index = ShardedIndex(args.root, args.index or os.path.join(args.root, '.bespokedocs'), loadSettings(args.settings))
+    if args.find:
+        if not index.exists():
+            sys.stderr.write('no index in %s, run without --find first\n' % index.directory)
+            return 1
+        for name in args.find:
+            for row in index.find(name):
+                sys.stdout.write('%s:%d: %s %s%s\n' % (
+                    row['path'], row['row'] + 1, row['kind'], row['name'],
+                    (' - ' + row['summary']) if row['summary'] else ''
+                ))
+        index.close()
+        return 0
+
+    stats = index.update(args.jobs)
+    sys.stderr.write('%d rows in %d packages: %d shards rebuilt in %.2fs, %d removed, merged in %.2fs\n' % (
+        stats['rows'], stats['packages'], stats['rebuilt'], stats['build'], stats['removed'], stats['merge']
+    ))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Snippets as plain text and field offsets, for blocks with too many fields for `insert_snippet`.
+
+    text, fields, exit = expandSnippet('/**\\n * ${1:[description]}\\n * $0\\n */', indent='    ')
+
+Sublime's snippet parser slows down sharply with hundreds of fields (eg: a docblock for a function with
+wide destructured options); inserting the text, then marking the fields as regions, takes about the same
+time whatever their number. Only the syntax the renderer produces is handled: `${n:text}`, `${n}`, `$n`
+and backslash escapes.
+"""
+import re
+
+
+reFieldStart = re.compile(r'(?<!\\)\$(?:\{\d+[:}]|\d)')
+reToken = re.compile(r'\\[\\$}{]|\$\{(\d+):|\$\{(\d+)\}|\$(\d+)|[$}\n]|[^\\$}\n]+|\\')
+
+
+def countFields(snippet):
+    """ about how many fields snippet has: enough to tell small snippets from huge ones """
+    return len(reFieldStart.findall(snippet))
+
+
+def expandSnippet(snippet, indent=''):
+    """
+    Returns (text, fields, exit): the text of snippet with `indent` after each newline (as `insert_snippet`
+    does), the (begin, end) offsets of its fields in tab order, and the offset of the final cursor
+    (`$0`, or the end of the text). Returns None for what must go through `insert_snippet`: nested or
+    mirrored fields, fields out of order, or variables.
+    """
+    out = []
+    length = 0
+    fields = {}  # tab index -> (begin, end)
+    opened = None  # (tab index, begin) of the field being read
+    for match in reToken.finditer(snippet):
+        token = match.group(0)
+        index = match.group(1) or match.group(2) or match.group(3)
+        if index is not None:
+            index = int(index)
+            if opened is not None or index in fields:
+                return None
+            if match.group(1):
+                opened = (index, length)
+                continue
+            fields[index] = (length, length)
+            continue
+        if token == '}' and opened is not None:
+            fields[opened[0]] = (opened[1], length)
+            opened = None
+            continue
+        if token == '$':
+            # a variable, eg: $TM_FILENAME
+            return None
+        if token[0] == '\\' and len(token) == 2:
+            token = token[1]
+        elif token == '\n':
+            token += indent
+        out.append(token)
+        length += len(token)
+    if opened is not None:
+        return None
+
+    exit = fields.pop(0, (length, length))[0]
+    ordered = [fields[index] for index in sorted(fields)]
+    if ordered != sorted(ordered):
+        # the fields are tracked as regions of the view, which are kept in the order of the text
+        return None
+    return ''.join(out), ordered, exit
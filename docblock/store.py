@@ -0,0 +1,308 @@
+"""
+Compact column storage for large indexes of docblocks and symbols.
+
+Rather than one Python object per symbol, an index keeps one `array` per column plus a pool of
+interned strings, so a million rows cost a few bytes each instead of a few hundred. A saved index is
+memory-mapped when opened: columns are read straight from the page cache and nothing is decoded
+until a row is asked for.
+
+    builder = IndexBuilder({'path': STRING, 'name': STRING, 'line': 'I'}, lists=('tags',), sortedBy='name')
+    builder.add(path='src/a.js', name='foo', line=12, tags=['param', 'returns'])
+    builder.save('symbols.idx')
+
+    index = IndexReader('symbols.idx')
+    [index.row(i) for i in index.find('foo')]
+"""
+import bisect
+import heapq
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+
+STRING = 'string'
+
+MAGIC = b'BDIX'
+VERSION = 1
+ALIGN = 8
+
+
+class StringPool(object):
+    """
+    Interned strings, stored as one utf-8 blob and an array of offsets into it.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.blob = bytearray()
+        self.offsets = array('I', [0])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def intern(self, string):
+        id = self.ids.get(string)
+        if id is None:
+            id = self.ids[string] = len(self.offsets) - 1
+            self.blob += string.encode('utf-8')
+            self.offsets.append(len(self.blob))
+        return id
+
+    def get(self, id):
+        return self.blob[self.offsets[id]:self.offsets[id + 1]].decode('utf-8')
+
+    def sortedIds(self):
+        """ returns a map of old id -> new id which puts the strings in (utf-8 byte) order """
+        order = sorted(range(len(self)), key=lambda id: bytes(self.blob[self.offsets[id]:self.offsets[id + 1]]))
+        remap = array('I', bytes(4 * len(order)))
+        for newId, oldId in enumerate(order):
+            remap[oldId] = newId
+        return order, remap
+
+
+class IndexBuilder(object):
+    """
+    Accumulates rows in memory. `columns` maps a column name to an `array` typecode, or to STRING;
+    `lists` names columns holding lists of strings (eg: tag names).
+    """
+
+    def __init__(self, columns, lists=(), sortedBy=None):
+        self.strings = StringPool()
+        self.columns = dict((name, array('I' if kind == STRING else kind)) for name, kind in columns.items())
+        self.kinds = dict(columns)
+        self.lists = dict((name, (array('I', [0]), array('I'))) for name in lists)
+        self.sortedBy = sortedBy
+
+    def __len__(self):
+        for column in self.columns.values():
+            return len(column)
+        return 0
+
+    def add(self, **row):
+        for name, column in self.columns.items():
+            value = row[name]
+            column.append(self.strings.intern(value) if self.kinds[name] == STRING else value)
+        for name, (offsets, items) in self.lists.items():
+            for value in row.get(name, ()):
+                items.append(self.strings.intern(value))
+            offsets.append(len(items))
+
+    def save(self, path):
+        # renumber the strings in sorted order, so that comparing ids compares strings
+        order, remap = self.strings.sortedIds()
+        strings = StringPool()
+        for oldId in order:
+            strings.intern(self.strings.get(oldId))
+
+        segments = [('strings.offsets', strings.offsets), ('strings.blob', strings.blob)]
+        for name in sorted(self.columns):
+            column = self.columns[name]
+            if self.kinds[name] == STRING:
+                column = array('I', (remap[id] for id in column))
+            segments.append(('column.' + name, column))
+        for name in sorted(self.lists):
+            offsets, items = self.lists[name]
+            segments.append(('list.%s.offsets' % name, offsets))
+            segments.append(('list.%s.items' % name, array('I', (remap[id] for id in items))))
+        if self.sortedBy:
+            key = segments[[s[0] for s in segments].index('column.' + self.sortedBy)][1]
+            segments.append(('order', array('I', sorted(range(len(key)), key=key.__getitem__))))
+        writeIndex(path, len(self), self.kinds, sorted(self.lists), self.sortedBy, segments)
+
+
+def writeIndex(path, rows, kinds, lists, sortedBy, segments):
+    """ save an index made of segments, a list of (name, array or bytes) """
+    header = {
+        'rows': rows,
+        'byteorder': sys.byteorder,
+        'kinds': kinds,
+        'lists': lists,
+        'sortedBy': sortedBy,
+        'segments': []
+    }
+    offset = 0
+    for name, data in segments:
+        typecode = data.typecode if isinstance(data, array) else 'B'
+        size = len(data) * (data.itemsize if isinstance(data, array) else 1)
+        header['segments'].append([name, typecode, offset, size])
+        offset += size + (-size % ALIGN)
+
+    headerBytes = json.dumps(header).encode('utf-8')
+    headerBytes += b' ' * (-(len(headerBytes) + 12) % ALIGN)
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<II', VERSION, len(headerBytes)) + headerBytes)
+        for name, data in segments:
+            raw = data.tobytes() if isinstance(data, array) else bytes(data)
+            f.write(raw + b'\0' * (-len(raw) % ALIGN))
+
+
+def mergeIndexes(paths, path):
+    """
+    Merge saved indexes with the same columns, sorted by the same column, into one saved at path, and
+    return its number of rows. Both the strings and the rows are merged k-way, by their ids: no row is
+    decoded, and nothing is sorted again.
+    """
+    readers = [IndexReader(indexPath) for indexPath in paths]
+    try:
+        if not readers:
+            raise ValueError('no indexes to merge')
+        kinds = readers[0].kinds
+        lists = readers[0].header['lists']
+        sortedBy = readers[0].header['sortedBy']
+        for reader in readers:
+            if reader.kinds != kinds or reader.header['lists'] != lists or reader.header['sortedBy'] != sortedBy:
+                raise ValueError('indexes with different columns can\'t be merged')
+
+        # the union of the (sorted) strings, and what each index's ids become
+        blob = bytearray()
+        offsets = array('I', [0])
+        remaps = [array('I', bytes(4 * (len(reader.stringOffsets) - 1))) for reader in readers]
+        last = None
+
+        def strings(i, reader):
+            blob, stringOffsets = reader.stringBlob, reader.stringOffsets
+            for id in range(len(stringOffsets) - 1):
+                yield bytes(blob[stringOffsets[id]:stringOffsets[id + 1]]), i, id
+        for value, i, id in heapq.merge(*[strings(i, reader) for i, reader in enumerate(readers)]):
+            if value != last:
+                blob += value
+                offsets.append(len(blob))
+                last = value
+            remaps[i][id] = len(offsets) - 2
+
+        # the rows of every index, in the order of the sorted column
+        rows = []
+        if sortedBy:
+            def ordered(i, reader):
+                remap = remaps[i] if kinds[sortedBy] == STRING else None
+                column = reader.column(sortedBy)
+                for row in reader.segments['order']:
+                    yield (remap[column[row]] if remap else column[row]), i, row
+            rows = [(i, row) for key, i, row in heapq.merge(*[ordered(i, reader) for i, reader in enumerate(readers)])]
+        else:
+            rows = [(i, row) for i, reader in enumerate(readers) for row in range(len(reader))]
+
+        segments = [('strings.offsets', offsets), ('strings.blob', blob)]
+        for name in sorted(kinds):
+            columns = [reader.column(name) for reader in readers]
+            if kinds[name] == STRING:
+                data = array('I', [remaps[i][columns[i][row]] for i, row in rows])
+            else:
+                data = array(kinds[name], [columns[i][row] for i, row in rows])
+            segments.append(('column.' + name, data))
+        for name in lists:
+            listOffsets = [reader.segments['list.%s.offsets' % name] for reader in readers]
+            listItems = [reader.segments['list.%s.items' % name] for reader in readers]
+            mergedOffsets = array('I', [0])
+            mergedItems = array('I')
+            for i, row in rows:
+                remap = remaps[i]
+                mergedItems.extend(remap[id] for id in listItems[i][listOffsets[i][row]:listOffsets[i][row + 1]])
+                mergedOffsets.append(len(mergedItems))
+            segments.append(('list.%s.offsets' % name, mergedOffsets))
+            segments.append(('list.%s.items' % name, mergedItems))
+        if sortedBy:
+            segments.append(('order', array('I', range(len(rows)))))
+        writeIndex(path, len(rows), kinds, lists, sortedBy, segments)
+        return len(rows)
+    finally:
+        for reader in readers:
+            reader.close()
+
+
+class IndexReader(object):
+    """
+    A saved index, memory-mapped. Rows are decoded on demand.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:4] != MAGIC:
+            raise ValueError('%s is not a BespokeDocs index' % path)
+        version, headerLength = struct.unpack('<II', self.map[4:12])
+        if version != VERSION:
+            raise ValueError('%s has index version %d, expected %d' % (path, version, VERSION))
+        self.header = json.loads(self.map[12:12 + headerLength].decode('utf-8'))
+        if self.header['byteorder'] != sys.byteorder:
+            raise ValueError('%s was written on a machine with a different byte order' % path)
+
+        base = 12 + headerLength
+        view = memoryview(self.map)
+        self.segments = {}
+        for name, typecode, offset, size in self.header['segments']:
+            self.segments[name] = view[base + offset:base + offset + size].cast(typecode)
+        self.kinds = self.header['kinds']
+        self.stringOffsets = self.segments['strings.offsets']
+        self.stringBlob = self.segments['strings.blob']
+
+    def __len__(self):
+        return self.header['rows']
+
+    def string(self, id):
+        return bytes(self.stringBlob[self.stringOffsets[id]:self.stringOffsets[id + 1]]).decode('utf-8')
+
+    def stringId(self, string):
+        """ the id of string, or -1 if it's not in the index """
+        key = string.encode('utf-8')
+        low, high = 0, len(self.stringOffsets) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if bytes(self.stringBlob[self.stringOffsets[middle]:self.stringOffsets[middle + 1]]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.stringOffsets) - 1 and self.string(low) == string:
+            return low
+        return -1
+
+    def column(self, name):
+        return self.segments['column.' + name]
+
+    def value(self, name, row):
+        value = self.segments['column.' + name][row]
+        return self.string(value) if self.kinds[name] == STRING else value
+
+    def list(self, name, row):
+        offsets = self.segments['list.%s.offsets' % name]
+        items = self.segments['list.%s.items' % name]
+        return [self.string(id) for id in items[offsets[row]:offsets[row + 1]]]
+
+    def row(self, row):
+        out = dict((name, self.value(name, row)) for name in self.kinds)
+        for name in self.header['lists']:
+            out[name] = self.list(name, row)
+        return out
+
+    def find(self, value):
+        """ the rows whose `sortedBy` column equals value """
+        id = self.stringId(value) if self.kinds[self.header['sortedBy']] == STRING else value
+        if id == -1:
+            return []
+        order = self.segments['order']
+        keys = SortedKeys(order, self.column(self.header['sortedBy']))
+        return list(order[bisect.bisect_left(keys, id):bisect.bisect_right(keys, id)])
+
+    def close(self):
+        for segment in self.segments.values():
+            segment.release()
+        self.segments = {}
+        self.stringOffsets = self.stringBlob = None
+        self.map.close()
+        self.file.close()
+
+
+class SortedKeys(object):
+    """ the values of a column, in the order of a sorted permutation of its rows (for bisect) """
+
+    def __init__(self, order, column):
+        self.order = order
+        self.column = column
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.column[self.order[i]]
@@ -0,0 +1,106 @@
+"""
+The tag table of documentation.js (see documentationSource.js in the package root).
+
+Synonyms are rewritten to their canonical tag, and a number of tags are flattened onto the comment
+itself, eg: `@deprecated since 2.0` --> `{"deprecated": "since 2.0"}`.
+"""
+
+SYNONYMS = {
+    'arg': 'param',
+    'argument': 'param',
+    'const': 'constant',
+    'constructor': 'class',
+    'defaultvalue': 'default',
+    'desc': 'description',
+    'emits': 'fires',
+    'exception': 'throws',
+    'extends': 'augments',
+    'fileoverview': 'file',
+    'func': 'function',
+    'host': 'external',
+    'method': 'function',
+    'overview': 'file',
+    'prop': 'property',
+    'return': 'returns',
+    'var': 'member',
+    'virtual': 'abstract'
+}
+
+BOOLEAN = 'boolean'
+NAME = 'name'
+DESCRIPTION = 'description'
+MARKDOWN = 'markdown'
+KIND = 'kind'
+
+FLATTENERS = {
+    'abstract': BOOLEAN,
+    'alias': NAME,
+    'author': DESCRIPTION,
+    'class': KIND,
+    'classdesc': MARKDOWN,
+    'constant': KIND,
+    'copyright': MARKDOWN,
+    'deprecated': MARKDOWN,
+    'description': MARKDOWN,
+    'function': KIND,
+    'ignore': BOOLEAN,
+    'lends': DESCRIPTION,
+    'license': DESCRIPTION,
+    'member': KIND,
+    'memberof': DESCRIPTION,
+    'mixin': KIND,
+    'module': KIND,
+    'name': NAME,
+    'namespace': KIND,
+    'override': BOOLEAN,
+    'readonly': BOOLEAN,
+    'since': DESCRIPTION,
+    'summary': MARKDOWN,
+    'typedef': KIND,
+    'version': DESCRIPTION
+}
+
+# tags which may appear more than once are gathered into a list
+COLLECTIONS = {
+    'augments': 'augments',
+    'example': 'examples',
+    'param': 'params',
+    'property': 'properties',
+    'returns': 'returns',
+    'see': 'sees',
+    'throws': 'throws',
+    'todo': 'todos',
+    'yields': 'yields'
+}
+
+
+def canonicalTag(title):
+    return SYNONYMS.get(title, title)
+
+
+def flattenTags(tags, out):
+    """
+    Given a list of `{title, type, name, description}` dicts with canonical titles, add the flattened
+    properties to the `out` dict. Returns `out`.
+    """
+    for tag in tags:
+        title = tag['title']
+        flattener = FLATTENERS.get(title)
+        if flattener == BOOLEAN:
+            out[title] = True
+        elif flattener == NAME:
+            out[title] = tag['name'] or tag['description']
+        elif flattener in (DESCRIPTION, MARKDOWN):
+            out[title] = tag['description']
+        elif flattener == KIND:
+            out['kind'] = title
+            name = tag['name'] or tag['description']
+            if name:
+                out['name'] = name
+            if tag['type']:
+                out['type'] = tag['type']
+        elif title in COLLECTIONS:
+            out.setdefault(COLLECTIONS[title], []).append(dict(
+                (key, value) for key, value in tag.items() if key != 'title' and value is not None
+            ))
+    return out
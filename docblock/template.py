@@ -0,0 +1,226 @@
+"""
+User defined docblock templates (the `templates` setting), compiled to Python functions.
+
+A template is a list of lines, one per line of the block, for a language ("js", "coffee", or "*" for
+both) and a kind of definition ("function" or "var"):
+
+    "templates": {
+        "*": {
+            "function": [
+                "{{description}}",
+                "{{#params}}",
+                "@param {{{type}}} {{name}} [description]",
+                "{{/params}}",
+                "{{#returns}}",
+                "@returns {{{returns}}} [description]",
+                "{{/returns}}",
+                "@since {{date}}"
+            ]
+        }
+    }
+
+`{{name}}` is replaced by a variable of the definition (see `BespokeDocsParser.functionContext` and
+`varContext`), or `{{date}}` / `{{datetime}}`. A line holding only `{{#name}}` opens a section, closed by
+`{{/name}}`: it's repeated for each item of a list (whose fields become variables), rendered once for
+another true value, and left out for a false or missing one. `{{^name}}` opens a section rendered only
+when the value is false or missing.
+
+Lines starting with an `@tag` (written out: the tag can't be a variable) become tags, split into
+columns like a parsed docblock, which are aligned and get tab stops like those of the built-in blocks:
+`[placeholders]` are stops. Other lines become text. Lines holding snippet fields (`${1:...}`) are
+used as is.
+
+A template is compiled once into a function building the records directly, and kept for as long as the
+settings hold the same template.
+"""
+import re
+from .comment import parseTag, reTagStart
+from .render import Tag, Text, getVariable, NAME_STOP, DESCRIPTION_STOP, STOP, RAW
+
+
+reVariableTag = re.compile(r'\{\{([#^/]?)\s*([\w.]+)\s*\}\}')
+reSectionLine = re.compile(r'^\s*\{\{([#^/])\s*([\w.]+)\s*\}\}\s*$')
+reEncoded = re.compile('\x00(\\d+)\x00')
+
+# compiled templates, or the TemplateError they raised, by their lines
+compiled = {}
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def lookup(scopes, name):
+    """ the value of a variable: from the innermost section which has it, then the global variables """
+    path = name.split('.')
+    for scope in reversed(scopes):
+        if isinstance(scope, dict) and path[0] in scope:
+            value = scope[path[0]]
+            for key in path[1:]:
+                value = value.get(key) if isinstance(value, dict) else None
+            return value
+    return getVariable(name)
+
+
+def section(value):
+    """ the items a section is rendered for """
+    if not value:
+        return ()
+    if isinstance(value, (list, tuple)):
+        return value
+    return (value,)
+
+
+def text(value):
+    return '' if value is None or value is False else str(value)
+
+
+def splitTokens(source):
+    """ the literal text and variables of source, as (isVariable, text) tuples """
+    tokens = []
+    pos = 0
+    for match in reVariableTag.finditer(source):
+        if match.group(1):
+            raise TemplateError('sections must be on lines of their own: %r' % source)
+        if match.start() > pos:
+            tokens.append((False, source[pos:match.start()]))
+        tokens.append((True, match.group(2)))
+        pos = match.end()
+    if pos < len(source):
+        tokens.append((False, source[pos:]))
+    return tokens
+
+
+def variable(name, scopes):
+    """
+    The Python expression of the value of a variable, where scopes are the names of the local variables
+    holding the context and the current item of each enclosing section, innermost last.
+    """
+    if name == '.':
+        return scopes[-1]
+    if '.' in name:
+        return 'lookup([%s], %r)' % (', '.join(scopes), name)
+    # resolved inline rather than through lookup: templates are rendered for every block of a batch
+    out = []
+    for scope in reversed(scopes[1:]):
+        out.append('%s[%r] if isinstance(%s, dict) and %r in %s else ' % (scope, name, scope, name, scope))
+    return '(%s%s[%r] if %r in %s else getVariable(%r))' % (''.join(out), scopes[0], name, name, scopes[0], name)
+
+
+def expression(tokens, scopes):
+    """ the Python expression of the text of tokens """
+    parts = [('text(%s)' % variable(value, scopes)) if isVariable else repr(value) for isVariable, value in tokens]
+    return ' + '.join(parts) or "''"
+
+
+def isPlaceholder(tokens):
+    return any(not isVariable and '[' in value for isVariable, value in tokens)
+
+
+def compileTag(title, source, scopes):
+    """
+    The expression building the Tag of a template line. The columns are split like those of a parsed
+    docblock, with the variables standing in as single words.
+    """
+    variables = []
+    encoded = []
+    for isVariable, value in splitTokens(source):
+        if isVariable:
+            encoded.append('\x00%d\x00' % len(variables))
+            variables.append(value)
+        else:
+            encoded.append(value)
+    parsed = parseTag(title, ''.join(encoded).strip())
+
+    columns = []
+    for value in (parsed.type, parsed.name, parsed.description):
+        if value is None:
+            columns.append((None, 'None'))
+            continue
+        parts = reEncoded.split(value)
+        tokens = [(bool(i % 2), variables[int(part)] if i % 2 else part) for i, part in enumerate(parts) if part]
+        columns.append((tokens, '(%s) or None' % expression(tokens, scopes)))
+
+    flags = []
+    if parsed.type is not None:
+        flags.append('typeFlags')
+    if parsed.name is not None and isPlaceholder(columns[1][0]):
+        flags.append(str(NAME_STOP))
+    if parsed.description is not None:
+        flags.append(str(DESCRIPTION_STOP))
+    return 'Tag(%r, %s, %s, %s, %s)' % (
+        '@' + title, columns[0][1], columns[1][1], columns[2][1], ' | '.join(flags) or '0'
+    )
+
+
+def compileLine(line, scopes):
+    """ the expression building the record of a template line """
+    tokens = splitTokens(line)
+    tag = reTagStart.match(line.strip())
+    if '${' in line:
+        flags = RAW
+    elif tag:
+        return compileTag(tag.group(1), line.strip()[tag.end():], scopes)
+    elif isPlaceholder(tokens) or (True, 'description') in tokens:
+        flags = STOP
+    else:
+        flags = 0
+    return 'Text(%s, %d)' % (expression(tokens, scopes), flags)
+
+
+def compileSource(lines):
+    """ the source of the Python function rendering the template lines """
+    code = ['def render(context, typeFlags):', '    out = []', '    append = out.append']
+    sections = []
+    scopes = ['context']
+    for line in lines:
+        indent = '    ' * (len(sections) + 1)
+        match = reSectionLine.match(line)
+        if not match:
+            code.append(indent + 'append(%s)' % compileLine(line, scopes))
+            continue
+        kind, name = match.groups()
+        if kind == '/':
+            if not sections or sections[-1][1] != name:
+                raise TemplateError('{{/%s}} closes no section' % name)
+            opened, name = sections.pop()
+            if opened == '#':
+                scopes.pop()
+            if code[-1].endswith(':'):
+                code.append(indent + 'pass')
+            continue
+        if kind == '#':
+            code.append(indent + 'for scope%d in section(%s):' % (len(scopes), variable(name, scopes)))
+            scopes.append('scope%d' % len(scopes))
+        else:
+            code.append(indent + 'if not %s:' % variable(name, scopes))
+        sections.append((kind, name))
+    if sections:
+        raise TemplateError('{{%s%s}} is never closed' % sections[-1])
+    code.append('    return out')
+    return '\n'.join(code) + '\n'
+
+
+def compileTemplate(lines):
+    """
+    Returns a function of (context, typeFlags) rendering the template lines into a list of records, where
+    context is a dict of the variables, and typeFlags the flags of the type columns. Compiled templates
+    are kept by their lines, so each is only compiled once; so are the errors of broken ones, raised again.
+    """
+    key = tuple(lines)
+    render = compiled.get(key)
+    if render is None:
+        namespace = {
+            'lookup': lookup, 'section': section, 'text': text, 'getVariable': getVariable, 'Tag': Tag, 'Text': Text
+        }
+        try:
+            exec(compile(compileSource(key), '<template>', 'exec'), namespace)
+            render = namespace['render']
+        except TemplateError as error:
+            render = error
+        if len(compiled) > 64:
+            compiled.clear()
+        compiled[key] = render
+    if isinstance(render, TemplateError):
+        raise render
+    return render
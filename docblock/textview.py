@@ -0,0 +1,28 @@
+"""
+A read only stand-in for `sublime.View` over a string, so the view based parser helpers
+(`read_line`, `getDefinition`) work on files outside of the editor.
+"""
+
+
+class TextView(object):
+
+    def __init__(self, text):
+        self.text = text
+
+    def size(self):
+        return len(self.text)
+
+    def line(self, point):
+        """ returns the (begin, end) offsets of the line containing point, without the newline """
+        begin = self.text.rfind('\n', 0, point) + 1
+        end = self.text.find('\n', point)
+        return (begin, len(self.text) if end < 0 else end)
+
+    def substr(self, region):
+        if isinstance(region, int):
+            return self.text[region:region + 1]
+        return self.text[region[0]:region[1]]
+
+    def rowcol(self, point):
+        row = self.text.count('\n', 0, point)
+        return (row, point - self.text.rfind('\n', 0, point) - 1)
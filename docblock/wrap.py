@@ -0,0 +1,119 @@
+"""
+Reflowing the text of a docblock so that it wraps at a given column.
+"""
+import re
+
+
+# a word which starts a tag, at the start of a line (as `comment.reTagStart` reads it)
+reTagWord = re.compile(r'@[a-zA-Z]+$')
+reBodyStart = re.compile(r"\n\s*\* ")
+
+# the settings wrapping follows
+WRAP_SETTINGS = ('indentation_spaces', 'indentation_spaces_same_para', 'spacer_between_sections')
+reBodyEnd = re.compile(r"\s*\n\s*\*/")
+
+
+def wrapLines(text, wrapLength, tabSize, pluginSettings):
+    """
+    Wrap the body of a docblock: `text` starts with the newline which precedes its first line, and ends
+    where its last line does (before the closer). Returns the new body, whose lines start with ' *', with
+    paragraphs, tags and spacers laid out according to the settings.
+    """
+    numIndentSpaces = max(0, pluginSettings.get("indentation_spaces", 1))
+    indentSpaces = " " * numIndentSpaces
+    indentSpacesSamePara = " " * max(0, pluginSettings.get("indentation_spaces_same_para", numIndentSpaces))
+    spacerBetweenSections = pluginSettings.get("spacer_between_sections") == True
+    spacerBetweenDescriptionAndTags = pluginSettings.get("spacer_between_sections") == "after_description"
+
+    # find the indentation level
+    indentation = len(re.sub('\t', ' ' * tabSize, re.search("\n(\\s*\\*)", text).group(1)))
+    wrapLength -= indentation - tabSize
+
+    # join all the lines, collapsing "empty" lines
+    text = re.sub("\n(\\s*\\*\\s*\n)+", "\n\n", text)
+
+    def wrapPara(para):
+        para = re.sub("(\n|^)\\s*\\*\\s*", " ", para)
+
+        # split the paragraph into words
+        words = para.strip().split(' ')
+        text = '\n'
+        line = ' *' + indentSpaces
+        lineTagged = False  # indicates if the line contains a doc tag
+        paraTagged = False  # indicates if this paragraph contains a doc tag
+        lineIsNew = True
+        tag = ''
+
+        # join all words to create lines, no longer than wrapLength
+        for i, word in enumerate(words):
+            if not word and not lineTagged:
+                continue
+
+            if i == 0 and reTagWord.match(word):
+                lineTagged = True
+                paraTagged = True
+                tag = word
+
+            if len(line) + len(word) >= wrapLength - 1:
+                # appending the word to the current line would exceed its
+                # length requirements
+                if not word:
+                    # the padding of aligned columns isn't carried to the next line
+                    continue
+                if word[0] == '@':
+                    # a line starting with an @word of the text would read as a tag: let this one run over
+                    line += word + ' '
+                    lineIsNew = False
+                    continue
+                text += line.rstrip() + '\n'
+                line = ' *' + indentSpacesSamePara + word + ' '
+                lineTagged = False
+                lineIsNew = True
+            else:
+                line += word + ' '
+
+            lineIsNew = False
+
+        text += line.rstrip()
+        return {'text':       text,
+                'lineTagged': lineTagged,
+                'tagged':     paraTagged,
+                'tag':        tag}
+    # split the text into paragraphs, where each paragraph is eighter
+    # defined by an empty line or the start of a doc parameter
+    paragraphs = re.split('\n{2,}|\n\\s*\\*\\s*(?=@[a-zA-Z]+(?:\\s|$))', text)
+    wrappedParas = []
+    text = ''
+    for p, para in enumerate(paragraphs):
+        # wrap the lines in the current paragraph
+        wrappedParas.append(wrapPara(para))
+
+    # combine all the paragraphs into a single piece of text
+    for i in range(0, len(wrappedParas)):
+        para = wrappedParas[i]
+        last = i == len(wrappedParas) - 1
+
+        nextIsTagged = not last and wrappedParas[i + 1]['tagged']
+        nextIsSameTag = nextIsTagged and para['tag'] == wrappedParas[i + 1]['tag']
+
+        if last or (para['lineTagged'] or nextIsTagged) and \
+                not (spacerBetweenSections and not nextIsSameTag) and \
+                not (not para['lineTagged'] and nextIsTagged and spacerBetweenDescriptionAndTags):
+            text += para['text']
+        else:
+            text += para['text'] + '\n *'
+
+    return text
+
+
+def wrapBlock(text, indent, wrapLength, tabSize, pluginSettings):
+    """
+    Wrap a whole docblock, from its opener to its closer, whose lines are indented by `indent`. Returns the
+    new text of the block, or None if it has no lines to wrap (eg: a single line block).
+    """
+    start = reBodyStart.search(text)
+    end = start and reBodyEnd.search(text, start.start())
+    if not end:
+        return None
+    wrapped = wrapLines(text[start.start():end.start()], wrapLength, tabSize, pluginSettings)
+    return text[:start.start()] + wrapped.replace('\n', '\n' + indent) + text[end.start():]
@@ -1,6 +1,14 @@
+import os
+import shutil
 import sublime
 import sublime_plugin
+import tempfile
 import unittest
+from .docblock.diff import readDiff
+from .docblock.format import Options, formatText, formatFile, setup as setupFormat
+from .docblock.restyle import restyleText, restyleFile, setup as setupRestyle
+from .docblock.settings import loadSettings
+from .docblock.shards import ShardedIndex
 
 class __bespoke_docs_test_replace_cursor_position(sublime_plugin.TextCommand):
     def run(self, edit):
@@ -233,6 +241,220 @@ class TestJavaScript(ViewTestCase):
             'var foo = bar;'
         ])
 
+    def run_join(self, *regions):
+        self.view.sel().clear()
+        for begin, end in regions:
+            self.view.sel().add(sublime.Region(begin, end))
+        self.view.run_command('bespoke_docs_join')
+
+    def test_join_removes_comment_leaders(self):
+        self.set_view_content('/**\n * foo|  \n *   bar\n */')
+        self.view.run_command('bespoke_docs_join')
+        self.assert_bespoke_docs_result('/**\n * foo bar\n */')
+
+    def test_join_lines_around_a_whitespace_only_line(self):
+        self.set_view_content('a\n  \nb')
+        self.run_join((0, 6))
+        self.assert_bespoke_docs_result('a b')
+
+    def test_join_selections_on_adjacent_lines(self):
+        self.set_view_content('a\n  \nb\nc')
+        self.run_join((0, 0), (3, 3))
+        self.assert_bespoke_docs_result('a b\nc')
+
+    def test_join_selections_on_the_same_line(self):
+        self.set_view_content(' * a\n * b\n * c')
+        self.run_join((1, 1), (3, 3))
+        self.assert_bespoke_docs_result(' * a b\n * c')
+
+    def test_reparse_the_block_opened_at_the_cursor(self):
+        self.set_view_content('/**\n * [first]\n */\n|/**\n * [second]\n */\nfoo')
+        self.view.run_command('bespoke_docs_reparse')
+        self.assertEqual('[second]', self.view.substr(self.view.sel()[0]))
+
+    def test_reparse_outside_of_a_block(self):
+        self.set_view_content('/**\n * [first]\n */\nfoo|')
+        self.view.run_command('bespoke_docs_reparse')
+        self.assertEqual(sublime.Region(self.view.size()), self.view.sel()[0])
+
+class TestFormat(unittest.TestCase):
+
+    def format(self, text, **settings):
+        return formatText('test.js', text, Options(loadSettings(overrides=settings), 80))
+
+    def assert_formats_once(self, text, **settings):
+        formatted = self.format(text, **settings)
+        self.assertEquals(formatted, self.format(formatted, **settings))
+        return formatted
+
+    def test_at_words_in_prose_are_not_tags(self):
+        formatted = self.assert_formats_once('\n'.join([
+            '/**',
+            ' * Loads the configuration of the project, and resolves each preset through @babel/core before use.',
+            ' * @param {Object} options the options',
+            ' */'
+        ]))
+        self.assertEquals(formatted, '\n'.join([
+            '/**',
+            ' * Loads the configuration of the project, and resolves each preset through @babel/core',
+            ' * before use.',
+            ' * @param {Object} options the options',
+            ' */'
+        ]))
+
+    def test_lines_are_not_broken_in_front_of_at_words(self):
+        for word in ('@param', '@jquery', '@foo.bar'):
+            # move the word across the wrapping column
+            for count in range(12):
+                formatted = self.assert_formats_once('\n'.join([
+                    '/**',
+                    ' * @param {Object} options the options, passed to the ' + 'big ' * count + 'plugin ' + word +
+                    ' and the others',
+                    ' */'
+                ]), align_tags='deep')
+                starts = [line.lstrip(' *').split(' ')[0] for line in formatted.split('\n')[1:-1]]
+                self.assertEquals([start for start in starts if start.startswith('@')], ['@param'])
+
+    def test_descriptions_starting_with_at_words_are_formatted_once(self):
+        self.assert_formats_once('\n'.join([
+            '/**',
+            ' * @param returned @param @param value of the call, which is ' + 'long ' * 20,
+            ' * @notatag ' + 'padded ' * 30,
+            ' */'
+        ]), align_tags='deep', indentation_spaces=2)
+
+    def test_files_keep_their_line_endings(self):
+        block = b'/**\r\n * Adds one.\r\n * @param {String} a  the first\r\n */\r\nfunction f(a) {}\r\n'
+        directory = tempfile.mkdtemp()
+        try:
+            setupFormat(Options(loadSettings(overrides={'spacer_between_sections': False}), 80))
+            crlf = os.path.join(directory, 'crlf.js')
+            with open(crlf, 'wb') as f:
+                f.write(b'// caf\xc3\xa9\r\n' + block)
+            formatFile(crlf)
+            with open(crlf, 'rb') as f:
+                self.assertEquals(f.read(), b'// caf\xc3\xa9\r\n' + block.replace(b'a  the', b'a the'))
+
+            # not UTF-8: left alone
+            latin1 = os.path.join(directory, 'latin1.js')
+            with open(latin1, 'wb') as f:
+                f.write(b'// caf\xe9\r\n' + block)
+            formatFile(latin1)
+            with open(latin1, 'rb') as f:
+                self.assertEquals(f.read(), b'// caf\xe9\r\n' + block)
+        finally:
+            shutil.rmtree(directory)
+
+class TestRestyle(unittest.TestCase):
+
+    def restyle(self, text, **settings):
+        return restyleText('test.js', text, loadSettings(overrides=settings))[0]
+
+    def test_prose_lines_starting_with_at_words_are_kept(self):
+        text = '\n'.join([
+            '/**',
+            ' * Loads the configuration through',
+            ' * @babel/core before use.',
+            ' * @param {Object} options the options',
+            ' * @return {Object}',
+            ' */'
+        ])
+        restyled = self.restyle(text, align_tags='deep')
+        self.assertEquals(restyled, '\n'.join([
+            '/**',
+            ' * Loads the configuration through',
+            ' * @babel/core before use.',
+            ' * @param  {Object} options the options',
+            ' * @return {Object}',
+            ' */'
+        ]))
+        self.assertEquals(restyled, self.restyle(restyled, align_tags='deep'))
+
+    def test_files_keep_their_line_endings(self):
+        block = b'/**\r\n * Adds one.\r\n * @param  {String} a the first\r\n */\r\nfunction f(a) {}\r\n'
+        directory = tempfile.mkdtemp()
+        try:
+            setupRestyle(loadSettings(overrides={'align_tags': 'no'}))
+            crlf = os.path.join(directory, 'crlf.js')
+            with open(crlf, 'wb') as f:
+                f.write(b'// caf\xc3\xa9\r\n' + block)
+            restyleFile(crlf)
+            with open(crlf, 'rb') as f:
+                self.assertEquals(f.read(), b'// caf\xc3\xa9\r\n' + block.replace(b'param  {', b'param {'))
+
+            # not UTF-8: left alone
+            latin1 = os.path.join(directory, 'latin1.js')
+            with open(latin1, 'wb') as f:
+                f.write(b'// caf\xe9\r\n' + block)
+            restyleFile(latin1)
+            with open(latin1, 'rb') as f:
+                self.assertEquals(f.read(), b'// caf\xe9\r\n' + block)
+        finally:
+            shutil.rmtree(directory)
+
+class TestShards(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.index = ShardedIndex(self.root, os.path.join(self.root, '.bespokedocs'), loadSettings())
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.root)
+
+    def test_find_before_the_first_build(self):
+        self.assertFalse(self.index.exists())
+        self.assertEquals(self.index.find('foo'), [])
+
+    def test_projects_without_source_files(self):
+        self.assertEquals(self.index.update(jobs=1)['rows'], 0)
+        self.assertEquals(self.index.find('foo'), [])
+
+        path = os.path.join(self.root, 'foo.js')
+        with open(path, 'w') as f:
+            f.write('function foo(a) {}\n')
+        self.assertEquals(self.index.update(jobs=1)['rows'], 1)
+        self.assertEquals([row['name'] for row in self.index.find('foo')], ['foo'])
+
+        # every file deleted
+        os.remove(path)
+        self.assertEquals(self.index.update(jobs=1)['rows'], 0)
+        self.assertEquals(self.index.find('foo'), [])
+
+class TestDiff(unittest.TestCase):
+
+    def test_context_lines_are_not_changes(self):
+        self.assertEquals(readDiff('\n'.join([
+            'diff --git a/foo.js b/foo.js',
+            '--- a/foo.js',
+            '+++ b/foo.js',
+            '@@ -1,7 +1,7 @@',
+            ' one',
+            ' two',
+            ' three',
+            '-four',
+            '+FOUR',
+            ' five',
+            ' six',
+            ' seven',
+            '@@ -20,7 +20,6 @@',
+            ' twenty',
+            ' twenty one',
+            ' twenty two',
+            '-twenty three',
+            ' twenty four',
+            ' twenty five',
+            ' twenty six',
+            '--- a/bar.js',
+            '+++ b/bar.js',
+            '@@ -1,3 +1,5 @@',
+            ' one',
+            '+added',
+            '+added',
+            ' two',
+            ' three',
+        ])), [('foo.js', [(4, 4), (22, 23)]), ('bar.js', [(2, 3)])])
+
 class RunBespokeDocsTests(sublime_plugin.WindowCommand):
 
     def run(self):
@@ -249,6 +471,10 @@ class RunBespokeDocsTests(sublime_plugin.WindowCommand):
         # TODO move all test cases into tests directory and make test loader auto load testcases from the folder
 
         suite.addTests(test_loader.loadTestsFromTestCase(TestJavaScript))
+        suite.addTests(test_loader.loadTestsFromTestCase(TestFormat))
+        suite.addTests(test_loader.loadTestsFromTestCase(TestRestyle))
+        suite.addTests(test_loader.loadTestsFromTestCase(TestShards))
+        suite.addTests(test_loader.loadTestsFromTestCase(TestDiff))
 
         # TODO toggle test verbosity
         unittest.TextTestRunner(verbosity=1).run(suite)
@@ -0,0 +1,449 @@
+"""
+Differential fuzzing of the parsing and formatting engines: the working tree against a reference version.
+
+    python tests/fuzz.py -n 100000                       # every engine, against HEAD
+    python tests/fuzz.py --engine wrapLines --reference v1.2 --seed 7
+
+Each engine runs random inputs (JS and CoffeeScript signatures, tag records, docblocks) through both
+versions of the plugin, loaded side by side on the `sublime` stand-in. Results must be identical, raising
+the same exceptions included. A mismatching input is shrunk, by removing parts of it for as long as the
+versions still disagree, and printed with both results; the exit code is 1 if there was any. The time
+spent in each version is reported as the engines' throughput.
+
+    splitByCommas   parser.splitByCommas over argument lists
+    parseFunction   parser.parseFunction, and the records parse() makes, over function definitions
+    parseVar        parser.parseVar, and the records parse() makes, over variable definitions
+    alignTags       DocBlockRenderer.render (which aligns the tag columns) over records and settings
+    wrapLines       the BespokeDocsWrapLines command over docblocks in a view
+
+--reference takes a git revision or the directory of a copy of the package; --candidate (the working
+tree by default) a directory. Both must hold `docblock/parser.py` and `docblock/render.py`, so the
+reference must be at or after the commit which moved the parser there ("Add a streaming JSON lines
+export of project docblocks"). Older versions keep the parser in bespoke_docs.py and render strings
+rather than tag records: their results can't be compared with these engines.
+"""
+import argparse
+import importlib
+import io
+import os
+import random
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standin  # noqa: E402
+
+
+ROOT = standin.ROOT
+
+# the attempts allowed to shrink each mismatch
+MAX_SHRINK_STEPS = 5000
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_$0123456789'
+# characters spliced in at random, to reach the inputs the generators don't write out
+NOISE = ' ,()[]{}<>=:;"\'`\\/*.-+!?@#$\t\n' + 'a1_'
+PREFIXES = ['', '', '', 'is', 'has', 'get', 'set', 'on', '_', '$', 'can']
+WORDS = ['value', 'name', 'callback', 'options', 'item', 'list', 'x', 'i', 'el', 'count', 'Foo', 'self']
+TYPES = ['Number', 'String', 'Boolean', '[type]', 'Array.<String>', '{a: Number}', 'Function', '*', '', None]
+TAGS = ['@param', '@arg', '@return', '@returns', '@type', '@author', '@throws', '@since', '@example', '@see',
+        '@property', '@deprecated', '@yields']
+PROSE = ['the', 'a', 'value', 'of', 'which', 'is', 'returned', 'when', 'called', 'with', 'options', '-', 'and',
+         'http://example.com/a/very/long/path/that/does/not/fit', '{@link Foo}', '`foo(bar, baz)`', 'e.g.',
+         'supercalifragilisticexpialidocious', '$1', '{curly}', 'tab\tbed', '*', '@notatag', '']
+
+
+def identifier(rng):
+    word = rng.choice(WORDS)
+    prefix = rng.choice(PREFIXES)
+    if prefix:
+        word = prefix + word[0].upper() + word[1:]
+    if rng.random() < 0.1:
+        word += ''.join(rng.choice(LETTERS) for i in range(rng.randint(1, 4)))
+    return word
+
+
+def value(rng, depth=0):
+    kind = rng.randint(0, 17 if depth < 2 else 9)
+    if kind == 0:
+        return rng.choice(['1', '-2.5', '0x1F', '1e3', '.5', 'NaN', 'Infinity'])
+    if kind == 1:
+        return rng.choice(['"a, b"', "'it\\'s'", '"say \\"hi\\""', "''", '"(", ")"'])
+    if kind == 2:
+        return rng.choice(['true', 'false', 'null', 'undefined', 'yes', 'off'])
+    if kind == 3:
+        return '/%s,%s/g' % (identifier(rng), rng.choice(['a', '\\/', '[,]']))
+    if kind == 4:
+        return '`%s, ${%s}`' % (identifier(rng), identifier(rng))
+    if kind <= 6:
+        return identifier(rng)
+    if kind == 7:
+        return '%s.%s' % (identifier(rng), identifier(rng))
+    if kind == 8:
+        return 'new %s()' % rng.choice(['Date', 'Foo', 'Map', 'Array'])
+    if kind == 9:
+        return '<%s, %s>' % (identifier(rng), identifier(rng))
+    if kind == 10:
+        return '[%s]' % ', '.join(value(rng, depth + 1) for i in range(rng.randint(0, 3)))
+    if kind == 11:
+        return '{%s}' % ', '.join('%s: %s' % (identifier(rng), value(rng, depth + 1)) for i in range(rng.randint(0, 3)))
+    if kind == 12:
+        return '(%s) => %s' % (arguments(rng, depth + 1), value(rng, depth + 1))
+    if kind == 13:
+        return 'function (%s) {}' % arguments(rng, depth + 1)
+    if kind == 14:
+        return '%s(%s)' % (identifier(rng), ', '.join(value(rng, depth + 1) for i in range(rng.randint(0, 3))))
+    if kind == 15:
+        return 'new %s(%s)' % (identifier(rng), ', '.join(value(rng, depth + 1) for i in range(rng.randint(0, 2))))
+    if kind == 16:
+        return '%s ? %s : %s' % (identifier(rng), value(rng, depth + 1), value(rng, depth + 1))
+    return '%s + %s' % (value(rng, depth + 1), value(rng, depth + 1))
+
+
+def parameter(rng, depth=0):
+    kind = rng.randint(0, 9)
+    if kind <= 3:
+        return identifier(rng)
+    if kind <= 5:
+        return '%s%s=%s%s' % (identifier(rng), rng.choice(['', ' ']), rng.choice(['', ' ']), value(rng, depth))
+    if kind == 6:
+        return '...' + identifier(rng)
+    if kind == 7:
+        return '{%s}' % ', '.join(identifier(rng) for i in range(rng.randint(1, 3)))
+    if kind == 8:
+        return '[%s] = []' % ', '.join(identifier(rng) for i in range(rng.randint(1, 3)))
+    return '/* %s */ %s' % (rng.choice(TYPES[:-2]), identifier(rng))
+
+
+def arguments(rng, depth=0):
+    return rng.choice([', ', ',', ' , ', ',\n  ']).join(parameter(rng, depth) for i in range(rng.randint(0, 5)))
+
+
+def mutate(rng, text, rate=0.15):
+    """ text with a few characters inserted, removed or replaced, now and then """
+    while rng.random() < rate:
+        pos = rng.randint(0, len(text))
+        action = rng.randint(0, 2)
+        if action == 0:
+            text = text[:pos] + rng.choice(NOISE) + text[pos:]
+        elif action == 1:
+            text = text[:pos] + text[pos + 1:]
+        else:
+            text = text[:pos] + rng.choice(NOISE) + text[pos + 1:]
+    return text
+
+
+JS_FUNCTIONS = [
+    'function %(name)s(%(args)s) {', '%(name)s = function (%(args)s) {', '%(name)s: function(%(args)s) {',
+    'function* %(name)s(%(args)s) {', 'async function %(name)s(%(args)s) {', '(%(args)s) => %(name)s',
+    '%(name)s => %(name)s', '%(name)s(%(args)s) {', 'var %(name)s = (%(args)s) => {',
+    'export default function %(name)s(%(args)s) {', 'static async %(name)s(%(args)s) {',
+    'obj.%(name)s = function %(name)s (%(args)s) {', 'function(%(args)s) {', '%(name)s = async (%(args)s) => {',
+]
+COFFEE_FUNCTIONS = [
+    '%(name)s = (%(args)s) ->', '%(name)s: (%(args)s) =>', '(%(args)s) ->', '%(name)s = ->', '@%(name)s = (%(args)s) ->',
+    '%(name)s: ->', 'class %(name)s', '%(name)s = (%(args)s) => %(name)s',
+]
+JS_VARS = [
+    'var %(name)s = %(value)s;', 'let %(name)s = %(value)s', 'const %(name)s=%(value)s,', '%(name)s: %(value)s,',
+    'this.%(name)s = %(value)s;', '%(name)s = %(value)s', 'export const %(name)s = %(value)s;',
+]
+COFFEE_VARS = ['%(name)s = %(value)s', '%(name)s: %(value)s', '@%(name)s = %(value)s', '%(name)s = %(value)s # note']
+
+
+def definition(rng, forms):
+    line = rng.choice(forms) % {'name': identifier(rng), 'args': arguments(rng), 'value': value(rng)}
+    return mutate(rng, line)
+
+
+def genSplitByCommas(rng):
+    return (mutate(rng, arguments(rng), 0.3),)
+
+
+def genFunction(rng):
+    language = rng.choice(['js', 'coffee'])
+    forms = JS_FUNCTIONS if language == 'js' else COFFEE_FUNCTIONS
+    if rng.random() < 0.1:
+        forms = JS_VARS if language == 'js' else COFFEE_VARS
+    return language, definition(rng, forms)
+
+
+def genVar(rng):
+    language = rng.choice(['js', 'coffee'])
+    forms = JS_VARS if language == 'js' else COFFEE_VARS
+    if rng.random() < 0.1:
+        forms = JS_FUNCTIONS if language == 'js' else COFFEE_FUNCTIONS
+    return language, definition(rng, forms)
+
+
+# variants of the settings the renderer reads; each case of alignTags picks one
+RENDER_SETTINGS = [
+    {'align_tags': align, 'per_section_indent': perSection, 'spacer_between_sections': spacer,
+     'min_spaces_between_columns': minSpaces, 'function_description': True}
+    for align in ('deep', 'shallow', 'no')
+    for perSection in (False, True)
+    for spacer in (False, True, 'after_description')
+    for minSpaces in (1, 2)
+]
+
+
+def genRecord(rng):
+    if rng.random() < 0.25:
+        text = rng.choice(['[description]', '', 'Some text', '${1:foo} bar', '@see ${1:thing}', '@author {{name}}x',
+                           ' '.join(rng.choice(PROSE) for i in range(rng.randint(0, 6)))])
+        return ('text', text, rng.randint(0, 3))
+    return (
+        'tag', rng.choice(TAGS), rng.choice(TYPES), rng.choice([identifier(rng), '', None, '[name]', 'a.b']),
+        rng.choice(['[description]', None, '', 'some $words {here}']), rng.randint(0, 15)
+    )
+
+
+def genRecords(rng):
+    records = [genRecord(rng) for i in range(rng.randint(0, 8))]
+    return records, rng.randrange(len(RENDER_SETTINGS)), rng.random() < 0.1, rng.choice(['', ' desc */'])
+
+
+# variants of the settings wrapping reads; each case of wrapLines picks one
+WRAP_SETTINGS = [
+    {'indentation_spaces': spaces, 'indentation_spaces_same_para': samePara, 'spacer_between_sections': spacer}
+    for spaces in (1, 2)
+    for samePara in (0, 1, 3)
+    for spacer in (False, True, 'after_description')
+]
+
+
+def genLine(rng):
+    kind = rng.randint(0, 5)
+    if kind == 0:
+        return ''
+    if kind == 1:
+        record = genRecord(rng)
+        return ' '.join(field for field in record[1:5] if isinstance(field, str))
+    return ' '.join(rng.choice(PROSE) for i in range(rng.randint(1, 30)))
+
+
+def genDocBlock(rng):
+    indent = rng.choice(['', '', '    ', '\t', '  \t'])
+    if rng.random() < 0.05:
+        return '%s/** %s */' % (indent, genLine(rng))
+    lines = [genLine(rng) for i in range(rng.randint(0, 8))]
+    star = rng.choice([' *', ' *', ' * ', '*', '  *'])
+    body = ''.join('%s%s %s\n' % (indent, star, line) if line else '%s%s\n' % (indent, star) for line in lines)
+    return mutate(rng, '%s/**\n%s%s */' % (indent, body, indent), 0.05)
+
+
+def genView(rng):
+    blocks = [genDocBlock(rng) for i in range(rng.randint(1, 3))]
+    text = '\n'.join(block + '\nfunction %s() {}' % identifier(rng) for block in blocks)
+    # which blocks to wrap: the one at the cursor (None), or all of them
+    which = rng.choice([None, None, 'all'])
+    cursor = rng.randint(0, len(blocks[0]))
+    return (text, cursor, rng.choice([[], [80], [40], [120], [10]]), rng.choice([2, 4, 8]), which,
+            rng.randrange(len(WRAP_SETTINGS)))
+
+
+class Package(object):
+    """ a version of the plugin, and what the engines keep between runs against it """
+
+    def __init__(self, name, path):
+        self.package = standin.loadPackage(name, path)
+        self.plugin = self.package.bespoke_docs
+        self.parser = importlib.import_module(name + '.docblock.parser')
+        self.render = importlib.import_module(name + '.docblock.render')
+        defaults = standin.load_settings('BespokeDocs.sublime-settings').values
+        self.settings = standin.Settings(defaults)
+        self.parsers = {
+            'js': self.parser.BespokeDocsJavascript(self.settings),
+            'coffee': self.parser.BespokeDocsCoffee(self.settings)
+        }
+        self.renderers = {}
+
+    def splitByCommas(self, text):
+        return self.parser.splitByCommas(text)
+
+    def parseFunction(self, language, line):
+        parser = self.parsers[language]
+        return parser.parseFunction(line), repr(parser.parse(line))
+
+    def parseVar(self, language, line):
+        parser = self.parsers[language]
+        return parser.parseVar(line), repr(parser.parse(line))
+
+    def alignTags(self, records, variant, inline, trailingString):
+        key = (variant, inline)
+        renderer = self.renderers.get(key)
+        if renderer is None:
+            settings = dict(self.settings.values, **RENDER_SETTINGS[variant])
+            renderer = self.renderers[key] = self.render.DocBlockRenderer(settings, {'commentCloser': ' */'})
+        Tag = self.render.Tag
+        Text = self.render.Text
+        return renderer.render([
+            Tag(*record[1:]) if record[0] == 'tag' else Text(*record[1:]) for record in records
+        ], inline, trailingString)
+
+    def wrapLines(self, text, cursor, rulers, tabSize, which, variant):
+        view = standin.View(text, min(cursor, len(text)), settings={'rulers': rulers, 'tab_size': tabSize})
+        pluginSettings = standin.load_settings('BespokeDocs.sublime-settings')
+        saved = pluginSettings.values
+        pluginSettings.values = dict(saved, **WRAP_SETTINGS[variant])
+        try:
+            self.plugin.BespokeDocsWrapLines(view).run(None, blocks=which)
+        finally:
+            pluginSettings.values = saved
+            self.plugin.wrappedBlocks.pop(view.id(), None)
+        return view.text
+
+
+ENGINES = [
+    ('splitByCommas', genSplitByCommas),
+    ('parseFunction', genFunction),
+    ('parseVar', genVar),
+    ('alignTags', genRecords),
+    ('wrapLines', genView),
+]
+
+
+def outcome(fn, args):
+    try:
+        return ('ok', fn(*args))
+    except Exception as e:
+        return ('error', type(e).__name__)
+
+
+def shrinkValue(value, fails, steps):
+    """
+    The smallest part of value (a string, or a list or tuple of values) found for which fails() holds, by
+    removing chunks of it and then shrinking its items. steps is a one item list counting the attempts left.
+    """
+    if not isinstance(value, (str, list, tuple)):
+        return value
+    size = len(value) // 2
+    while size >= 1 and steps[0] > 0:
+        start = 0
+        while start < len(value) and steps[0] > 0:
+            smaller = value[:start] + value[start + size:]
+            steps[0] -= 1
+            if fails(smaller):
+                value = smaller
+            else:
+                start += size
+        size //= 2
+    if not isinstance(value, str):
+        items = list(value)
+        for i, item in enumerate(items):
+            def itemFails(candidate):
+                return fails(type(value)(items[:i] + [candidate] + items[i + 1:]))
+            items[i] = shrinkValue(item, itemFails, steps)
+        value = type(value)(items)
+    return value
+
+
+def shrink(reference, candidate, args):
+    """ args reduced to a smaller input for which reference and candidate still disagree """
+    def fails(smaller):
+        return outcome(reference, smaller) != outcome(candidate, smaller)
+
+    args = list(args)
+    steps = [MAX_SHRINK_STEPS]
+    for i, arg in enumerate(args):
+        def argFails(smaller):
+            return fails(args[:i] + [smaller] + args[i + 1:])
+        args[i] = shrinkValue(arg, argFails, steps)
+    return tuple(args)
+
+
+def runEngine(name, generate, reference, candidate, cases, seed, maxReports):
+    """ Returns (mismatches, seconds in reference, seconds in candidate) """
+    rng = random.Random('%s:%s' % (seed, name))
+    referenceRun = getattr(reference, name)
+    candidateRun = getattr(candidate, name)
+    mismatches = 0
+    referenceTime = candidateTime = 0.0
+    clock = time.perf_counter
+    for case in range(cases):
+        args = generate(rng)
+        start = clock()
+        expected = outcome(referenceRun, args)
+        middle = clock()
+        actual = outcome(candidateRun, args)
+        referenceTime += middle - start
+        candidateTime += clock() - middle
+        if expected == actual:
+            continue
+        mismatches += 1
+        if mismatches <= maxReports:
+            args = shrink(referenceRun, candidateRun, args)
+            sys.stdout.write('%s: mismatch at case %d, shrunk to:\n    args:      %r\n    reference: %r\n'
+                             '    candidate: %r\n' % (name, case, args, outcome(referenceRun, args),
+                                                      outcome(candidateRun, args)))
+    return mismatches, referenceTime, candidateTime
+
+
+def hasEngines(path):
+    return all(os.path.isfile(os.path.join(path, 'docblock', name)) for name in ('parser.py', 'render.py'))
+
+
+def extractRevision(revision, directory):
+    """ write the plugin's code at a git revision into directory; False if it has no docblock engines """
+    for name in ('parser.py', 'render.py'):
+        if subprocess.call(['git', 'cat-file', '-e', '%s:docblock/%s' % (revision, name)], cwd=ROOT):
+            return False
+    data = subprocess.check_output(['git', 'archive', '--format=tar', revision, 'bespoke_docs.py', 'docblock'], cwd=ROOT)
+    with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+        if hasattr(tarfile, 'data_filter'):
+            archive.extractall(directory, filter='data')
+        else:
+            archive.extractall(directory)
+    return True
+
+
+def rate(cases, seconds):
+    return '%10.0f/s' % (cases / seconds) if seconds else '         -'
+
+
+def main(argv=None):
+    names = [name for name, generate in ENGINES]
+    argParser = argparse.ArgumentParser(prog='python tests/fuzz.py', description=__doc__.strip().split('\n')[0])
+    argParser.add_argument('-n', '--cases', type=int, default=10000, help='inputs per engine (default: 10000)')
+    argParser.add_argument('--seed', default='0', help='seed of the inputs (default: 0)')
+    argParser.add_argument('--engine', action='append', choices=names, help='only run these engines')
+    argParser.add_argument('--reference', default='HEAD', help='git revision or directory (default: HEAD)')
+    argParser.add_argument('--candidate', default=ROOT, help='directory (default: the working tree)')
+    argParser.add_argument('--reports', type=int, default=3, help='mismatches to shrink and print per engine')
+    args = argParser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        referencePath = args.reference
+        if os.path.isdir(referencePath):
+            found = hasEngines(referencePath)
+        else:
+            referencePath = directory
+            found = extractRevision(args.reference, directory)
+        for name, found in ((args.reference, found), (args.candidate, hasEngines(args.candidate))):
+            if not found:
+                sys.stderr.write('%s has no docblock/parser.py and docblock/render.py: versions from before the '
+                                 "parser moved there can't be compared\n" % name)
+                return 2
+        reference = Package('reference', referencePath)
+        candidate = Package('candidate', args.candidate)
+
+        failed = False
+        sys.stdout.write('%-14s %8s %10s %12s %12s\n' % ('engine', 'cases', 'mismatches', 'reference', 'candidate'))
+        for name, generate in ENGINES:
+            if args.engine and name not in args.engine:
+                continue
+            mismatches, referenceTime, candidateTime = runEngine(
+                name, generate, reference, candidate, args.cases, args.seed, args.reports
+            )
+            failed = failed or mismatches > 0
+            sys.stdout.write('%-14s %8d %10d %12s %12s\n' % (
+                name, args.cases, mismatches, rate(args.cases, referenceTime), rate(args.cases, candidateTime)
+            ))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
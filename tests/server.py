@@ -0,0 +1,170 @@
+"""
+Check the JSON-RPC server against the editor commands, and measure its latency, through `Client`.
+
+    python tests/server.py -n 2000 [--seed 0]
+
+Random files of definitions and docblocks (made as in tests/fuzz.py) are opened in the server, then each
+definition gets a block generated both right after a typed `/**` and from its line, and each docblock is
+wrapped and aligned. Generated snippets and wrapped blocks must be those of `BespokeDocsCommand` and
+`BespokeDocsWrapLines` running on the `sublime` stand-in; aligning an aligned block must change nothing.
+Mismatches are printed, and the exit code is 1 if there was any. The round trip time of each method, as
+seen by the client, is reported next to the time the server spent on it.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standin  # noqa: E402
+from fuzz import definition, genDocBlock, JS_FUNCTIONS, JS_VARS  # noqa: E402
+from docblock.server import Client  # noqa: E402
+
+
+WRAP_LENGTH = 80
+TAB_SIZE = 4
+
+
+def genFile(rng):
+    """ (text, the offsets of its definitions, the offsets of its docblocks) """
+    parts = []
+    definitions = []
+    blocks = []
+    length = 0
+    for i in range(rng.randint(1, 20)):
+        if rng.random() < 0.4:
+            block = genDocBlock(rng)
+            blocks.append(length + len(block) - len(block.lstrip()))
+            part = block + '\n'
+        else:
+            definitions.append(length)
+            part = definition(rng, JS_FUNCTIONS if rng.random() < 0.7 else JS_VARS).replace('\n', ' ') + '\n'
+        parts.append(part)
+        length += len(part)
+    return ''.join(parts), definitions, blocks
+
+
+def position(text, offset):
+    line = text.count('\n', 0, offset)
+    return {'line': line, 'character': offset - text.rfind('\n', 0, offset) - 1}
+
+
+def editorSnippet(plugin, text, offset):
+    """ the snippet BespokeDocsCommand inserts after `/**` typed on a line of its own before offset """
+    view = standin.View(text[:offset] + '/**\n' + text[offset:], offset + 3)
+    plugin.BespokeDocsCommand(view).run(None)
+    return view.snippets[-1] if view.snippets else None
+
+
+def editorWrap(plugin, text, offset):
+    view = standin.View(text, offset + 3, settings={'rulers': [WRAP_LENGTH], 'tab_size': TAB_SIZE})
+    plugin.BespokeDocsWrapLines(view).run(None)
+    plugin.wrappedBlocks.pop(view.id(), None)
+    return view.text
+
+
+def applyEdit(text, edit):
+    lines = text.split('\n')
+
+    def offset(pos):
+        return sum(len(line) + 1 for line in lines[:pos['line']]) + pos['character']
+    return text[:offset(edit['range']['start'])] + edit['newText'] + text[offset(edit['range']['end']):]
+
+
+class Timings(object):
+
+    def __init__(self):
+        self.samples = {}
+
+    def call(self, client, method, params):
+        start = time.perf_counter()
+        result = client.request(method, params)
+        self.samples.setdefault(method, []).append(time.perf_counter() - start)
+        return result
+
+
+def main(argv=None):
+    argParser = argparse.ArgumentParser(prog='python tests/server.py', description=__doc__.strip().split('\n')[0])
+    argParser.add_argument('-n', '--files', type=int, default=500, help='random files to open (default: 500)')
+    argParser.add_argument('--seed', default='0', help='seed of the files (default: 0)')
+    args = argParser.parse_args(argv)
+
+    package = standin.loadPackage('candidate', standin.ROOT)
+    plugin = package.bespoke_docs
+    pluginSettings = standin.load_settings('BespokeDocs.sublime-settings')
+    # the server answers with a snippet whatever its number of fields
+    pluginSettings.set('fast_insert_fields', 0)
+
+    rng = random.Random(args.seed)
+    client = Client(['--wrap-length', str(WRAP_LENGTH), '--tab-size', str(TAB_SIZE)])
+    timings = Timings()
+    mismatches = 0
+
+    def mismatch(what, text, expected, actual):
+        sys.stdout.write('%s mismatch in:\n%s\nexpected: %r\nactual:   %r\n\n' % (what, text, expected, actual))
+        return 1
+
+    try:
+        timings.call(client, 'initialize', {})
+        for i in range(args.files):
+            text, definitions, blocks = genFile(rng)
+            uri = 'file:///%d.js' % i
+            client.notify('textDocument/didOpen', {'textDocument': {'uri': uri, 'languageId': 'js', 'text': text}})
+            document = {'uri': uri}
+
+            for offset in definitions:
+                expected = editorSnippet(plugin, text, offset)
+                typed = text[:offset] + '/**\n' + text[offset:]
+                result = timings.call(client, 'bespoke/generate', {
+                    'textDocument': {'uri': uri + '#typed', 'text': typed},
+                    'position': position(typed, offset + 3)
+                })
+                if (result and result['snippet']) != expected:
+                    mismatches += mismatch('generate', typed, expected, result and result['snippet'])
+                result = timings.call(client, 'bespoke/generate', {
+                    'textDocument': document, 'position': position(text, offset)
+                })
+                if (result and result['snippet']) != (expected and '/**' + expected + '\n'):
+                    mismatches += mismatch('generate above', text, expected, result and result['snippet'])
+                timings.call(client, 'textDocument/codeAction', {
+                    'textDocument': document, 'range': {'start': position(text, offset), 'end': position(text, offset)}
+                })
+
+            for offset in blocks:
+                inBlock = position(text, offset + 3)
+                expected = editorWrap(plugin, text, offset)
+                edit = timings.call(client, 'bespoke/wrap', {'textDocument': document, 'position': inBlock})
+                actual = applyEdit(text, edit) if edit else text
+                if actual != expected:
+                    mismatches += mismatch('wrap', text, expected, actual)
+
+                edit = timings.call(client, 'bespoke/align', {'textDocument': document, 'position': inBlock})
+                if edit:
+                    aligned = applyEdit(text, edit)
+                    again = timings.call(client, 'bespoke/align', {
+                        'textDocument': {'uri': uri + '#aligned', 'text': aligned}, 'position': inBlock
+                    })
+                    if again:
+                        mismatches += mismatch('align', aligned, None, again)
+            client.notify('textDocument/didClose', {'textDocument': document})
+
+        serverStats = client.request('bespoke/stats')
+    finally:
+        client.close()
+
+    sys.stdout.write('%-24s %8s %16s %16s %16s\n' % ('method', 'requests', 'round trip p50', 'round trip p95',
+                                                     'server p50 (ms)'))
+    for method, samples in sorted(timings.samples.items()):
+        samples.sort()
+        sys.stdout.write('%-24s %8d %16.3f %16.3f %16.3f\n' % (
+            method, len(samples), samples[len(samples) // 2] * 1000, samples[len(samples) * 95 // 100] * 1000,
+            serverStats.get(method, {}).get('p50', 0)
+        ))
+    sys.stdout.write('%d mismatches\n' % mismatches)
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,327 @@
+"""
+A stand-in for the `sublime` and `sublime_plugin` modules, to run the plugin's commands headless.
+
+    from standin import View, loadPackage
+    package = loadPackage('bespoke', '/path/to/BespokeDocs')
+    view = View('/**\n * some text\n */', cursor=5)
+    package.bespoke_docs.BespokeDocsWrapLines(view).run(None)
+
+Views hold a string; the scope of a point is "comment.block" inside docblocks, "source.js" (or
+"source.coffee") elsewhere. Commands run synchronously, and `run_command` runs plugin text commands and a
+few built-in ones (`insert_snippet` records its snippet and inserts it without fields).
+"""
+import itertools
+import os
+import re
+import sys
+import types
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from docblock.settings import parseSettings  # noqa: E402
+
+HIDDEN = 128
+ENCODED_POSITION = 1
+INHIBIT_WORD_COMPLETIONS = 8
+OP_EQUAL = 0
+OP_NOT_EQUAL = 1
+
+reDocBlock = re.compile(r'/\*\*[\s\S]*?\*/|^[ \t]*###\*[^\n]*\n[\s\S]*?^[ \t]*###', re.M)
+
+viewIds = itertools.count(1)
+settingsFiles = {}
+commands = {}  # command name -> TextCommand class, for run_command
+
+
+class Region(object):
+    __slots__ = ('a', 'b')
+
+    def __init__(self, a, b=None):
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self):
+        return min(self.a, self.b)
+
+    def end(self):
+        return max(self.a, self.b)
+
+    def size(self):
+        return self.end() - self.begin()
+
+    def empty(self):
+        return self.a == self.b
+
+    def contains(self, other):
+        if isinstance(other, Region):
+            return self.begin() <= other.begin() and other.end() <= self.end()
+        return self.begin() <= other <= self.end()
+
+    def intersects(self, other):
+        return self.begin() < other.end() and other.begin() < self.end() or \
+            self.empty() and other.contains(self.a) or other.empty() and self.contains(other.a)
+
+    def __eq__(self, other):
+        return isinstance(other, Region) and self.a == other.a and self.b == other.b
+
+    def __lt__(self, other):
+        return (self.begin(), self.end()) < (other.begin(), other.end())
+
+    def __repr__(self):
+        return '(%d, %d)' % (self.a, self.b)
+
+
+class Settings(object):
+
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def has(self, key):
+        return key in self.values
+
+    def erase(self, key):
+        self.values.pop(key, None)
+
+    def add_on_change(self, key, callback):
+        pass
+
+    def clear_on_change(self, key):
+        pass
+
+
+class Selection(list):
+
+    def add(self, region):
+        self.append(region if isinstance(region, Region) else Region(region))
+
+    def clear(self):
+        del self[:]
+
+
+class View(object):
+
+    def __init__(self, text='', cursor=0, syntax='source.js', settings=None):
+        self.text = text
+        self.syntax = syntax
+        self.selection = Selection([Region(cursor)])
+        self.viewSettings = Settings(dict({'rulers': [], 'tab_size': 4}, **(settings or {})))
+        self.viewId = next(viewIds)
+        self.changes = 0
+        self.regions = {}
+        self.snippets = []
+        self.path = None
+        self.spans = None
+
+    def id(self):
+        return self.viewId
+
+    def window(self):
+        return None
+
+    def is_valid(self):
+        return True
+
+    def is_dirty(self):
+        return self.changes > 0
+
+    def file_name(self):
+        return self.path
+
+    def change_count(self):
+        return self.changes
+
+    def settings(self):
+        return self.viewSettings
+
+    def sel(self):
+        return self.selection
+
+    def size(self):
+        return len(self.text)
+
+    def substr(self, region):
+        if isinstance(region, int):
+            return self.text[region:region + 1]
+        return self.text[region.begin():region.end()]
+
+    def line(self, point):
+        if isinstance(point, Region):
+            return Region(self.line(point.begin()).begin(), self.line(point.end()).end())
+        begin = self.text.rfind('\n', 0, point) + 1
+        end = self.text.find('\n', point)
+        return Region(begin, len(self.text) if end == -1 else end)
+
+    def lines(self, region):
+        out = []
+        point = region.begin()
+        while True:
+            line = self.line(point)
+            out.append(line)
+            if line.end() >= region.end():
+                return out
+            point = line.end() + 1
+
+    def visible_region(self):
+        return Region(0, len(self.text))
+
+    def rowcol(self, point):
+        return self.text.count('\n', 0, point), point - self.text.rfind('\n', 0, point) - 1
+
+    def text_point(self, row, col):
+        point = 0
+        for i in range(row):
+            point = self.text.index('\n', point) + 1
+        return point + col
+
+    def scope_name(self, point):
+        if self.spans is None:
+            self.spans = [match.span() for match in reDocBlock.finditer(self.text)]
+        for begin, end in self.spans:
+            if begin <= point < end:
+                return '%s comment.block.documentation ' % self.syntax
+        return self.syntax + ' '
+
+    def find(self, pattern, start, flags=0):
+        match = re.compile(pattern).search(self.text, start)
+        return Region(match.start(), match.end()) if match else Region(-1, -1)
+
+    def changed(self):
+        self.changes += 1
+        self.spans = None
+
+    def insert(self, edit, point, text):
+        self.text = self.text[:point] + text + self.text[point:]
+        self.changed()
+        return len(text)
+
+    def erase(self, edit, region):
+        self.text = self.text[:region.begin()] + self.text[region.end():]
+        self.changed()
+
+    def replace(self, edit, region, text):
+        self.text = self.text[:region.begin()] + text + self.text[region.end():]
+        self.changed()
+
+    def add_regions(self, key, regions, scope='', icon='', flags=0):
+        self.regions[key] = sorted(regions)
+
+    def get_regions(self, key):
+        return list(self.regions.get(key, []))
+
+    def erase_regions(self, key):
+        self.regions.pop(key, None)
+
+    def show(self, region):
+        pass
+
+    def run_command(self, name, args=None):
+        args = args or {}
+        if name == 'insert_snippet':
+            self.snippets.append(args['contents'])
+            point = self.selection[0].begin()
+            text = re.sub(r'\$\{\d+:((?:\\.|[^}])*)\}|\$\d+', lambda m: m.group(1) or '', args['contents'])
+            text = re.sub(r'\\(.)', r'\1', text)
+            self.replace(None, self.selection[0], text)
+            self.selection.clear()
+            self.selection.add(point + len(text))
+        elif name in commands:
+            commands[name](self).run(None, **args)
+
+
+def load_settings(name):
+    """ the settings in the package root's file of that name, as it ships """
+    if name not in settingsFiles:
+        path = os.path.join(ROOT, name)
+        values = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                values = parseSettings(f.read())
+        settingsFiles[name] = Settings(values)
+    return settingsFiles[name]
+
+
+def status_message(message):
+    pass
+
+
+def set_timeout(callback, delay=0):
+    callback()
+
+
+set_timeout_async = set_timeout
+
+
+def commandName(cls):
+    name = re.sub(r'Command$', '', cls.__name__)
+    return re.sub(r'(?<=[a-z0-9])([A-Z])', r'_\1', name).lower()
+
+
+class CommandMeta(type):
+    """ registers text commands, so views can run them by name """
+
+    def __init__(cls, name, bases, namespace):
+        super(CommandMeta, cls).__init__(name, bases, namespace)
+        if bases != (object,):
+            commands[commandName(cls)] = cls
+
+
+class TextCommand(object, metaclass=CommandMeta):
+
+    def __init__(self, view):
+        self.view = view
+
+
+class WindowCommand(object):
+
+    def __init__(self, window):
+        self.window = window
+
+
+class ApplicationCommand(object):
+    pass
+
+
+class EventListener(object):
+    pass
+
+
+def install():
+    """ make `import sublime` and `import sublime_plugin` import the stand-in """
+    if 'sublime' in sys.modules:
+        return
+    module = sys.modules[__name__]
+    sublime = types.ModuleType('sublime')
+    for name in ('Region', 'Settings', 'load_settings', 'status_message', 'set_timeout', 'set_timeout_async',
+                 'HIDDEN', 'ENCODED_POSITION', 'INHIBIT_WORD_COMPLETIONS', 'OP_EQUAL', 'OP_NOT_EQUAL'):
+        setattr(sublime, name, getattr(module, name))
+    sublime.View = View
+    sublime.version = lambda: '3000'
+    sublime.active_window = lambda: None
+    plugin = types.ModuleType('sublime_plugin')
+    for name in ('TextCommand', 'WindowCommand', 'ApplicationCommand', 'EventListener'):
+        setattr(plugin, name, getattr(module, name))
+    sys.modules['sublime'] = sublime
+    sys.modules['sublime_plugin'] = plugin
+
+
+def loadPackage(name, path):
+    """
+    Import the plugin in the directory path as the package `name` (so several versions of it can be loaded
+    side by side), returning the package. Its plugin module is `package.bespoke_docs`.
+    """
+    import importlib
+
+    install()
+    package = types.ModuleType(name)
+    package.__path__ = [path]
+    sys.modules[name] = package
+    package.bespoke_docs = importlib.import_module(name + '.bespoke_docs')
+    return package